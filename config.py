@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 OUTPUT_DIR = "data"                 # 数据输出目录
 CN_DIR = "CN"                       # 中国A股数据子目录
 STOCK_LIST_FILE = "stock_list.csv"  # 股票列表文件名
+STORAGE_FORMAT = "csv"              # 个股数据存储格式: csv(默认), parquet(需安装 pyarrow，读写更快)
 
 # ========== 股票数据配置 ==========
 STOCK_CODE = "600519"               # 默认股票代码（贵州茅台）
@@ -23,8 +24,14 @@ ADJUST_TYPE = "qfq"                 # 复权类型: qfq(前复权), hfq(后复
 DELAY_MIN = 2                       # 最小延迟（秒）
 DELAY_MAX = 4                       # 最大延迟（秒）
 BATCH_SIZE = 10                  # 每批处理的股票数量（0表示处理全部）
+FETCH_WORKERS = 4                   # 历史数据并行处理线程数（每个数据源的请求仍按 DELAY_MIN/MAX 分别限速）
+FETCH_BURST = 1                     # 空闲后允许连续发起、无需等待的请求数（1 表示严格按 DELAY_MIN/MAX 间隔）
+WRITE_FLUSH_EVERY = 100             # 历史数据每缓冲多少只股票写入一次文件
 START_INDEX = 0                     # 从第几只股票开始（0表示从头开始）
 UPDATE_MODE = "tail"                # 更新模式: tail(只补充尾部), full(完全刷新), head_tail(补充头尾)
+DATE_PARQUET_CACHE = False          # full/head_tail 模式检查缺失日期时，是否把个股 CSV 的日期列缓存为 Parquet（需安装 pyarrow）
+DAILY_UPDATE_WORKERS = 16           # 每日更新并行写文件的线程数（小文件 I/O 密集，可高于 CPU 核数）
+DAILY_FULL_REWRITE = False          # 每日更新是否强制读取合并整个文件（默认信任元数据直接追加，出现重复数据时可开启）
 
 # ========== 数据源配置 ==========
 PREFERRED_SOURCE = "baostock"       # 优先数据源: baostock(默认), akshare, yfinance
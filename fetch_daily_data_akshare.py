@@ -31,12 +31,22 @@
 """
 
 import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 import pandas as pd
-import akshare as ak
-from config import OUTPUT_DIR, CN_DIR
-from utils import MetadataManager, save_dataframe, get_safe_end_date, filter_suspended_trading_data
+from config import OUTPUT_DIR, CN_DIR, STORAGE_FORMAT, DAILY_FULL_REWRITE, DAILY_UPDATE_WORKERS
+from utils import (
+    MetadataManager,
+    save_dataframe,
+    get_safe_end_date,
+    filter_suspended_trading_data,
+    get_stock_file_path,
+    read_stock_file,
+    append_if_newer,
+)
 
 # # ========== 日志配置 ==========
 logging.basicConfig(
@@ -45,6 +55,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+BANNER_60 = "=" * 60     # 分隔线
+BANNER_80 = "=" * 80     # 分隔线
+PROGRESS_INTERVAL = 0.5  # 进度刷新间隔（秒）
+
 def fetch_all_stocks_daily_data(target_date: str = None) -> pd.DataFrame:
     """
     使用 AkShare 批量接口获取所有A股当日行情数据
@@ -63,6 +77,9 @@ def fetch_all_stocks_daily_data(target_date: str = None) -> pd.DataFrame:
         logger.info("   2. 或使用 'make history' (使用 baostock，更稳定)")
         logger.info("   3. 详见 PROXY_FIX.md")
         
+        # 延迟导入 AkShare（依赖较多，导入耗时）
+        import akshare as ak
+        
         # 使用 AkShare 批量接口（可能需要代理）
         df = ak.stock_zh_a_spot_em()
         
@@ -76,13 +93,13 @@ def fetch_all_stocks_daily_data(target_date: str = None) -> pd.DataFrame:
         import tempfile
         temp_file = os.path.join(tempfile.gettempdir(), 'akshare_daily_data_preview.txt')
         with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write("="*80 + "\n")
+            f.write(BANNER_80 + "\n")
             f.write("AkShare 原始数据预览（前10条）:\n")
-            f.write("="*80 + "\n")
+            f.write(BANNER_80 + "\n")
             f.write(df.head(10).to_string() + "\n\n")
             f.write("列名列表:\n")
             f.write(str(df.columns.tolist()) + "\n")
-            f.write("="*80 + "\n")
+            f.write(BANNER_80 + "\n")
             f.write(f"\n数据形状: {df.shape}\n")
             f.write(f"总股票数: {len(df)}\n")
         logger.info(f"原始数据预览已保存到: {temp_file}")
@@ -115,8 +132,12 @@ def fetch_all_stocks_daily_data(target_date: str = None) -> pd.DataFrame:
             date_str = datetime.now().strftime('%Y-%m-%d')
         df['日期'] = date_str
         
-        # 确保股票代码为6位字符串
-        df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
+        # 确保股票代码为6位字符串（AkShare 通常已返回6位代码，只对不足6位的补零）
+        codes = df['股票代码'].astype(str)
+        short_mask = codes.str.len() < 6
+        if short_mask.any():
+            codes = codes.where(~short_mask, codes.str.zfill(6))
+        df['股票代码'] = codes
         
         # 调整列顺序
         column_order = ['日期', '股票代码', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
@@ -129,14 +150,66 @@ def fetch_all_stocks_daily_data(target_date: str = None) -> pd.DataFrame:
         return None
 
 
-def update_all_stock_files(df_all: pd.DataFrame, cn_dir: str, metadata_mgr: MetadataManager) -> dict:
+def _merge_stock_file(
+    stock_code: str,
+    df_new: pd.DataFrame,
+    output_file: str,
+    file_exists: bool,
+    last_date: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    将单只股票的当日数据合并到其数据文件（供线程池调用）
+    
+    保留历史名称策略：不修改历史数据，新数据使用最新名称
+    
+    Args:
+        stock_code: 股票代码
+        df_new: 该股票的当日数据（已过滤停牌）
+        output_file: 数据文件路径
+        file_exists: 数据文件是否已存在（由调用方预先统计，避免逐个 stat）
+        last_date: 元数据记录的最后日期（格式 YYYYMMDD），用于追加时免读文件尾部
+    
+    Returns:
+        Tuple[str, str]: (股票代码, 状态)，状态为 new / update / fail
+    """
+    try:
+        if file_exists:
+            # 快速路径：新数据晚于文件最后日期，直接追加
+            if not DAILY_FULL_REWRITE and append_if_newer(df_new, output_file, stock_code, last_date):
+                return stock_code, 'update'
+            
+            # 增量更新（需要插入中间日期时，读取整个文件合并）
+            df_existing = read_stock_file(output_file)
+            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
+            df_combined['日期'] = pd.to_datetime(df_combined['日期'])
+            df_combined = df_combined.drop_duplicates(subset=['日期']).sort_values(by='日期')
+            save_dataframe(df_combined, output_file, stock_code)
+            return stock_code, 'update'
+        
+        # 新文件
+        save_dataframe(df_new.copy(), output_file, stock_code)
+        return stock_code, 'new'
+    except Exception as e:
+        logger.debug(f"更新 {stock_code} 失败: {str(e)}")
+        return stock_code, 'fail'
+
+
+def update_all_stock_files(
+    df_all: pd.DataFrame,
+    cn_dir: str,
+    metadata_mgr: MetadataManager,
+    max_workers: Optional[int] = None
+) -> dict:
     """
     将批量获取的数据更新到各个股票的CSV文件
     
+    各股票文件相互独立，使用线程池并行读写（pandas 的解析和写入大部分在 C 层执行）
+    
     Args:
         df_all: 所有股票的当日数据
         cn_dir: 数据目录
         metadata_mgr: 元数据管理器
+        max_workers: 并行线程数，默认为 config.DAILY_UPDATE_WORKERS
     
     Returns:
         dict: 统计信息
@@ -146,6 +219,9 @@ def update_all_stock_files(df_all: pd.DataFrame, cn_dir: str, metadata_mgr: Meta
     skip_count = 0
     fail_count = 0
     
+    # 整理为连续内存块（重建索引并合并数据块），避免后续逐行切片时的额外开销
+    df_all = df_all.reset_index(drop=True).copy()
+    
     total = len(df_all)
     date_str = df_all['日期'].iloc[0]
     target_date = pd.to_datetime(date_str).strftime('%Y%m%d')
@@ -154,57 +230,76 @@ def update_all_stock_files(df_all: pd.DataFrame, cn_dir: str, metadata_mgr: Meta
     logger.info(f"目标日期: {date_str}")
     print()
     
-    for index, row in df_all.iterrows():
-        stock_code = row['股票代码']
-        stock_name = row.get('股票名称', stock_code)
+    # 一次性取出所有股票的元数据最后日期，避免循环内逐只查询
+    last_dates = metadata_mgr.snapshot_last_dates()
+    # 无元数据的股票填充为空字符串（小于任何日期），保证整列可与日期字符串比较
+    target_col = df_all['股票代码'].map(last_dates).fillna('')
+    
+    # 向量化筛选需要更新的股票（无元数据或最后日期早于目标日期）
+    df_todo = df_all[target_col < target_date]
+    skip_count += total - len(df_todo)
+    
+    # 整体过滤一次停牌数据
+    df_todo_filtered, _ = filter_suspended_trading_data(df_todo)
+    
+    # 待写入的元数据更新，循环结束后统一落盘
+    pending_updates = {}
+    
+    # 停牌股票：跳过保存但仍更新元数据，避免下次重复检查
+    suspended_index = df_todo.index.difference(df_todo_filtered.index)
+    for stock_code in df_todo.loc[suspended_index, '股票代码']:
+        skip_count += 1
+        pending_updates[stock_code] = target_date
+    
+    # 一次性列出已有文件，避免逐个调用 os.path.exists
+    existing_files = set(os.listdir(cn_dir)) if os.path.isdir(cn_dir) else set()
+    
+    # 按股票代码拆分任务，各文件相互独立，可并行处理
+    # 批量接口每只股票只有一行，直接按行切片（视图，无需构造新的 DataFrame）
+    codes = df_todo_filtered['股票代码']
+    if codes.is_unique:
+        groups = ((stock_code, df_todo_filtered.iloc[i:i + 1]) for i, stock_code in enumerate(codes))
+    else:
+        groups = df_todo_filtered.groupby('股票代码', sort=False)
+    
+    tasks = []
+    for stock_code, df_new in groups:
+        output_file = get_stock_file_path(cn_dir, stock_code, STORAGE_FORMAT)
+        file_exists = os.path.basename(output_file) in existing_files
+        tasks.append((stock_code, df_new, output_file, file_exists, last_dates.get(stock_code)))
+    todo_total = len(tasks)
+    
+    if max_workers is None:
+        max_workers = DAILY_UPDATE_WORKERS
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda task: _merge_stock_file(*task), tasks)
         
-        # 显示进度
-        if (index + 1) % 100 == 0 or (index + 1) == total:
-            print(f"\r处理进度: [{index + 1}/{total}] {stock_code} {stock_name}...", end="", flush=True)
+        last_print = time.monotonic()
         
-        try:
-            output_file = os.path.join(cn_dir, f"stock_{stock_code}.csv")
-            
-            # 检查是否需要更新
-            last_date = metadata_mgr.get_last_date(stock_code)
-            if last_date and last_date >= target_date:
-                skip_count += 1
-                continue
-            
-            # 准备当日数据
-            df_new = pd.DataFrame([row])
-            
-            # 过滤停牌数据
-            df_new_filtered, removed_count = filter_suspended_trading_data(df_new)
-            
-            # 如果是停牌数据，跳过保存但仍更新元数据
-            if df_new_filtered.empty:
-                skip_count += 1
-                # 更新元数据，避免下次重复检查
-                metadata_mgr.update_last_date(stock_code, target_date)
-                continue
+        for i, (stock_code, status) in enumerate(results, 1):
+            # 显示进度（按时间间隔刷新，最后一条强制输出）
+            if i == todo_total:
+                print(f"\r处理进度: [{i}/{todo_total}] {stock_code}...", end="", flush=True)
+            else:
+                now = time.monotonic()
+                if now - last_print > PROGRESS_INTERVAL:
+                    print(f"\r处理进度: [{i}/{todo_total}] {stock_code}...", end="")
+                    last_print = now
             
-            # 合并并保存（保留历史名称策略：不修改历史数据，新数据使用最新名称）
-            if os.path.exists(output_file):
-                # 增量更新
-                df_existing = pd.read_csv(output_file, dtype={'股票代码': str})
-                df_combined = pd.concat([df_existing, df_new_filtered], ignore_index=True)
-                df_combined['日期'] = pd.to_datetime(df_combined['日期'])
-                df_combined = df_combined.drop_duplicates(subset=['日期']).sort_values(by='日期')
-                save_dataframe(df_combined, output_file, stock_code)
+            if status == 'update':
                 update_count += 1
-            else:
-                # 新文件
-                save_dataframe(df_new_filtered, output_file, stock_code)
+            elif status == 'new':
                 success_count += 1
+            else:
+                fail_count += 1
+                continue
             
-            # 更新元数据
-            metadata_mgr.update_last_date(stock_code, target_date)
-            
-        except Exception as e:
-            fail_count += 1
-            logger.debug(f"更新 {stock_code} 失败: {str(e)}")
-            continue
+            # 记录元数据更新
+            pending_updates[stock_code] = target_date
+    
+    # 批量更新元数据（只写一次文件）
+    metadata_mgr.bulk_update_last_dates(pending_updates)
     
     print()  # 换行
     print()
@@ -220,9 +315,9 @@ def update_all_stock_files(df_all: pd.DataFrame, cn_dir: str, metadata_mgr: Meta
 
 def main():
     """主函数"""
-    logger.info("=" * 60)
+    logger.info(BANNER_60)
     logger.info("批量获取所有A股当日行情数据")
-    logger.info("=" * 60)
+    logger.info(BANNER_60)
     print()
     
     # 初始化
@@ -237,7 +332,7 @@ def main():
         print()
     
     # 初始化元数据管理器
-    metadata_mgr = MetadataManager(cn_dir)
+    metadata_mgr = MetadataManager(cn_dir, STORAGE_FORMAT)
     
     # 获取所有股票数据
     df_all = fetch_all_stocks_daily_data(safe_date)
@@ -252,15 +347,15 @@ def main():
     # stats = update_all_stock_files(df_all, cn_dir, metadata_mgr)
     
     # # 显示统计信息
-    # logger.info("=" * 60)
+    # logger.info(BANNER_60)
     # logger.info("统计信息")
-    # logger.info("=" * 60)
+    # logger.info(BANNER_60)
     # logger.info(f"新增: {stats['success']} 只")
     # logger.info(f"更新: {stats['update']} 只")
     # logger.info(f"跳过: {stats['skip']} 只（已是最新）")
     # logger.info(f"失败: {stats['fail']} 只")
     # logger.info(f"总计: {stats['total']} 只")
-    # logger.info("=" * 60)
+    # logger.info(BANNER_60)
     
     # # 提示
     # if stats['fail'] > 0:
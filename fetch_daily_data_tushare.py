@@ -56,20 +56,30 @@ import os
 import sys
 import logging
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
+import numpy as np
 import pandas as pd
 
-try:
-    import tushare as ts
-except ImportError:
-    print("错误: 未安装 tushare 库")
-    print("请运行: poetry add tushare")
-    print("或者: pip install tushare")
-    sys.exit(1)
+from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE, STORAGE_FORMAT, DAILY_FULL_REWRITE, DAILY_UPDATE_WORKERS
+from utils import (
+    MetadataManager,
+    save_dataframe,
+    get_safe_end_date,
+    filter_suspended_trading_data,
+    get_stock_file_path,
+    read_stock_file,
+    append_if_newer,
+    read_stock_list,
+    lookup_stock_names,
+)
+from utils.data_saver import HAS_PYARROW
+from fetchers import SZ_PREFIXES, SH_PREFIXES
 
-from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE
-from utils import MetadataManager, save_dataframe, get_safe_end_date, filter_suspended_trading_data
+# TuShare 股票名称缓存（stock_basic 接口结果）
+STOCK_BASIC_CACHE_FILE = ".tushare_stock_basic.csv"
+STOCK_BASIC_CACHE_TTL = 24 * 3600  # 缓存有效期（秒）
 
 # ========== 日志配置 ==========
 logging.basicConfig(
@@ -78,6 +88,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+BANNER_80 = "=" * 80  # 分隔线
+
+
+def import_tushare():
+    """
+    延迟导入 TuShare（依赖较多，导入耗时；--help 等路径无需导入）
+    
+    Returns:
+        module: tushare 模块
+    """
+    try:
+        import tushare as ts
+    except ImportError:
+        print("错误: 未安装 tushare 库")
+        print("请运行: poetry add tushare")
+        print("或者: pip install tushare")
+        sys.exit(1)
+    return ts
+
 
 def get_tushare_token() -> Optional[str]:
     """
@@ -119,11 +148,11 @@ def fetch_all_stocks_daily_data_tushare(
     """
     try:
         # 初始化 TuShare Pro API
-        pro = ts.pro_api(token)
+        pro = import_tushare().pro_api(token)
         
-        logger.info("="*80)
+        logger.info(BANNER_80)
         logger.info("TuShare 批量获取A股日线数据")
-        logger.info("="*80)
+        logger.info(BANNER_80)
         logger.info(f"目标日期: {target_date}")
         logger.info(f"数据源: TuShare Pro (官方接口)")
         logger.info(f"接口: daily (日线行情)")
@@ -155,8 +184,9 @@ def fetch_all_stocks_daily_data_tushare(
                 non_zero_count = (df_basic['turnover_rate'] > 0).sum()
                 logger.info(f"   换手率非零数量: {non_zero_count}/{len(df_basic)}")
                 
-                # 合并换手率数据
-                df = df.merge(df_basic, on='ts_code', how='left')
+                # 合并换手率数据（只引入一列，用 map 代替 merge）
+                turnover = df_basic.drop_duplicates('ts_code').set_index('ts_code')['turnover_rate']
+                df['turnover_rate'] = df['ts_code'].map(turnover)
                 
                 # 验证合并后的数据
                 if 'turnover_rate' in df.columns:
@@ -229,13 +259,19 @@ def convert_tushare_to_standard_format(df: pd.DataFrame, target_date: str) -> pd
     Returns:
         DataFrame: 标准格式的数据
     """
-    # 1. 提取股票代码（去掉市场后缀）
-    df['股票代码'] = df['ts_code'].str.split('.').str[0]
-    
-    # 2. 添加日期列（TuShare 的 trade_date 格式为 YYYYMMDD）
-    df['日期'] = pd.to_datetime(df['trade_date'], format='%Y%m%d').dt.strftime('%Y-%m-%d')
+    # 1. 提取股票代码（去掉市场后缀，ts_code 格式固定为 6位代码.市场）
+    stock_codes = df['ts_code'].str.slice(0, 6).to_numpy()
+    
+    # 2. 日期列（TuShare 的 trade_date 格式为 YYYYMMDD）
+    # 单日批量数据所有行日期相同，直接格式化一次并广播，无需逐行解析
+    trade_dates = df['trade_date'].astype(str)
+    if (trade_dates == target_date).all():
+        dates = f"{target_date[:4]}-{target_date[4:6]}-{target_date[6:8]}"
+    else:
+        dates = (trade_dates.str[:4] + '-' + trade_dates.str[4:6] + '-' + trade_dates.str[6:8]).to_numpy()
     
-    # 3. 列名映射
+    # 3. 数值列（TuShare 列名 -> 标准列名）
+    # 换手率来自 daily_basic 接口，未获取到时填充为 0
     column_mapping = {
         'open': '开盘',
         'high': '最高',
@@ -245,55 +281,38 @@ def convert_tushare_to_standard_format(df: pd.DataFrame, target_date: str) -> pd
         'amount': '成交额',   # TuShare 单位：千元
         'pct_chg': '涨跌幅',
         'change': '涨跌额',
-        'turnover_rate': '换手率',  # 换手率（从 daily_basic 接口获取）
+        'turnover_rate': '换手率',
     }
+    if 'turnover_rate' in df.columns:
+        arr = df[list(column_mapping)].to_numpy(dtype='float64', copy=True)
+        np.nan_to_num(arr[:, 8], copy=False, nan=0.0)
+    else:
+        arr = np.zeros((len(df), len(column_mapping)), dtype='float64')
+        arr[:, :8] = df[list(column_mapping)[:8]].to_numpy(dtype='float64')
     
-    df = df.rename(columns=column_mapping)
-    
-    # 4. 单位转换
+    # 4. 单位转换（一次性在数值矩阵上处理，避免逐列 astype/round）
     # TuShare 成交量单位是手（100股），需要转换为股
-    df['成交量'] = df['成交量'] * 100
-    
     # TuShare 成交额单位是千元，需要转换为元
-    df['成交额'] = df['成交额'] * 1000
-    
-    # 5. 添加股票名称（TuShare daily 接口不返回名称，需要从股票列表获取）
-    # 这里先设置为空，后续可以通过 stock_basic 接口补充
-    df['股票名称'] = ''
-    
-    # 6. 处理换手率（如果没有获取到，填充为 0）
-    if '换手率' not in df.columns:
-        df['换手率'] = 0.0
-    else:
-        # 填充缺失值为 0
-        df['换手率'] = df['换手率'].fillna(0.0)
-    
-    # 7. 选择并排序列
-    standard_columns = [
-        '日期', '股票代码', '股票名称', '开盘', '最高', '最低', '收盘',
-        '成交量', '成交额', '涨跌幅', '涨跌额', '换手率'
-    ]
-    
-    df = df[standard_columns]
-    
-    # 8. 数据类型转换
-    df['开盘'] = df['开盘'].astype(float).round(2)
-    df['最高'] = df['最高'].astype(float).round(2)
-    df['最低'] = df['最低'].astype(float).round(2)
-    df['收盘'] = df['收盘'].astype(float).round(2)
-    df['成交量'] = df['成交量'].astype(float).round(0)
-    df['成交额'] = df['成交额'].astype(float).round(2)
-    df['涨跌幅'] = df['涨跌幅'].astype(float).round(2)
-    df['涨跌额'] = df['涨跌额'].astype(float).round(2)
-    df['换手率'] = df['换手率'].astype(float).round(2)
-    
-    return df
+    # 注意：成交额可达百亿级，float32 精度不足，保持 float64
+    arr[:, 4] *= 100.0
+    arr[:, 5] *= 1000.0
+    np.round(arr, 2, out=arr)
+    np.round(arr[:, 4], out=arr[:, 4])  # 成交量取整（原地，不分配临时数组）
+    
+    # 5. 按标准列顺序一次性构造结果（不再 rename + 选列，各复制一次）
+    # 股票名称：TuShare daily 接口不返回名称，这里先设置为空，后续通过股票列表补充
+    result = {'日期': dates, '股票代码': stock_codes, '股票名称': ''}
+    for i, col in enumerate(column_mapping.values()):
+        result[col] = arr[:, i]
+    
+    return pd.DataFrame(result, index=df.index)
 
 
 def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
     """
     补充股票名称
-    优先从本地 stock_list.csv 读取，失败则从 TuShare 获取
+    优先从本地 stock_list.csv 读取，其次读取 TuShare 名称缓存（24小时有效），
+    都失败则从 TuShare 获取并写入缓存
     
     Args:
         df: 标准格式的数据（缺少股票名称）
@@ -312,14 +331,11 @@ def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
         if os.path.exists(local_stock_list):
             try:
                 logger.info("从本地文件读取股票名称...")
-                stock_list = pd.read_csv(local_stock_list, dtype={'code': str})
+                stock_list = read_stock_list(local_stock_list)
                 stock_list.columns = ['股票代码', '股票名称']
                 
-                # 创建代码到名称的映射
-                code_to_name = dict(zip(stock_list['股票代码'], stock_list['股票名称']))
-                
                 # 补充名称
-                df['股票名称'] = df['股票代码'].map(code_to_name).fillna('')
+                df['股票名称'] = lookup_stock_names(df['股票代码'], stock_list['股票代码'], stock_list['股票名称'])
                 
                 matched_count = df['股票名称'].ne('').sum()
                 logger.info(f"✅ 成功从本地文件补充 {matched_count} 只股票的名称")
@@ -330,9 +346,20 @@ def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
         else:
             logger.warning(f"本地文件不存在: {local_stock_list}，尝试从 TuShare 获取...")
         
-        # 方法2: 从 TuShare 获取（有频率限制）
+        # 方法2: 读取 TuShare 股票名称缓存（24小时内有效，避免重复调用接口）
+        cache_file = os.path.join(OUTPUT_DIR, CN_DIR, STOCK_BASIC_CACHE_FILE)
+        if os.path.exists(cache_file) and time.time() - os.path.getmtime(cache_file) < STOCK_BASIC_CACHE_TTL:
+            try:
+                stock_basic = pd.read_csv(cache_file, dtype={'code': str})
+                df['股票名称'] = lookup_stock_names(df['股票代码'], stock_basic['code'], stock_basic['name'])
+                logger.info(f"✅ 成功从缓存补充 {df['股票名称'].ne('').sum()} 只股票的名称")
+                return df
+            except Exception as e:
+                logger.warning(f"读取股票名称缓存失败: {e}，尝试从 TuShare 获取...")
+        
+        # 方法3: 从 TuShare 获取（有频率限制）
         logger.info("从 TuShare 获取股票名称...")
-        pro = ts.pro_api(token)
+        pro = import_tushare().pro_api(token)
         max_retries = 3
         retry_delay = 60  # 秒
         
@@ -365,11 +392,17 @@ def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
         stock_basic['股票代码'] = stock_basic['symbol']
         stock_basic['股票名称'] = stock_basic['name']
         
-        # 创建代码到名称的映射
-        code_to_name = dict(zip(stock_basic['股票代码'], stock_basic['股票名称']))
+        # 写入缓存，后续运行直接读取本地
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            stock_basic[['股票代码', '股票名称']].rename(
+                columns={'股票代码': 'code', '股票名称': 'name'}
+            ).to_csv(cache_file, index=False, encoding='utf-8-sig')
+        except Exception as e:
+            logger.debug(f"写入股票名称缓存失败: {e}")
         
         # 补充名称
-        df['股票名称'] = df['股票代码'].map(code_to_name).fillna('')
+        df['股票名称'] = lookup_stock_names(df['股票代码'], stock_basic['股票代码'], stock_basic['股票名称'])
         
         logger.info(f"✅ 成功从 TuShare 补充 {df['股票名称'].ne('').sum()} 只股票的名称")
         
@@ -381,73 +414,133 @@ def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
         return df
 
 
+def _merge_daily_file(
+    stock_code: str,
+    df_filtered: pd.DataFrame,
+    file_path: str,
+    file_exists: bool,
+    last_date: Optional[str] = None
+) -> Optional[str]:
+    """
+    将单只股票的数据合并保存到其数据文件（供线程池调用）
+    
+    Args:
+        stock_code: 股票代码
+        df_filtered: 已过滤停牌的数据
+        file_path: 数据文件路径
+        file_exists: 数据文件是否已存在（由调用方预先统计，避免逐个 stat）
+        last_date: 元数据记录的最后日期（格式 YYYYMMDD），用于追加时免读文件尾部
+    
+    Returns:
+        Optional[str]: 失败时返回错误信息，成功返回 None
+    """
+    try:
+        # 如果文件存在，合并数据
+        if file_exists:
+            # 快速路径：新数据晚于文件最后日期，直接追加
+            if not DAILY_FULL_REWRITE and append_if_newer(df_filtered, file_path, stock_code, last_date):
+                return None
+            
+            try:
+                df_existing = read_stock_file(file_path)
+                df_merged = pd.concat([df_existing, df_filtered], ignore_index=True)
+                df_merged = df_merged.drop_duplicates(subset=['日期'], keep='last')
+                df_merged = df_merged.sort_values('日期')
+                save_dataframe(df_merged, file_path, stock_code)
+            except Exception as e:
+                logger.warning(f"合并数据失败 {stock_code}: {e}，将覆盖保存")
+                save_dataframe(df_filtered.copy(), file_path, stock_code)
+        else:
+            save_dataframe(df_filtered.copy(), file_path, stock_code)
+        return None
+    except Exception as e:
+        return str(e)
+
+
 def process_and_save_daily_data(
     df: pd.DataFrame,
     target_date: str,
-    metadata_mgr: MetadataManager
-) -> Tuple[int, int, int]:
+    metadata_mgr: MetadataManager,
+    max_workers: Optional[int] = None
+) -> Tuple[int, int, int, list]:
     """
     处理并保存每日数据到各个股票文件
     
+    各股票文件相互独立，使用线程池并行读写
+    
     Args:
         df: 标准格式的数据
         target_date: 目标日期
         metadata_mgr: 元数据管理器
+        max_workers: 并行线程数，默认为 config.DAILY_UPDATE_WORKERS
     
     Returns:
-        Tuple[int, int, int]: (成功数, 跳过数, 失败数)
+        Tuple[int, int, int, list]: (成功数, 跳过数, 失败数, 失败列表)
     """
     success_count = 0
     skip_count = 0
     failed_count = 0
     failed_stocks = []
+    pending_updates = {}  # 待写入的元数据更新，循环结束后统一落盘
+    
+    # 整理为连续内存块（重建索引并合并数据块），避免后续逐行切片时的额外开销
+    df = df.reset_index(drop=True).copy()
     
     total = len(df)
+    cn_dir = os.path.join(OUTPUT_DIR, CN_DIR)
     
-    logger.info("="*80)
+    logger.info(BANNER_80)
     logger.info("开始处理并保存数据")
-    logger.info("="*80)
+    logger.info(BANNER_80)
     
-    # 按股票代码分组
-    for stock_code, group_df in df.groupby('股票代码'):
-        try:
-            # 获取股票名称
-            stock_name = group_df['股票名称'].iloc[0] if not group_df['股票名称'].empty else ''
-            
-            # 检查是否需要更新
-            last_date = metadata_mgr.get_last_date(stock_code)
-            if last_date and last_date >= target_date:
-                skip_count += 1
-                continue
-            
-            # 过滤停牌数据
-            df_filtered, removed_count = filter_suspended_trading_data(group_df)
-            
-            # 如果过滤后为空，仍然更新元数据（避免重复拉取）
-            if df_filtered.empty:
-                metadata_mgr.update_last_date(stock_code, target_date)
-                skip_count += 1
+    # 一次性列出已有文件，避免逐个调用 os.path.exists
+    existing_files = set(os.listdir(cn_dir)) if os.path.isdir(cn_dir) else set()
+    
+    # 一次性取出元数据最后日期，向量化筛选需要更新的股票
+    last_dates = metadata_mgr.snapshot_last_dates()
+    last_col = df['股票代码'].map(last_dates).fillna('')  # 无元数据填充为空字符串（小于任何日期）
+    df_todo = df[last_col < target_date]
+    skip_count += df['股票代码'].nunique() - df_todo['股票代码'].nunique()
+    
+    # 整体过滤一次停牌数据
+    df_todo_filtered, _ = filter_suspended_trading_data(df_todo)
+    
+    # 过滤后为空的股票（停牌），仍然更新元数据（避免重复拉取）
+    for stock_code in set(df_todo['股票代码']) - set(df_todo_filtered['股票代码']):
+        pending_updates[stock_code] = target_date
+        skip_count += 1
+    
+    # TuShare daily 接口每只股票只有一行，直接按行切片，避免 groupby 拆分
+    codes = df_todo_filtered['股票代码']
+    if codes.is_unique:
+        groups = ((stock_code, df_todo_filtered.iloc[i:i + 1]) for i, stock_code in enumerate(codes))
+    else:
+        groups = df_todo_filtered.groupby('股票代码', sort=False)
+    
+    # 准备需要保存的任务
+    tasks = []
+    for stock_code, df_filtered in groups:
+        stock_name = df_filtered['股票名称'].iloc[0] if '股票名称' in df_filtered.columns else ''
+        file_path = get_stock_file_path(cn_dir, stock_code, STORAGE_FORMAT)
+        file_exists = os.path.basename(file_path) in existing_files
+        tasks.append((stock_code, stock_name, df_filtered, file_path, file_exists, last_dates.get(stock_code)))
+    
+    if max_workers is None:
+        max_workers = DAILY_UPDATE_WORKERS
+    
+    # 并行保存数据，统计与元数据更新在主线程汇总
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda task: _merge_daily_file(task[0], *task[2:]), tasks)
+        
+        for (stock_code, stock_name, *_), error in zip(tasks, results):
+            if error is not None:
+                failed_count += 1
+                failed_stocks.append((stock_code, stock_name, error))
+                logger.error(f"处理失败 {stock_code} {stock_name}: {error}")
                 continue
             
-            # 保存数据
-            file_path = os.path.join(OUTPUT_DIR, CN_DIR, f"{stock_code}.csv")
-            
-            # 如果文件存在，合并数据
-            if os.path.exists(file_path):
-                try:
-                    df_existing = pd.read_csv(file_path, dtype={'股票代码': str})
-                    df_merged = pd.concat([df_existing, df_filtered], ignore_index=True)
-                    df_merged = df_merged.drop_duplicates(subset=['日期'], keep='last')
-                    df_merged = df_merged.sort_values('日期')
-                    save_dataframe(df_merged, file_path)
-                except Exception as e:
-                    logger.warning(f"合并数据失败 {stock_code}: {e}，将覆盖保存")
-                    save_dataframe(df_filtered, file_path)
-            else:
-                save_dataframe(df_filtered, file_path)
-            
-            # 更新元数据
-            metadata_mgr.update_last_date(stock_code, target_date)
+            # 记录元数据更新
+            pending_updates[stock_code] = target_date
             
             success_count += 1
             
@@ -455,15 +548,39 @@ def process_and_save_daily_data(
             if success_count % 100 == 0:
                 logger.info(f"进度: {success_count + skip_count}/{total} "
                           f"(成功: {success_count}, 跳过: {skip_count})")
-            
-        except Exception as e:
-            failed_count += 1
-            failed_stocks.append((stock_code, stock_name, str(e)))
-            logger.error(f"处理失败 {stock_code} {stock_name}: {e}")
+    
+    # 批量更新元数据（只写一次文件）
+    metadata_mgr.bulk_update_last_dates(pending_updates)
     
     return success_count, skip_count, failed_count, failed_stocks
 
 
+def save_data_dump(df: pd.DataFrame, base_name: str) -> str:
+    """
+    保存数据快照到项目目录
+    
+    已安装 pyarrow 时保存为 Parquet（zstd 压缩，体积更小、读写更快），
+    否则降级为 CSV
+    
+    Args:
+        df: 要保存的数据
+        base_name: 文件名（不含扩展名）
+    
+    Returns:
+        str: 实际保存的文件路径
+    """
+    if HAS_PYARROW:
+        output_file = f'{base_name}.parquet'
+        df.to_parquet(output_file, compression='zstd', engine='pyarrow', index=False)
+    else:
+        output_file = f'{base_name}.csv'
+        # BOM 只写一次，正文按普通 UTF-8 编码（比 utf-8-sig 编码器开销小）
+        with open(output_file, 'wb') as f:
+            f.write(b'\xef\xbb\xbf')
+            df.to_csv(f, index=False, encoding='utf-8')
+    return output_file
+
+
 def main():
     """主函数"""
     # 解析命令行参数
@@ -474,13 +591,16 @@ def main():
     parser.add_argument('--code', type=str, help='单个股票代码，例如: 000001')
     args = parser.parse_args()
     
+    # 检查 TuShare 是否已安装（参数解析之后再导入，--help 无需等待）
+    import_tushare()
+    
     # 获取 Token
     token = args.token or get_tushare_token()
     
     if not token:
-        logger.error("="*80)
+        logger.error(BANNER_80)
         logger.error("错误: 未配置 TuShare Token")
-        logger.error("="*80)
+        logger.error(BANNER_80)
         logger.error("")
         logger.error("请通过以下方式之一配置 Token:")
         logger.error("")
@@ -496,14 +616,14 @@ def main():
         logger.error("获取 Token:")
         logger.error("  1. 注册账号: https://tushare.pro/register")
         logger.error("  2. 获取 token: https://tushare.pro/user/token")
-        logger.error("="*80)
+        logger.error(BANNER_80)
         sys.exit(1)
     
     # 确保输出目录存在
     os.makedirs(os.path.join(OUTPUT_DIR, CN_DIR), exist_ok=True)
     
     # 初始化元数据管理器
-    metadata_mgr = MetadataManager(os.path.join(OUTPUT_DIR, CN_DIR))
+    metadata_mgr = MetadataManager(os.path.join(OUTPUT_DIR, CN_DIR), STORAGE_FORMAT)
     
     # 获取数据
     df_raw, target_date = fetch_all_stocks_daily_data_tushare(token, args.date)
@@ -515,9 +635,9 @@ def main():
     # 如果指定了股票代码，进行过滤
     if args.code or args.codes:
         logger.info("")
-        logger.info("="*80)
+        logger.info(BANNER_80)
         logger.info("过滤指定股票")
-        logger.info("="*80)
+        logger.info(BANNER_80)
         
         # 处理股票代码列表
         target_codes = []
@@ -533,13 +653,13 @@ def main():
         logger.info(f"原始数据总数: {len(df_raw)} 只")
         
         # 过滤数据（需要添加市场后缀）
-        # 000开头 -> .SZ (深圳)
-        # 600/601/603/688开头 -> .SH (上海)
+        # 前缀与交易所的对应关系见 fetchers/_codes.py（SZ_PREFIXES -> .SZ，SH_PREFIXES -> .SH）
         ts_codes = []
         for code in target_codes:
-            if code.startswith('000') or code.startswith('001') or code.startswith('002') or code.startswith('003'):
+            prefix = code[:3]
+            if prefix in SZ_PREFIXES:
                 ts_codes.append(f"{code}.SZ")
-            elif code.startswith('600') or code.startswith('601') or code.startswith('603') or code.startswith('688'):
+            elif prefix in SH_PREFIXES:
                 ts_codes.append(f"{code}.SH")
             else:
                 # 如果已经包含后缀，直接使用
@@ -552,8 +672,10 @@ def main():
         
         logger.info(f"查找的 TuShare 代码: {', '.join(ts_codes)}")
         
-        # 过滤
-        df_raw_filtered = df_raw[df_raw['ts_code'].isin(ts_codes)]
+        # 过滤（转为分类类型：只对去重后的代码做字符串匹配，逐行只按整数编码取值）
+        ts_code_cat = df_raw['ts_code'].astype('category')
+        keep = np.append(ts_code_cat.cat.categories.isin(ts_codes), False)  # 编码 -1（缺失值）对应末尾的 False
+        df_raw_filtered = df_raw[keep[ts_code_cat.cat.codes.to_numpy()]]
         
         if df_raw_filtered.empty:
             logger.error(f"未找到指定股票的数据: {', '.join(target_codes)}")
@@ -566,9 +688,8 @@ def main():
         # 替换原始数据
         df_raw = df_raw_filtered
     
-    # 保存原始数据到项目目录（CSV格式）
-    raw_file = f'tushare_raw_data_{target_date}.csv'
-    df_raw.to_csv(raw_file, index=False, encoding='utf-8-sig')
+    # 保存原始数据到项目目录（Parquet格式，未安装 pyarrow 时为 CSV）
+    raw_file = save_data_dump(df_raw, f'tushare_raw_data_{target_date}')
     logger.info(f"原始数据已保存到: {raw_file}")
     logger.info(f"  - 数据形状: {df_raw.shape}")
     logger.info(f"  - 总股票数: {len(df_raw)}")
@@ -577,13 +698,13 @@ def main():
     # 转换为标准格式
     logger.info("正在转换数据格式...")
     df_standard = convert_tushare_to_standard_format(df_raw, target_date)
+    df_standard = df_standard.reset_index(drop=True).copy()
     
     # 补充股票名称（在保存之前）
     df_standard = supplement_stock_names(df_standard, token)
     
-    # 保存标准格式数据到项目目录（CSV格式）
-    standard_file = f'tushare_standard_data_{target_date}.csv'
-    df_standard.to_csv(standard_file, index=False, encoding='utf-8-sig')
+    # 保存标准格式数据到项目目录（Parquet格式，未安装 pyarrow 时为 CSV）
+    standard_file = save_data_dump(df_standard, f'tushare_standard_data_{target_date}')
     logger.info(f"标准格式数据已保存到: {standard_file}")
     logger.info(f"  - 数据形状: {df_standard.shape}")
     logger.info(f"  - 总股票数: {len(df_standard)}")
@@ -598,9 +719,9 @@ def main():
     
     # 输出统计信息
     logger.info("")
-    logger.info("="*80)
+    logger.info(BANNER_80)
     logger.info("执行完成")
-    logger.info("="*80)
+    logger.info(BANNER_80)
     logger.info(f"目标日期: {target_date}")
     logger.info(f"总股票数: {len(df_standard)}")
     logger.info(f"数据已保存到文件:")
@@ -619,7 +740,7 @@ def main():
     #     for stock_code, stock_name, reason in failed_stocks:
     #         logger.info(f"  {stock_code} {stock_name}: {reason}")
     
-    logger.info("="*80)
+    logger.info(BANNER_80)
 
 
 if __name__ == "__main__":
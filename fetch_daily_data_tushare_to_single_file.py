@@ -56,12 +56,14 @@ Token 配置方式：
     --no-filter  不过滤停牌数据（可选），默认会过滤停牌数据
 """
 
+import io
 import os
 import sys
 import logging
 import argparse
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
+import numpy as np
 import pandas as pd
 
 try:
@@ -72,8 +74,18 @@ except ImportError:
     print("或者: pip install tushare")
     sys.exit(1)
 
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pacsv = None
+    HAS_PYARROW = False
+
 from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE
-from utils import filter_suspended_trading_data
+from utils import filter_suspended_trading_data, load_stock_list, lookup_stock_names
+from fetchers import SZ_PREFIXES, SH_PREFIXES
 
 # ========== 日志配置 ==========
 logging.basicConfig(
@@ -82,6 +94,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+WRITE_BUFFER_SIZE = 1 << 20  # 输出文件写缓冲区大小（1MB）
+
 
 def get_tushare_token() -> Optional[str]:
     """
@@ -159,8 +173,9 @@ def fetch_all_stocks_daily_data_tushare(
                 non_zero_count = (df_basic['turnover_rate'] > 0).sum()
                 logger.info(f"   换手率非零数量: {non_zero_count}/{len(df_basic)}")
                 
-                # 合并换手率数据
-                df = df.merge(df_basic, on='ts_code', how='left')
+                # 合并换手率数据（只引入一列，用 map 代替 merge）
+                turnover = df_basic.drop_duplicates('ts_code').set_index('ts_code')['turnover_rate']
+                df['turnover_rate'] = df['ts_code'].map(turnover)
                 
                 # 验证合并后的数据
                 if 'turnover_rate' in df.columns:
@@ -233,13 +248,19 @@ def convert_tushare_to_standard_format(df: pd.DataFrame, target_date: str) -> pd
     Returns:
         DataFrame: 标准格式的数据
     """
-    # 1. 提取股票代码（去掉市场后缀）
-    df['股票代码'] = df['ts_code'].str.split('.').str[0]
-    
-    # 2. 添加日期列（TuShare 的 trade_date 格式为 YYYYMMDD）
-    df['日期'] = pd.to_datetime(df['trade_date'], format='%Y%m%d').dt.strftime('%Y-%m-%d')
+    # 1. 提取股票代码（去掉市场后缀，ts_code 格式固定为 6位代码.市场）
+    stock_codes = df['ts_code'].str.slice(0, 6).to_numpy()
+    
+    # 2. 日期列（TuShare 的 trade_date 格式为 YYYYMMDD）
+    # 单日批量数据所有行日期相同，直接格式化一次并广播，无需逐行解析
+    trade_dates = df['trade_date'].astype(str)
+    if (trade_dates == target_date).all():
+        dates = f"{target_date[:4]}-{target_date[4:6]}-{target_date[6:8]}"
+    else:
+        dates = (trade_dates.str[:4] + '-' + trade_dates.str[4:6] + '-' + trade_dates.str[6:8]).to_numpy()
     
-    # 3. 列名映射
+    # 3. 数值列（TuShare 列名 -> 标准列名）
+    # 换手率来自 daily_basic 接口，未获取到时填充为 0
     column_mapping = {
         'open': '开盘',
         'high': '最高',
@@ -249,49 +270,30 @@ def convert_tushare_to_standard_format(df: pd.DataFrame, target_date: str) -> pd
         'amount': '成交额',   # TuShare 单位：千元
         'pct_chg': '涨跌幅',
         'change': '涨跌额',
-        'turnover_rate': '换手率',  # 换手率（从 daily_basic 接口获取）
+        'turnover_rate': '换手率',
     }
+    if 'turnover_rate' in df.columns:
+        arr = df[list(column_mapping)].to_numpy(dtype=np.float64, copy=True)
+        np.nan_to_num(arr[:, 8], copy=False, nan=0.0)
+    else:
+        arr = np.zeros((len(df), len(column_mapping)), dtype=np.float64)
+        arr[:, :8] = df[list(column_mapping)[:8]].to_numpy(dtype=np.float64)
     
-    df = df.rename(columns=column_mapping)
-    
-    # 4. 单位转换
+    # 4. 单位转换（一次性在数值矩阵上处理，避免逐列 astype/round）
     # TuShare 成交量单位是手（100股），需要转换为股
-    df['成交量'] = df['成交量'] * 100
-    
     # TuShare 成交额单位是千元，需要转换为元
-    df['成交额'] = df['成交额'] * 1000
-    
-    # 5. 添加股票名称（TuShare daily 接口不返回名称，需要从股票列表获取）
-    # 这里先设置为空，后续可以通过 stock_basic 接口补充
-    df['股票名称'] = ''
-    
-    # 6. 处理换手率（如果没有获取到，填充为 0）
-    if '换手率' not in df.columns:
-        df['换手率'] = 0.0
-    else:
-        # 填充缺失值为 0
-        df['换手率'] = df['换手率'].fillna(0.0)
-    
-    # 7. 选择并排序列
-    standard_columns = [
-        '日期', '股票代码', '股票名称', '开盘', '最高', '最低', '收盘',
-        '成交量', '成交额', '涨跌幅', '涨跌额', '换手率'
-    ]
-    
-    df = df[standard_columns]
-    
-    # 8. 数据类型转换
-    df['开盘'] = df['开盘'].astype(float).round(2)
-    df['最高'] = df['最高'].astype(float).round(2)
-    df['最低'] = df['最低'].astype(float).round(2)
-    df['收盘'] = df['收盘'].astype(float).round(2)
-    df['成交量'] = df['成交量'].astype(float).round(0)
-    df['成交额'] = df['成交额'].astype(float).round(2)
-    df['涨跌幅'] = df['涨跌幅'].astype(float).round(2)
-    df['涨跌额'] = df['涨跌额'].astype(float).round(2)
-    df['换手率'] = df['换手率'].astype(float).round(2)
-    
-    return df
+    arr[:, 4] *= 100.0
+    arr[:, 5] *= 1000.0
+    np.round(arr, 2, out=arr)
+    np.round(arr[:, 4], out=arr[:, 4])  # 成交量取整（原地，不分配临时数组）
+    
+    # 5. 按标准列顺序一次性构造结果（不再 rename + 选列，各复制一次）
+    # 股票名称：TuShare daily 接口不返回名称，这里先设置为空，后续通过股票列表补充
+    result = {'日期': dates, '股票代码': stock_codes, '股票名称': ''}
+    for i, col in enumerate(column_mapping.values()):
+        result[col] = arr[:, i]
+    
+    return pd.DataFrame(result, index=df.index)
 
 
 def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
@@ -316,14 +318,11 @@ def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
         if os.path.exists(local_stock_list):
             try:
                 logger.info("从本地文件读取股票名称...")
-                stock_list = pd.read_csv(local_stock_list, dtype={'code': str})
-                stock_list.columns = ['股票代码', '股票名称']
-                
-                # 创建代码到名称的映射
-                code_to_name = dict(zip(stock_list['股票代码'], stock_list['股票名称']))
+                # 进程内缓存，重复调用不再读取磁盘（第1列为代码，第2列为名称）
+                stock_list = load_stock_list(local_stock_list)
                 
                 # 补充名称
-                df['股票名称'] = df['股票代码'].map(code_to_name).fillna('')
+                df['股票名称'] = lookup_stock_names(df['股票代码'], stock_list.iloc[:, 0], stock_list.iloc[:, 1])
                 
                 matched_count = df['股票名称'].ne('').sum()
                 logger.info(f"✅ 成功从本地文件补充 {matched_count} 只股票的名称")
@@ -369,11 +368,8 @@ def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
         stock_basic['股票代码'] = stock_basic['symbol']
         stock_basic['股票名称'] = stock_basic['name']
         
-        # 创建代码到名称的映射
-        code_to_name = dict(zip(stock_basic['股票代码'], stock_basic['股票名称']))
-        
         # 补充名称
-        df['股票名称'] = df['股票代码'].map(code_to_name).fillna('')
+        df['股票名称'] = lookup_stock_names(df['股票代码'], stock_basic['股票代码'], stock_basic['股票名称'])
         
         logger.info(f"✅ 成功从 TuShare 补充 {df['股票名称'].ne('').sum()} 只股票的名称")
         
@@ -385,6 +381,81 @@ def supplement_stock_names(df: pd.DataFrame, token: str) -> pd.DataFrame:
         return df
 
 
+def build_ts_codes(codes: list) -> list:
+    """
+    为股票代码添加 TuShare 市场后缀
+    
+    000/001/002/003开头 -> .SZ (深圳)
+    600/601/603/688开头 -> .SH (上海)
+    已包含后缀的代码直接使用，其他代码同时尝试两个市场
+    
+    Args:
+        codes: 股票代码列表
+    
+    Returns:
+        list: TuShare 代码列表
+    """
+    if not codes:
+        return []
+    
+    arr = np.array(codes, dtype=str)
+    prefix = arr.astype('U3')  # 截取前3位
+    has_suffix = np.char.find(arr, '.') >= 0
+    sz_mask = np.isin(prefix, SZ_PREFIXES) & ~has_suffix
+    sh_mask = np.isin(prefix, SH_PREFIXES) & ~has_suffix
+    
+    ts_codes = np.char.add(arr[sz_mask], '.SZ').tolist() + np.char.add(arr[sh_mask], '.SH').tolist()
+    
+    # 未识别前缀的代码（数量很少）逐个处理
+    for code in arr[~(sz_mask | sh_mask)].tolist():
+        if '.' in code:
+            ts_codes.append(code)
+        else:
+            # 默认尝试两个市场
+            ts_codes.append(f"{code}.SZ")
+            ts_codes.append(f"{code}.SH")
+    
+    return ts_codes
+
+
+def save_csv(df: pd.DataFrame, output_file: str) -> int:
+    """
+    保存DataFrame为CSV文件（UTF-8 带 BOM，方便 Excel 打开）
+    
+    已安装 pyarrow 时使用其 C++ 多线程 CSV 写入器，否则降级为 pandas to_csv
+    两种方式都通过 1MB 缓冲区写入，减少 write 系统调用次数
+    
+    pyarrow 默认会给表头和所有字符串加引号，这里自行写入表头并关闭引号，与 pandas 的输出一致；
+    文本列含逗号、引号或换行（需要加引号）时改用 pandas 写入。
+    注意：浮点数按 Arrow 的格式输出，整数值不带小数部分（如 10.0 写为 10，pandas 写为 10.0），
+    读回的数值相同
+    
+    Args:
+        df: 要保存的数据
+        output_file: 输出文件路径
+    
+    Returns:
+        int: 写入的字节数（即文件大小，调用方无需再 stat 文件）
+    """
+    text_cols = df.select_dtypes(include=['object', 'string']).columns
+    needs_quoting = any(df[col].astype(str).str.contains('[,"\r\n]').any() for col in text_cols)
+    
+    with open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as raw:
+        # BOM 只在文件开头写一次，正文按普通 UTF-8 编码（比 utf-8-sig 编码器开销小）
+        raw.write(b'\xef\xbb\xbf')
+        if HAS_PYARROW and not needs_quoting:
+            raw.write((','.join(map(str, df.columns)) + '\n').encode('utf-8'))
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            write_options = pacsv.WriteOptions(include_header=False, quoting_style='none')
+            pacsv.write_csv(table, raw, write_options=write_options)
+        else:
+            f = io.TextIOWrapper(raw, encoding='utf-8', newline='', write_through=False)
+            df.to_csv(f, index=False)
+            f.flush()
+            f.detach()  # 分离包装器，保留底层文件以读取写入位置
+        return raw.tell()
+
+
 def main():
     """主函数"""
     # 解析命令行参数
@@ -450,27 +521,14 @@ def main():
         logger.info(f"原始数据总数: {len(df_raw)} 只")
         
         # 过滤数据（需要添加市场后缀）
-        # 000开头 -> .SZ (深圳)
-        # 600/601/603/688开头 -> .SH (上海)
-        ts_codes = []
-        for code in target_codes:
-            if code.startswith('000') or code.startswith('001') or code.startswith('002') or code.startswith('003'):
-                ts_codes.append(f"{code}.SZ")
-            elif code.startswith('600') or code.startswith('601') or code.startswith('603') or code.startswith('688'):
-                ts_codes.append(f"{code}.SH")
-            else:
-                # 如果已经包含后缀，直接使用
-                if '.' in code:
-                    ts_codes.append(code)
-                else:
-                    # 默认尝试两个市场
-                    ts_codes.append(f"{code}.SZ")
-                    ts_codes.append(f"{code}.SH")
+        ts_codes = build_ts_codes(target_codes)
         
         logger.info(f"查找的 TuShare 代码: {', '.join(ts_codes)}")
         
-        # 过滤
-        df_raw_filtered = df_raw[df_raw['ts_code'].isin(ts_codes)]
+        # 过滤（转为分类类型：只对去重后的代码做字符串匹配，逐行只按整数编码取值）
+        ts_code_cat = df_raw['ts_code'].astype('category')
+        keep = np.append(ts_code_cat.cat.categories.isin(ts_codes), False)  # 编码 -1（缺失值）对应末尾的 False
+        df_raw_filtered = df_raw[keep[ts_code_cat.cat.codes.to_numpy()]]
         
         if df_raw_filtered.empty:
             logger.error(f"未找到指定股票的数据: {', '.join(target_codes)}")
@@ -489,9 +547,9 @@ def main():
     logger.info("保存原始数据")
     logger.info("="*80)
     raw_output_file = f'tushare_raw_daily_data_{target_date}.csv'
-    df_raw.to_csv(raw_output_file, index=False, encoding='utf-8-sig')
+    raw_file_size = save_csv(df_raw, raw_output_file)
     logger.info(f"✅ 原始数据已保存: {raw_output_file}")
-    logger.info(f"   文件大小: {os.path.getsize(raw_output_file) / 1024:.2f} KB")
+    logger.info(f"   文件大小: {raw_file_size / 1024:.2f} KB")
     logger.info(f"   数据行数: {len(df_raw)}")
     logger.info("")
     
@@ -522,10 +580,10 @@ def main():
     logger.info("="*80)
     logger.info("保存标准格式数据")
     logger.info("="*80)
-    df_standard.to_csv(output_file, index=False, encoding='utf-8-sig')
+    output_file_size = save_csv(df_standard, output_file)
     
     logger.info(f"✅ 标准格式数据已保存: {output_file}")
-    logger.info(f"   文件大小: {os.path.getsize(output_file) / 1024:.2f} KB")
+    logger.info(f"   文件大小: {output_file_size / 1024:.2f} KB")
     logger.info(f"   数据行数: {len(df_standard)}")
     
     # 输出统计信息
@@ -537,8 +595,8 @@ def main():
     logger.info(f"总股票数: {len(df_standard)}")
     logger.info("")
     logger.info("输出文件:")
-    logger.info(f"  1. 原始数据: {raw_output_file} ({os.path.getsize(raw_output_file) / 1024:.2f} KB)")
-    logger.info(f"  2. 标准格式: {output_file} ({os.path.getsize(output_file) / 1024:.2f} KB)")
+    logger.info(f"  1. 原始数据: {raw_output_file} ({raw_file_size / 1024:.2f} KB)")
+    logger.info(f"  2. 标准格式: {output_file} ({output_file_size / 1024:.2f} KB)")
     logger.info("")
     logger.info("标准格式数据列:")
     for i, col in enumerate(df_standard.columns, 1):
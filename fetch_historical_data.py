@@ -20,6 +20,7 @@
     ✅ 交易日识别（自动跳过节假日/周末）
     ✅ 停牌智能处理（避免无效请求）
     ✅ 批量处理（支持分批获取）
+    ✅ 多线程处理（本地读写与请求间隔重叠，各数据源的请求仍分别限速）
     ✅ 失败重试（数据源异常自动切换）
     ✅ 双重数据完整性保护（时间检查 + 标记机制）
 
@@ -30,7 +31,10 @@
     - BATCH_SIZE: 批次大小（0=全部，>0=分批）
     - START_INDEX: 起始索引（分批处理时使用）
     - UPDATE_MODE: 更新模式（见下方说明）
+    - DATE_PARQUET_CACHE: full/head_tail 模式下是否缓存日期列（默认 False，需安装 pyarrow）
     - DELAY_MIN/MAX: 请求延迟（避免频繁请求）
+    - FETCH_WORKERS: 并行线程数（默认 4）
+    - WRITE_FLUSH_EVERY: 每缓冲多少只股票写入一次文件（默认 100）
 
 更新模式说明：
     - tail: 只补充尾部数据，忽略中间缺失（默认，推荐）
@@ -46,7 +50,7 @@
     3. YFinance（备用，国际接口）
 
 输出说明：
-    - 数据文件：data/CN/stock_{代码}.csv
+    - 数据文件：data/CN/stock_{代码}.csv（STORAGE_FORMAT = "parquet" 时为 .parquet）
     - 失败列表：data/CN/failed_stocks.csv
     - 统计信息：新增/更新/跳过/失败数量
     - 数据源使用统计
@@ -64,9 +68,11 @@
 """
 
 import os
+import sys
 import time
-import random
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 import pandas as pd
@@ -80,18 +86,27 @@ from config import (
     DELAY_MIN,
     DELAY_MAX,
     BATCH_SIZE,
+    FETCH_WORKERS,
+    FETCH_BURST,
+    WRITE_FLUSH_EVERY,
     START_INDEX,
     UPDATE_MODE,
+    DATE_PARQUET_CACHE,
     PREFERRED_SOURCE,
+    STORAGE_FORMAT,
 )
-from fetchers import MultiSourceFetcher
+from fetchers import MultiSourceFetcher, DATA_SOURCES
 from utils import (
     has_trading_day,
     get_missing_date_range,
+    fast_check_up_to_date,
     get_safe_end_date,
     MetadataManager,
     save_dataframe,
-    merge_and_save_data
+    get_stock_file_path,
+    RateLimiter,
+    BufferedStockWriter,
+    read_stock_list,
 )
 
 # ========== 日志配置 ==========
@@ -101,6 +116,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 进度输出每多少行刷新一次 stdout
+PROGRESS_FLUSH_EVERY = 50
+
+# 进度输出使用启动时的 stdout：数据源获取时会临时把全局 sys.stdout 替换为 devnull，
+# 此时其他线程 print 到 sys.stdout 的进度行会丢失
+_STDOUT = sys.stdout
+
 # ========== 初始化 ==========
 cn_dir = os.path.join(OUTPUT_DIR, CN_DIR)
 stock_list_file = os.path.join(cn_dir, STOCK_LIST_FILE)
@@ -116,7 +138,7 @@ logger.info(f"正在读取股票列表: {stock_list_file}")
 logger.info(f"目标日期范围: {START_DATE} ~ {SAFE_END_DATE}")
 
 try:
-    stock_list = pd.read_csv(stock_list_file, dtype={'code': str})
+    stock_list = read_stock_list(stock_list_file)
     stock_list['code'] = stock_list['code'].str.zfill(6)
     total_stock_length = len(stock_list)
 except FileNotFoundError:
@@ -141,145 +163,229 @@ success_count = 0
 fail_count = 0
 skip_count = 0
 update_count = 0
-failed_stocks = []
+# 失败列表按列收集（代码、名称、原因），最后直接构造 DataFrame
+failed_codes: List[str] = []
+failed_names: List[str] = []
+failed_reasons: List[str] = []
 fetch_times: List[float] = []  # 记录每只股票的获取耗时
 
 # 记录开始时间
 start_time = time.time()
 
-# 初始化元数据管理器
-metadata_mgr = MetadataManager(cn_dir)
+# 初始化元数据管理器（内部有锁，可在线程间共享；处理期间延迟写入，随股票数据一起落盘）
+metadata_mgr = MetadataManager(cn_dir, STORAGE_FORMAT)
 logger.debug(f"元数据管理器初始化: {metadata_mgr.get_stats()}")
 
-# 使用多数据源管理器
-logger.info(f"优先数据源: {PREFERRED_SOURCE}")
-with MultiSourceFetcher(preferred_source=PREFERRED_SOURCE) as multi_fetcher:
-    for idx, (index, row) in enumerate(stock_list.iterrows(), 1):
-        stock_code = row['code']
-        stock_name = row['name']
-        output_file = os.path.join(cn_dir, f"stock_{stock_code}.csv")
-        
-        # 记录单只股票开始时间
-        stock_start_time = time.time()
-        
-        if BATCH_SIZE > 0:
-            print(f"[{idx}/{len(stock_list)}] {stock_code} {stock_name} ", end="")
+# 延迟写入器：新数据先缓存，每 WRITE_FLUSH_EVERY 只股票统一写入一次
+stock_writer = BufferedStockWriter(WRITE_FLUSH_EVERY, metadata_mgr)
+
+# 各数据源分别限速（同一数据源相邻请求间隔 DELAY_MIN~DELAY_MAX 秒），所有线程共享
+# baostock 会话不支持并发请求，由 MultiSourceFetcher 内部加锁串行访问
+rate_limiters = {source: RateLimiter(DELAY_MIN, DELAY_MAX, FETCH_BURST) for source in DATA_SOURCES}
+
+# 输出锁：避免多线程输出交错
+print_lock = threading.Lock()
+emitted_lines = 0
+
+
+def emit(message: str, flush: bool = False) -> None:
+    """
+    线程安全地输出一行进度信息（每 PROGRESS_FLUSH_EVERY 行刷新一次 stdout）
+    
+    Args:
+        message: 进度信息
+        flush: 是否立即刷新（出错时使用，避免与 stderr 日志顺序错乱）
+    """
+    global emitted_lines
+    with print_lock:
+        emitted_lines += 1
+        print(message, file=_STDOUT, flush=flush or emitted_lines % PROGRESS_FLUSH_EVERY == 0)
+
+
+def process_stock(
+    multi_fetcher: MultiSourceFetcher,
+    display_idx: int,
+    display_total: int,
+    stock_code: str,
+    stock_name: str
+) -> Dict:
+    """
+    处理单只股票：检查缺失范围、获取数据、合并保存（在线程池中执行）
+    
+    Args:
+        multi_fetcher: 多数据源管理器
+        display_idx: 显示用的序号
+        display_total: 显示用的总数
+        stock_code: 股票代码
+        stock_name: 股票名称
+    
+    Returns:
+        Dict: 处理结果 {"status": new/update/skip/fail, "elapsed": 耗时, "reason": 失败原因}
+    """
+    output_file = get_stock_file_path(cn_dir, stock_code, STORAGE_FORMAT)
+    prefix = f"[{display_idx}/{display_total}] {stock_code} {stock_name} "
+    
+    # 记录单只股票开始时间
+    stock_start_time = time.time()
+    
+    try:
+        # 检查是否需要更新：tail 模式下先只查元数据，已是最新时不再读取文件
+        # （文件被删除时元数据可能仍在，仍需确认文件存在）
+        if (UPDATE_MODE == 'tail' and fast_check_up_to_date(stock_code, SAFE_END_DATE, metadata_mgr)
+                and os.path.exists(output_file)):
+            need_update = False
         else:
-            print(f"[{index + 1}/{total_stock_length}] {stock_code} {stock_name} ", end="")
-        
-        try:
-            # 检查是否需要更新（使用元数据加速）
             need_update, fetch_start, fetch_end, need_full_refresh, missing_dates = get_missing_date_range(
                 existing_file=output_file,
                 start_date=START_DATE,
                 end_date=SAFE_END_DATE,
                 update_mode=UPDATE_MODE,
-                metadata_manager=metadata_mgr
+                metadata_manager=metadata_mgr,
+                use_parquet_cache=DATE_PARQUET_CACHE,
+                stock_code=stock_code
             )
+        
+        if not need_update:
+            stock_elapsed = time.time() - stock_start_time
+            emit(f"{prefix}⏭️  已是最新 ({stock_elapsed:.2f}s)")
+            # 不需要更新元数据，因为元数据已经在之前的运行中正确设置
+            # 如果这里重新读取CSV更新元数据，会导致停牌期间的日期被错误覆盖
+            return {"status": "skip"}
+        
+        # 检查是否有交易日（周末或节假日跳过）
+        if not has_trading_day(fetch_start, fetch_end):
+            stock_elapsed = time.time() - stock_start_time
+            emit(f"{prefix}获取 {fetch_start}~{fetch_end}... ⏭️  非交易日，跳过 ({stock_elapsed:.2f}s)")
+            return {"status": "skip"}
+        
+        # 多数据源获取
+        if need_full_refresh:
+            action = f"检测到中间缺失，重新获取 {fetch_start}~{fetch_end}..."
+            # 打印缺失的日期列表
+            if missing_dates:
+                action += f"\n\t缺失日期: {', '.join(missing_dates)}\n\t正在获取..."
+        else:
+            action = f"获取 {fetch_start}~{fetch_end}..."
+        
+        # 多数据源管理器在请求各数据源前按数据源限速
+        result = multi_fetcher.fetch(
+            stock_code=stock_code,
+            stock_name=stock_name,
+            start_date=fetch_start,
+            end_date=fetch_end,
+            adjust_type=ADJUST_TYPE
+        )
+        
+        if result.data is None:
+            stock_elapsed = time.time() - stock_start_time
+            if result.source == "no_data":
+                # 数据源正常但无数据（节假日/停牌/未上市等）
+                emit(f"{prefix}{action} ⏭️  无数据（节假日/停牌） ({stock_elapsed:.2f}s)")
+                # 更新元数据，避免重复拉取
+                metadata_mgr.update_last_date(stock_code, fetch_end)
+                return {"status": "skip"}
             
-            if not need_update:
-                stock_elapsed = time.time() - stock_start_time
-                print(f"⏭️  已是最新 ({stock_elapsed:.2f}s)")
-                skip_count += 1
-                # 不需要更新元数据，因为元数据已经在之前的运行中正确设置
-                # 如果这里重新读取CSV更新元数据，会导致停牌期间的日期被错误覆盖
-                continue
-            
-            # 检查是否有交易日（周末或节假日跳过）
-            if not has_trading_day(start_date=fetch_start, end_date=fetch_end):
-                stock_elapsed = time.time() - stock_start_time
-                print(f"获取 {fetch_start}~{fetch_end}... ⏭️  非交易日，跳过 ({stock_elapsed:.2f}s)")
-                skip_count += 1
-                continue
-            
-            # 多数据源获取
-            if need_full_refresh:
-                print(f"检测到中间缺失，重新获取 {fetch_start}~{fetch_end}...", end=" ")
-                # 打印缺失的日期列表
-                if missing_dates:
-                    print()  # 换行
-                    print(f"\t缺失日期: {', '.join(missing_dates)}")
-                    print(f"\t正在获取...", end=" ")
-            else:
-                print(f"获取 {fetch_start}~{fetch_end}...", end=" ")
-            
-            result = multi_fetcher.fetch(
-                stock_code=stock_code,
-                stock_name=stock_name,
-                start_date=fetch_start,
-                end_date=fetch_end,
-                adjust_type=ADJUST_TYPE
+            # 有数据源报错，真正的失败
+            emit(f"{prefix}{action} ❌ 所有数据源均失败 ({stock_elapsed:.2f}s)", flush=True)
+            # 不更新元数据，下次需要重试
+            return {"status": "fail", "reason": "所有数据源均失败"}
+        
+        # 获取数据和数据源
+        df_new = result.data
+        source = result.source
+        
+        # 放入写入缓冲区（文件在 flush 时合并保存，写入成功后才更新该股票的元数据）
+        # 保留历史名称策略：不修改历史数据，新数据使用最新名称，可记录名称变化历史
+        # 传递 fetch_end 作为元数据更新的日期，避免因停牌导致重复拉取
+        is_update, new_count, removed_count = stock_writer.push(
+            df_new, output_file, stock_code, need_full_refresh, fetch_end
+        )
+        
+        # 计算耗时
+        stock_elapsed = time.time() - stock_start_time
+        
+        # 构建输出信息
+        status = '✅ ' + ('刷新' if need_full_refresh else '更新' if is_update else '新增')
+        data_info = f"(+{new_count} 条"
+        if removed_count > 0:
+            data_info += f", 过滤{removed_count}条停牌"
+        data_info += f") [{source}] ({stock_elapsed:.2f}s)"
+        
+        emit(f"{prefix}{action} {status} {data_info}")
+        
+        return {"status": "update" if is_update else "new", "elapsed": stock_elapsed}
+        
+    except FileNotFoundError as e:
+        _STDOUT.flush()
+        logger.error(f"{prefix}❌ 文件错误: {str(e)}")
+        return {"status": "fail", "reason": f"文件错误: {str(e)}"}
+    except pd.errors.EmptyDataError as e:
+        _STDOUT.flush()
+        logger.error(f"{prefix}❌ 数据为空: {str(e)}")
+        return {"status": "fail", "reason": f"数据为空: {str(e)}"}
+    except Exception as e:
+        _STDOUT.flush()
+        logger.error(f"{prefix}❌ 异常: {str(e)}")
+        return {"status": "fail", "reason": str(e)}
+
+
+# 使用多数据源管理器
+logger.info(f"优先数据源: {PREFERRED_SOURCE}")
+logger.info(f"并行线程数: {FETCH_WORKERS}")
+with MultiSourceFetcher(preferred_source=PREFERRED_SOURCE, rate_limiters=rate_limiters) as multi_fetcher, metadata_mgr:
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        futures = {}
+        # 分批模式显示批内序号，全量模式显示全局序号（全量模式下二者一致）
+        display_total = len(stock_list) if BATCH_SIZE > 0 else total_stock_length
+        # 直接按列取值，避免 iterrows 为每行构造 Series
+        stock_pairs = zip(stock_list['code'].to_numpy(), stock_list['name'].to_numpy())
+        for idx, (stock_code, stock_name) in enumerate(stock_pairs, 1):
+            future = executor.submit(
+                process_stock, multi_fetcher, idx, display_total, stock_code, stock_name
             )
-            
-            if result.data is None:
-                stock_elapsed = time.time() - stock_start_time
-                if result.source == "no_data":
-                    # 数据源正常但无数据（节假日/停牌/未上市等）
-                    print(f"⏭️  无数据（节假日/停牌） ({stock_elapsed:.2f}s)")
+            futures[future] = (stock_code, stock_name)
+        
+        try:
+            for future in as_completed(futures):
+                stock_code, stock_name = futures[future]
+                result = future.result()
+                status = result["status"]
+                
+                if status == "new":
+                    success_count += 1
+                    fetch_times.append(result["elapsed"])
+                elif status == "update":
+                    update_count += 1
+                    fetch_times.append(result["elapsed"])
+                elif status == "skip":
                     skip_count += 1
-                    # 更新元数据，避免重复拉取
-                    metadata_mgr.update_last_date(stock_code, fetch_end)
                 else:
-                    # 有数据源报错，真正的失败
-                    print(f"❌ 所有数据源均失败 ({stock_elapsed:.2f}s)")
                     fail_count += 1
-                    failed_stocks.append({"code": stock_code, "name": stock_name, "reason": "所有数据源均失败"})
-                    # 不更新元数据，下次需要重试
-                continue
-            
-            # 获取数据和数据源
-            df_new = result.data
-            source = result.source
-            
-            # 合并并保存数据（同时更新元数据）
-            # 保留历史名称策略：不修改历史数据，新数据使用最新名称，可记录名称变化历史
-            # 传递 fetch_end 作为元数据更新的日期，避免因停牌导致重复拉取
-            is_update, new_count, removed_count = merge_and_save_data(
-                df_new, output_file, stock_code, need_full_refresh, metadata_mgr, fetch_end
-            )
-            
-            # 计算耗时
-            stock_elapsed = time.time() - stock_start_time
-            fetch_times.append(stock_elapsed)
-            
-            # 构建输出信息
-            status = '✅ ' + ('刷新' if need_full_refresh else '更新' if is_update else '新增')
-            data_info = f"(+{new_count} 条"
-            if removed_count > 0:
-                data_info += f", 过滤{removed_count}条停牌"
-            data_info += f") [{source}] ({stock_elapsed:.2f}s)"
-            
-            print(f"{status} {data_info}")
-            
-            if is_update:
-                update_count += 1
-            else:
-                success_count += 1
-            
-            # 随机延迟
-            delay = random.uniform(DELAY_MIN, DELAY_MAX)
-            logger.info(f"⏸️  延迟 {delay:.2f}s 后继续...")
-            time.sleep(delay)
-            
+                    failed_codes.append(stock_code)
+                    failed_names.append(stock_name)
+                    failed_reasons.append(result["reason"])
+                
+                if stock_writer.should_flush():
+                    stock_writer.flush()
+                    # 写入器只为已写入文件的股票更新元数据，再把元数据落盘
+                    metadata_mgr.flush()
         except KeyboardInterrupt:
-            logger.warning("\n\n⚠️  用户中断，正在保存已处理的数据...")
-            break
-        except FileNotFoundError as e:
-            logger.error(f"❌ 文件错误: {str(e)}")
-            fail_count += 1
-            failed_stocks.append({"code": stock_code, "name": stock_name, "reason": f"文件错误: {str(e)}"})
-        except pd.errors.EmptyDataError as e:
-            logger.error(f"❌ 数据为空: {str(e)}")
-            fail_count += 1
-            failed_stocks.append({"code": stock_code, "name": stock_name, "reason": f"数据为空: {str(e)}"})
-        except Exception as e:
-            logger.error(f"❌ 异常: {str(e)}")
-            fail_count += 1
-            failed_stocks.append({"code": stock_code, "name": stock_name, "reason": str(e)})
+            _STDOUT.flush()
+            logger.warning("\n\n⚠️  用户中断，等待进行中的任务完成并保存已处理的数据...")
+            for future in futures:
+                future.cancel()
+    
+    # 写入剩余的缓冲数据（包括中断前已获取的数据）
+    write_fail_count = stock_writer.flush()
+    if write_fail_count:
+        logger.error(f"❌ {write_fail_count} 只股票数据写入失败，下次运行时将重新获取")
     
     # 获取数据源使用统计
     source_stats = multi_fetcher.get_stats()
 
+# 输出剩余的进度行，再打印统计信息
+_STDOUT.flush()
+
 # 计算总耗时
 total_elapsed = time.time() - start_time
 
@@ -320,14 +426,14 @@ if BATCH_SIZE > 0 and end_index < total_stock_length:
     next_start = end_index
     logger.info(f"\n💡 提示: 还有 {total_stock_length - end_index} 只股票未处理")
 
-if failed_stocks:
+if failed_codes:
     logger.info(f"\n失败列表:")
-    for stock in failed_stocks:
-        logger.info(f"  - {stock['code']} {stock['name']}: {stock['reason']}")
+    for code, name, reason in zip(failed_codes, failed_names, failed_reasons):
+        logger.info(f"  - {code} {name}: {reason}")
     
     # 保存失败列表
     try:
-        failed_df = pd.DataFrame(failed_stocks)
+        failed_df = pd.DataFrame({'code': failed_codes, 'name': failed_names, 'reason': failed_reasons})
         failed_file = os.path.join(cn_dir, "failed_stocks.csv")
         failed_df.to_csv(failed_file, index=False, encoding="utf-8-sig")
         logger.info(f"\n失败列表已保存到: {failed_file}")
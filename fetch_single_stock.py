@@ -26,7 +26,7 @@
     --start: 开始日期（格式：YYYYMMDD，默认：20000101）
     --end: 结束日期（格式：YYYYMMDD，默认：昨天）
     --adjust: 复权类型（qfq=前复权, hfq=后复权, ''=不复权，默认：qfq）
-    --output: 输出文件路径（默认：data/CN/stock_{代码}.csv）
+    --output: 输出文件路径（默认：data/CN/stock_{代码}.csv，扩展名随 STORAGE_FORMAT）
 
 示例：
     # 获取平安银行全部历史数据
@@ -41,16 +41,31 @@
 
 import os
 import sys
+import csv
 import argparse
 import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE, ADJUST_TYPE
-from fetchers import MultiSourceFetcher
-from utils import save_dataframe, get_safe_end_date, filter_suspended_trading_data, MetadataManager
+from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE, ADJUST_TYPE, STORAGE_FORMAT
+from fetchers import MultiSourceFetcher, DATA_SOURCES
+from utils import (
+    save_dataframe,
+    get_stock_file_path,
+    get_safe_end_date,
+    filter_suspended_trading_data,
+    MetadataManager,
+    read_stock_list,
+    RateLimiter,
+)
 
 # 配置日志
 logging.basicConfig(
@@ -60,6 +75,28 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _load_name_map() -> Dict[str, str]:
+    """
+    读取股票列表并构建 代码 -> 名称 字典（只读取一次）
+    
+    Returns:
+        Dict[str, str]: {"股票代码": "股票名称", ...}，读取失败时返回空字典
+    """
+    try:
+        stock_list_file = os.path.join(OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE)
+        
+        if os.path.exists(stock_list_file):
+            df_list = read_stock_list(stock_list_file)[['code', 'name']]
+            # 与原来的逐行匹配一致：重复代码取第一个
+            df_list = df_list.drop_duplicates('code', keep='first')
+            return dict(zip(df_list['code'].str.zfill(6), df_list['name']))
+    except Exception:
+        pass
+    
+    return {}
+
+
 def get_stock_name(stock_code: str) -> str:
     """
     从股票列表中获取股票名称
@@ -70,21 +107,57 @@ def get_stock_name(stock_code: str) -> str:
     Returns:
         股票名称，如果找不到则返回代码本身
     """
+    return _load_name_map().get(stock_code.zfill(6), stock_code)
+
+
+def _update_meta(metadata_mgr: MetadataManager, stock_code: str, end_date: str, failure_note: str = "") -> None:
+    """
+    更新股票的最新日期元数据（失败时只提示，不中断）
+    
+    Args:
+        metadata_mgr: 元数据管理器
+        stock_code: 股票代码
+        end_date: 请求的结束日期（格式：YYYYMMDD）
+        failure_note: 更新失败时附加在提示中的说明
+    """
     try:
-        import pandas as pd
-        stock_list_file = os.path.join(OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE)
-        
-        if os.path.exists(stock_list_file):
-            df_list = pd.read_csv(stock_list_file, dtype={'code': str})
-            df_list['code'] = df_list['code'].astype(str).str.zfill(6)
-            
-            match = df_list[df_list['code'] == stock_code]
-            if not match.empty:
-                return match.iloc[0]['name']
-    except Exception:
-        pass
+        metadata_mgr.update_last_date(stock_code, end_date)
+        print(f"✅ 元数据已更新：最新日期 = {end_date}")
+    except Exception as e:
+        print(f"⚠️  元数据更新失败{failure_note}: {e}")
+
+
+def _resolve_end_date(end_date: Optional[str]) -> str:
+    """
+    确定结束日期（默认昨天），并应用18:30时间检查
     
-    return stock_code
+    Args:
+        end_date: 结束日期（格式：YYYYMMDD，None表示昨天）
+    
+    Returns:
+        str: 实际使用的结束日期（格式：YYYYMMDD）
+    """
+    if end_date is None:
+        end_date = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+    
+    safe_end_date, date_adjusted = get_safe_end_date(end_date)
+    return safe_end_date if date_adjusted else end_date
+
+
+def _save_full(df_filtered: pd.DataFrame, output_file: str, stock_code: str) -> None:
+    """
+    全量替换保存已过滤的数据
+    
+    Args:
+        df_filtered: 已过滤停牌记录的数据
+        output_file: 输出文件路径
+        stock_code: 股票代码
+    """
+    # 数值和代码列不含分隔符，只要名称也不含逗号/引号/换行，就可以跳过逐字段的引号检查
+    csv_kwargs = {'lineterminator': '\n'}
+    if '股票名称' not in df_filtered.columns or not df_filtered['股票名称'].astype(str).str.contains('[,"\r\n]').any():
+        csv_kwargs['quoting'] = csv.QUOTE_NONE
+    save_dataframe(df_filtered, output_file, stock_code, **csv_kwargs)
 
 
 def fetch_single_stock(
@@ -93,7 +166,9 @@ def fetch_single_stock(
     end_date: str = None,
     adjust_type: str = "qfq",
     output_file: str = None,
-    preferred_source: str = "baostock"
+    preferred_source: str = "baostock",
+    fetcher: Optional[MultiSourceFetcher] = None,
+    metadata_mgr: Optional[MetadataManager] = None
 ) -> bool:
     """
     获取单只股票的历史数据（全量替换模式）
@@ -110,6 +185,8 @@ def fetch_single_stock(
         adjust_type: 复权类型（qfq/hfq/''）
         output_file: 输出文件路径（None表示使用默认路径）
         preferred_source: 优先数据源（baostock/akshare/yfinance，默认：baostock）
+        fetcher: 共享的数据获取器（可选，批量获取时传入；不传则本次调用内创建并关闭）
+        metadata_mgr: 共享的元数据管理器（可选，批量获取时传入，避免多个实例互相覆盖元数据文件）
     
     Returns:
         是否成功获取数据
@@ -121,19 +198,17 @@ def fetch_single_stock(
     stock_name = get_stock_name(stock_code)
     
     # 处理结束日期
-    if end_date is None:
-        end_date = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+    end_date = _resolve_end_date(end_date)
     
-    # 应用18:30时间检查
-    safe_end_date, date_adjusted = get_safe_end_date(end_date)
-    if date_adjusted:
-        end_date = safe_end_date
+    # 数据目录与元数据管理器（元数据始终记录在 CN 目录）
+    cn_dir = os.path.join(OUTPUT_DIR, CN_DIR)
+    if metadata_mgr is None:
+        metadata_mgr = MetadataManager(cn_dir, STORAGE_FORMAT)
     
     # 确定输出文件路径
     if output_file is None:
-        cn_dir = os.path.join(OUTPUT_DIR, CN_DIR)
         os.makedirs(cn_dir, exist_ok=True)
-        output_file = os.path.join(cn_dir, f"stock_{stock_code}.csv")
+        output_file = get_stock_file_path(cn_dir, stock_code, STORAGE_FORMAT)
     else:
         # 确保输出目录存在
         output_dir = os.path.dirname(output_file)
@@ -155,7 +230,11 @@ def fetch_single_stock(
     # 获取数据
     print(f"正在从 {preferred_source} 获取数据（失败时自动切换其他数据源）...")
     
-    with MultiSourceFetcher(preferred_source=preferred_source) as fetcher:
+    owned_fetcher = fetcher is None
+    if owned_fetcher:
+        fetcher = MultiSourceFetcher(preferred_source=preferred_source)
+    
+    with fetcher if owned_fetcher else nullcontext(fetcher):
         result = fetcher.fetch(
             stock_code=stock_code,
             stock_name=stock_name,
@@ -186,13 +265,7 @@ def fetch_single_stock(
         if df_filtered.empty:
             print(f"❌ 过滤后无有效数据（全部为停牌数据）")
             # 仍需更新元数据，避免下次重复拉取
-            try:
-                cn_dir = os.path.join(OUTPUT_DIR, CN_DIR)
-                metadata_mgr = MetadataManager(cn_dir)
-                metadata_mgr.update_last_date(stock_code, end_date)
-                print(f"✅ 元数据已更新：最新日期 = {end_date}")
-            except Exception as e:
-                print(f"⚠️  元数据更新失败: {e}")
+            _update_meta(metadata_mgr, stock_code, end_date)
             return False
         
         print(f"   有效数据: {len(df_filtered)} 条记录")
@@ -200,18 +273,12 @@ def fetch_single_stock(
         
         # 保存数据（直接全量替换，不做增量更新）
         print(f"正在保存到：{output_file}")
-        save_dataframe(df_filtered, output_file, stock_code)
+        _save_full(df_filtered, output_file, stock_code)
         print(f"✅ 保存成功！（全量替换模式）")
         
         # 更新元数据（确保其他脚本能正确识别最新日期）
         # 使用请求的结束日期，而非CSV中的最后日期
-        try:
-            cn_dir = os.path.join(OUTPUT_DIR, CN_DIR)
-            metadata_mgr = MetadataManager(cn_dir)
-            metadata_mgr.update_last_date(stock_code, end_date)
-            print(f"✅ 元数据已更新：最新日期 = {end_date}")
-        except Exception as e:
-            print(f"⚠️  元数据更新失败（不影响数据保存）: {e}")
+        _update_meta(metadata_mgr, stock_code, end_date, "（不影响数据保存）")
         
         print()
         
@@ -225,14 +292,18 @@ def fetch_single_stock(
         print("-" * 80)
         print()
         
-        # 显示统计信息
+        # 显示统计信息（直接在 numpy 数组上计算，与 pandas 一样忽略空值）
+        high_max = np.nanmax(df_filtered['最高'].to_numpy(dtype=np.float64))
+        low_min = np.nanmin(df_filtered['最低'].to_numpy(dtype=np.float64))
+        volume_mean = np.nanmean(df_filtered['成交量'].to_numpy(dtype=np.float64))
+        
         print("数据统计：")
         print(f"  起始日期: {df_filtered['日期'].iloc[0]}")
         print(f"  结束日期: {df_filtered['日期'].iloc[-1]}")
         print(f"  记录条数: {len(df_filtered)}")
-        print(f"  最高价: {df_filtered['最高'].max():.2f}")
-        print(f"  最低价: {df_filtered['最低'].min():.2f}")
-        print(f"  平均成交量: {df_filtered['成交量'].mean():.0f}")
+        print(f"  最高价: {high_max:.2f}")
+        print(f"  最低价: {low_min:.2f}")
+        print(f"  平均成交量: {volume_mean:.0f}")
         print()
         
         return True
@@ -274,6 +345,82 @@ def interactive_mode():
     fetch_single_stock(stock_code, start_date, end_date, adjust_type, preferred_source=preferred_source)
 
 
+def fetch_many(
+    stock_codes: List[str],
+    max_workers: int = 8,
+    requests_per_minute: int = 90,
+    preferred_source: str = "baostock",
+    start_date: str = "20000101",
+    end_date: str = None,
+    adjust_type: str = "qfq"
+) -> Dict[str, bool]:
+    """
+    批量获取多只股票的历史数据（全量替换模式，使用默认输出路径）
+    
+    数据请求交给 MultiSourceFetcher.fetch_many 并发发出（各数据源按 requests_per_minute 分别限速，
+    baostock 由其内部锁串行访问）；停牌过滤、写文件和元数据更新在线程池中并行执行，
+    各线程不输出信息，由主线程逐只输出一行结果
+    
+    Args:
+        stock_codes: 股票代码列表
+        max_workers: 线程数
+        requests_per_minute: 每个数据源每分钟最多发起的请求数
+        preferred_source: 优先数据源（baostock/akshare/yfinance）
+        start_date: 开始日期（格式：YYYYMMDD）
+        end_date: 结束日期（格式：YYYYMMDD，None表示昨天）
+        adjust_type: 复权类型（qfq/hfq/''）
+    
+    Returns:
+        Dict[str, bool]: {"股票代码": 是否成功, ...}
+    """
+    stock_codes = [code.zfill(6) for code in stock_codes]
+    stock_names = {code: get_stock_name(code) for code in stock_codes}
+    end_date = _resolve_end_date(end_date)
+    
+    cn_dir = os.path.join(OUTPUT_DIR, CN_DIR)
+    os.makedirs(cn_dir, exist_ok=True)
+    
+    interval = 60.0 / requests_per_minute
+    rate_limiters = {source: RateLimiter(interval, interval) for source in DATA_SOURCES}
+    
+    # 所有线程共用一个元数据管理器（内部有锁；批量获取期间延迟写入，结束时写入一次）
+    metadata_mgr = MetadataManager(cn_dir, STORAGE_FORMAT)
+    
+    def save_one(stock_code: str, result) -> Tuple[bool, str]:
+        """过滤并保存一只股票的数据，返回 (是否成功, 结果说明)"""
+        if result.data is None:
+            if result.source == "no_data":
+                return False, "无数据（可能是节假日/停牌/未上市）"
+            return False, "所有数据源均失败"
+        
+        try:
+            df_filtered, _ = filter_suspended_trading_data(result.data)
+            if df_filtered.empty:
+                # 仍需更新元数据，避免下次重复拉取
+                metadata_mgr.update_last_date(stock_code, end_date)
+                return False, "过滤后无有效数据（全部为停牌数据）"
+            
+            _save_full(df_filtered, get_stock_file_path(cn_dir, stock_code, STORAGE_FORMAT), stock_code)
+            metadata_mgr.update_last_date(stock_code, end_date)
+            return True, f"{len(df_filtered)} 条记录（来源：{result.source}）"
+        except Exception as e:
+            return False, f"保存失败: {e}"
+    
+    requests = [
+        (code, stock_names[code], start_date, end_date, adjust_type)
+        for code in stock_codes
+    ]
+    with MultiSourceFetcher(preferred_source=preferred_source, rate_limiters=rate_limiters) as fetcher, metadata_mgr:
+        fetch_results = fetcher.fetch_many(requests, max_workers=max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(save_one, stock_codes, [fetch_results[code] for code in stock_codes]))
+    
+    for code, (ok, message) in zip(stock_codes, outcomes):
+        print(f"{'✅' if ok else '❌'} {code} {stock_names[code]}: {message}")
+    
+    return {code: ok for code, (ok, _) in zip(stock_codes, outcomes)}
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -285,6 +432,7 @@ def main():
   %(prog)s 600519 --start 20240101 --end 20240131   # 获取贵州茅台2024年1月数据
   %(prog)s 000001 --output my_data.csv              # 保存到指定文件
   %(prog)s 000001 --source akshare                  # 使用akshare作为优先数据源
+  %(prog)s --codes 000001,600519 --workers 4        # 批量获取多只股票
   %(prog)s                                          # 交互式输入
 """
     )
@@ -313,7 +461,7 @@ def main():
     parser.add_argument(
         '--output',
         default=None,
-        help='输出文件路径（默认：data/CN/stock_{代码}.csv）'
+        help='输出文件路径（默认：data/CN/stock_{代码}.csv，扩展名随 STORAGE_FORMAT）'
     )
     parser.add_argument(
         '--source',
@@ -322,10 +470,38 @@ def main():
         help='优先数据源（baostock=BaoStock, akshare=AkShare, yfinance=YFinance，默认：baostock）'
     )
     
+    parser.add_argument(
+        '--codes',
+        default=None,
+        help='批量获取的股票代码，逗号分隔（如 000001,600519），使用默认输出路径'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='批量获取时的线程数（默认：8）'
+    )
+    
     args = parser.parse_args()
     
+    # 批量模式
+    if args.codes:
+        codes = [code.strip() for code in args.codes.split(',') if code.strip()]
+        results = fetch_many(
+            codes,
+            max_workers=args.workers,
+            preferred_source=args.source,
+            start_date=args.start,
+            end_date=args.end,
+            adjust_type=args.adjust
+        )
+        failed = [code for code, ok in results.items() if not ok]
+        print(f"批量获取完成: 成功 {len(results) - len(failed)} 只，失败 {len(failed)} 只")
+        if failed:
+            print(f"失败列表: {', '.join(failed)}")
+            sys.exit(1)
     # 如果没有提供股票代码，进入交互式模式
-    if args.stock_code is None:
+    elif args.stock_code is None:
         interactive_mode()
     else:
         success = fetch_single_stock(
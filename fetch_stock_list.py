@@ -18,6 +18,7 @@ A股股票列表获取脚本
     - 获取全部 A 股股票列表（沪深两市所有板块）
     - 包含股票代码和股票名称
     - 自动导出为 CSV 文件：data/CN/stock_list.csv
+      （安装了 pyarrow 时同时写入 stock_list.feather，供其他脚本快速读取）
     - 对比旧文件，显示新增/删除的股票
     - 为新增股票生成历史数据获取命令
     - 后续批量获取脚本会读取这个列表
@@ -52,6 +53,8 @@ import pandas as pd
 import akshare as ak
 from datetime import datetime
 from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE
+from utils import read_stock_list, save_stock_list
+from fetchers import PREFIX_MARKET
 
 # ========== 日志配置 ==========
 # 创建日志目录
@@ -61,14 +64,21 @@ os.makedirs(log_dir, exist_ok=True)
 # 使用固定的日志文件名（按日期），追加模式
 log_filename = os.path.join(log_dir, f"stock_list_{datetime.now().strftime('%Y%m%d')}.log")
 
-# 打开日志文件（追加模式）
+# 打开日志文件（追加模式，块缓冲，关闭时统一刷新）
 log_file = open(log_filename, 'a', encoding='utf-8')
 
 def log_both(msg):
     """同时输出到控制台和文件"""
     print(msg)
     log_file.write(msg + '\n')
-    log_file.flush()
+
+def log_both_lines(lines):
+    """同时输出多行到控制台和文件（合并为一次写入）"""
+    if not lines:
+        return
+    block = '\n'.join(lines) + '\n'
+    print(block, end='')
+    log_file.write(block)
 
 def log_console(msg):
     """仅输出到控制台"""
@@ -77,7 +87,6 @@ def log_console(msg):
 def log_file_only(msg):
     """仅输出到文件"""
     log_file.write(msg + '\n')
-    log_file.flush()
 
 
 def load_old_stock_list(file_path: str) -> pd.DataFrame:
@@ -92,7 +101,7 @@ def load_old_stock_list(file_path: str) -> pd.DataFrame:
     """
     if os.path.exists(file_path):
         try:
-            return pd.read_csv(file_path, dtype={'code': str})
+            return read_stock_list(file_path)
         except Exception as e:
             log_console(f"⚠️  加载旧股票列表失败: {e}")
             return pd.DataFrame(columns=['code', 'name'])
@@ -113,17 +122,17 @@ def compare_stock_lists(old_df: pd.DataFrame, new_df: pd.DataFrame) -> tuple:
     if old_df.empty:
         return new_df, pd.DataFrame(columns=['code', 'name'])
     
-    # 提取股票代码集合
-    old_codes = set(old_df['code'])
-    new_codes = set(new_df['code'])
+    # 统一为6位代码后作为索引
+    old_codes = pd.Index(old_df['code'].astype(str).str.zfill(6), name='code')
+    new_codes = pd.Index(new_df['code'].astype(str).str.zfill(6), name='code')
     
-    # 找出新增和删除的股票代码
-    added_codes = new_codes - old_codes
-    removed_codes = old_codes - new_codes
+    # 找出新增和删除的股票代码（Index 集合运算，结果已排序）
+    added_codes = new_codes.difference(old_codes, sort=True)
+    removed_codes = old_codes.difference(new_codes, sort=True)
     
-    # 提取对应的股票信息
-    added_stocks = new_df[new_df['code'].isin(added_codes)].sort_values('code')
-    removed_stocks = old_df[old_df['code'].isin(removed_codes)].sort_values('code')
+    # 按代码索引直接取出对应的股票信息（顺序与排序后的代码一致）
+    added_stocks = new_df.drop(columns='code').set_axis(new_codes).loc[added_codes].reset_index()
+    removed_stocks = old_df.drop(columns='code').set_axis(old_codes).loc[removed_codes].reset_index()
     
     return added_stocks, removed_stocks
 
@@ -195,27 +204,13 @@ if not old_stock_list.empty:
         # 仅控制台：显示"按股票代码排序:"
         log_console("按股票代码排序:")
         
-        for _, row in added_stocks.iterrows():
-            code = row['code']
-            name = row['name']
-            
-            # 判断板块
-            if code.startswith('000') or code.startswith('001'):
-                market = '深圳主板'
-            elif code.startswith('002'):
-                market = '深圳中小板'
-            elif code.startswith('003'):
-                market = '深圳'
-            elif code.startswith('300'):
-                market = '创业板'
-            elif code.startswith('600') or code.startswith('601') or code.startswith('603'):
-                market = '上海主板'
-            elif code.startswith('688'):
-                market = '科创板'
-            else:
-                market = '其他'
-            
-            log_both(f"  {code} {name:12s} [{market}]")
+        # 按代码前3位一次性判断板块
+        markets = added_stocks['code'].str[:3].map(PREFIX_MARKET).fillna('其他')
+        
+        log_both_lines([
+            f"  {code} {name:12s} [{market}]"
+            for code, name, market in zip(added_stocks['code'], added_stocks['name'], markets)
+        ])
         
         log_both("")
         
@@ -227,9 +222,7 @@ if not old_stock_list.empty:
         log_console("方式1: 逐个获取（推荐，可以指定日期范围）")
         log_console("")
         
-        for _, row in added_stocks.head(10).iterrows():
-            code = row['code']
-            name = row['name']
+        for code, name in added_stocks.head(10).itertuples(index=False, name=None):
             log_console(f"  make single CODE={code}  # {name}")
         
         if len(added_stocks) > 10:
@@ -254,10 +247,9 @@ if not old_stock_list.empty:
         log_both("="*80)
         log_both("")
         
-        for _, row in removed_stocks.iterrows():
-            code = row['code']
-            name = row['name']
-            log_both(f"  {code} {name}")
+        log_both_lines([
+            f"  {code} {name}" for code, name in removed_stocks.itertuples(index=False, name=None)
+        ])
         
         log_both("")
         
@@ -275,7 +267,7 @@ log_both("保存股票列表")
 log_both("="*80)
 log_both("")
 
-new_stock_list.to_csv(output_file, index=False, encoding="utf-8-sig")
+save_stock_list(new_stock_list, output_file)
 log_both(f"✅ 数据已保存到: {output_file}")
 log_both(f"   文件大小: {os.path.getsize(output_file) / 1024:.2f} KB")
 log_both("")
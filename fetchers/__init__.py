@@ -6,7 +6,10 @@
 
 from .akshare_fetcher import AkshareFetcher
 from .baostock_fetcher import BaostockFetcher
+from .baostock_pool import BaostockPool
 from .yfinance_fetcher import YFinanceFetcher
-from .multi_source_fetcher import MultiSourceFetcher, FetchResult
+from .multi_source_fetcher import MultiSourceFetcher, FetchResult, DATA_SOURCES
+from ._codes import PREFIX_MARKET, SZ_PREFIXES, SH_PREFIXES
 
-__all__ = ['AkshareFetcher', 'BaostockFetcher', 'YFinanceFetcher', 'MultiSourceFetcher', 'FetchResult']
+__all__ = ['AkshareFetcher', 'BaostockFetcher', 'BaostockPool', 'YFinanceFetcher', 'MultiSourceFetcher', 'FetchResult', 'DATA_SOURCES',
+           'PREFIX_MARKET', 'SZ_PREFIXES', 'SH_PREFIXES']
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+股票代码格式转换
+各数据源对交易所前缀/后缀的写法不同，统一在这里转换（6 开头为上海，其余为深圳）
+"""
+
+# 股票代码前3位 -> (交易所, 板块)，各脚本的市场判断和板块统计都以此为准
+CODE_PREFIXES = {
+    '000': ('SZ', '深圳主板'),
+    '001': ('SZ', '深圳主板'),
+    '002': ('SZ', '深圳中小板'),
+    '003': ('SZ', '深圳'),
+    '300': ('SZ', '创业板'),
+    '600': ('SH', '上海主板'),
+    '601': ('SH', '上海主板'),
+    '603': ('SH', '上海主板'),
+    '688': ('SH', '科创板'),
+}
+
+# 股票代码前3位 -> 板块
+PREFIX_MARKET = {prefix: board for prefix, (_, board) in CODE_PREFIXES.items()}
+
+# 各交易所的股票代码前3位（元组，可直接用于 in 判断和 np.isin）
+SZ_PREFIXES = tuple(prefix for prefix, (exchange, _) in CODE_PREFIXES.items() if exchange == 'SZ')
+SH_PREFIXES = tuple(prefix for prefix, (exchange, _) in CODE_PREFIXES.items() if exchange == 'SH')
+
+
+def get_exchange(stock_code: str) -> str:
+    """
+    获取股票代码所属交易所（前缀不在 CODE_PREFIXES 中时按首位判断：6 开头为上海，其余为深圳）
+    
+    Args:
+        stock_code: 6位股票代码
+    
+    Returns:
+        str: 'SH'（上海）或 'SZ'（深圳）
+    """
+    entry = CODE_PREFIXES.get(stock_code[:3])
+    if entry is not None:
+        return entry[0]
+    return 'SH' if stock_code[0] == '6' else 'SZ'
+
+
+def to_baostock_code(stock_code: str) -> str:
+    """
+    转换为 baostock 代码格式：000001 -> sz.000001, 600519 -> sh.600519
+    
+    Args:
+        stock_code: 6位股票代码
+    
+    Returns:
+        str: baostock 格式的代码
+    """
+    return get_exchange(stock_code).lower() + '.' + stock_code
+
+
+def to_yfinance_code(stock_code: str) -> str:
+    """
+    转换为 yfinance 代码格式：000001 -> 000001.SZ, 600519 -> 600519.SS
+    
+    Args:
+        stock_code: 6位股票代码
+    
+    Returns:
+        str: yfinance 格式的代码
+    """
+    return stock_code + ('.SS' if get_exchange(stock_code) == 'SH' else '.SZ')
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+数据源异常分类
+区分临时性错误（网络连接失败、超时、限流、5xx，值得重试）和其他错误，
+供各数据源决定是否向上抛出、由 MultiSourceFetcher 决定是否重试
+"""
+
+try:
+    import requests
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+# 可重试的 HTTP 状态码（限流和网关/服务临时不可用）
+TRANSIENT_HTTP_STATUS = frozenset([429, 500, 502, 503, 504])
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    判断异常是否为临时性错误（网络连接失败、超时、限流、5xx）
+    
+    Args:
+        error: 数据源抛出的异常
+    
+    Returns:
+        bool: 临时性错误返回 True（值得重试），其他错误（如 ValueError、KeyError）返回 False
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if HAS_REQUESTS:
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        if isinstance(error, requests.HTTPError):
+            response = error.response
+            return response is not None and response.status_code in TRANSIENT_HTTP_STATUS
+    return False
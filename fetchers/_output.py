@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+数据源输出屏蔽工具
+baostock、yfinance 会直接向 stdout/stderr 打印信息，获取数据时需要临时屏蔽
+
+多个线程同时屏蔽时（如并发检查数据源可用性），各自保存/恢复 sys.stdout 会互相覆盖，
+导致输出无法恢复；这里按引用计数处理：第一个进入时替换，最后一个退出时恢复
+"""
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_devnull = None
+_depth = {'stdout': 0, 'stderr': 0}
+_saved = {}
+
+
+def _enter(stream: str) -> None:
+    """屏蔽指定输出流（引用计数 +1）"""
+    global _devnull
+    with _lock:
+        if _depth[stream] == 0:
+            if _devnull is None:
+                _devnull = open(os.devnull, 'w')
+            _saved[stream] = getattr(sys, stream)
+            setattr(sys, stream, _devnull)
+        _depth[stream] += 1
+
+
+def _exit(stream: str) -> None:
+    """恢复指定输出流（引用计数 -1，归零时恢复）"""
+    with _lock:
+        _depth[stream] -= 1
+        if _depth[stream] == 0:
+            setattr(sys, stream, _saved.pop(stream))
+
+
+@contextmanager
+def suppress_output(stdout: bool = True, stderr: bool = False):
+    """
+    临时屏蔽标准输出/标准错误（线程安全，可嵌套）
+    
+    Args:
+        stdout: 是否屏蔽标准输出
+        stderr: 是否屏蔽标准错误
+    """
+    streams = [name for name, enabled in (('stdout', stdout), ('stderr', stderr)) if enabled]
+    for stream in streams:
+        _enter(stream)
+    try:
+        yield
+    finally:
+        for stream in reversed(streams):
+            _exit(stream)
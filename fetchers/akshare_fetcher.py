@@ -4,8 +4,19 @@ Akshare 数据源模块
 提供 A 股历史数据获取功能
 """
 
+import time
+import asyncio
 import pandas as pd
-import akshare as ak
+from ._errors import is_transient_error
+
+# 可用性检查结果的缓存时间（秒），避免频繁发起探测请求
+AVAILABILITY_TTL = 60
+
+# 统一保留2位小数的数值列
+NUMERIC_COLS = ['开盘', '收盘', '最高', '最低', '涨跌幅', '涨跌额', '振幅', '换手率']
+
+# 可能为空、需要填充为 0 的列（第一行可能没有涨跌额、振幅等数据）
+FILL_ZERO = {'涨跌额': 0, '振幅': 0}
 
 
 class AkshareFetcher:
@@ -13,12 +24,37 @@ class AkshareFetcher:
     
     def __init__(self):
         """初始化 akshare fetcher"""
-        pass
+        self._available = None
+        self._checked_at = 0.0
     
     def is_available(self):
         """
         检查 akshare 数据源是否可用
-        通过获取一个测试股票的最近1天数据来验证
+        通过获取一个测试股票的最近1天数据来验证，结果缓存 AVAILABILITY_TTL 秒
+        
+        Returns:
+            bool: True 表示可用，False 表示不可用
+        """
+        now = time.monotonic()
+        if self._available is not None and now - self._checked_at < AVAILABILITY_TTL:
+            return self._available
+        
+        self._available = self._probe()
+        self._checked_at = now
+        return self._available
+    
+    async def is_available_async(self):
+        """
+        异步检查 akshare 数据源是否可用（在线程中执行 is_available）
+        
+        Returns:
+            bool: True 表示可用，False 表示不可用
+        """
+        return await asyncio.to_thread(self.is_available)
+    
+    def _probe(self):
+        """
+        发起一次探测请求
         
         Returns:
             bool: True 表示可用，False 表示不可用
@@ -27,6 +63,7 @@ class AkshareFetcher:
             # 使用贵州茅台(600519)作为测试股票，获取最近1天数据
             from datetime import datetime, timedelta
             test_date = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+            import akshare as ak  # 首次使用时才导入（akshare 导入较慢）
             df = ak.stock_zh_a_hist(
                 symbol="600519",
                 period="daily",
@@ -38,21 +75,26 @@ class AkshareFetcher:
         except Exception:
             return False
     
-    def fetch(self, stock_code, start_date, end_date, adjust_type='qfq'):
+    def fetch(self, stock_code, start_date, end_date, adjust_type='qfq', stock_name=None):
         """
         从 akshare 获取数据（保留原始字段）
         
+        临时性错误（网络连接失败、超时、限流、5xx）原样抛出，由 MultiSourceFetcher 重试；
+        其他错误视为无数据，返回 None
+        
         Args:
             stock_code: 股票代码（6位，如 '000001'）
             start_date: 开始日期（格式：'20260201'）
             end_date: 结束日期（格式：'20260210'）
             adjust_type: 复权类型，'qfq'(前复权), 'hfq'(后复权), ''(不复权)
+            stock_name: 股票名称（可选，传入时添加为第2列"股票名称"）
         
         Returns:
             DataFrame: 标准化后的数据
             None: 如果获取失败或无数据
         """
         try:
+            import akshare as ak  # 首次使用时才导入（akshare 导入较慢）
             df = ak.stock_zh_a_hist(
                 symbol=stock_code,
                 period="daily",
@@ -65,23 +107,27 @@ class AkshareFetcher:
                 return None
             
             # 保持 akshare 原始列名，只做格式统一
-            df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
+            # 已是 datetime 类型时直接格式化，否则解析一次再格式化
+            if pd.api.types.is_datetime64_any_dtype(df['日期']):
+                df['日期'] = df['日期'].dt.strftime('%Y-%m-%d')
+            else:
+                df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
             df['股票代码'] = stock_code
             
             # 确保股票代码为字符串类型（保留前导零）
             df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
             
-            # 填充空值（第一行可能没有涨跌额、振幅等数据）
-            df['涨跌额'] = df['涨跌额'].fillna(0)
-            df['振幅'] = df['振幅'].fillna(0)
+            # 填充空值并统一数值精度（保留2位小数），整块一次赋值
+            cols = [col for col in NUMERIC_COLS if col in df.columns]
+            df[cols] = df[cols].fillna(FILL_ZERO).round(2)
             
-            # 统一数值精度（保留2位小数）
-            numeric_cols = ['开盘', '收盘', '最高', '最低', '涨跌幅', '涨跌额', '振幅', '换手率']
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = df[col].round(2)
+            # akshare 返回的是已构造好的 DataFrame，只能插入名称列
+            if stock_name is not None:
+                df.insert(1, '股票名称', stock_name)
             
             return df
             
         except Exception as e:
+            if is_transient_error(e):
+                raise
             return None
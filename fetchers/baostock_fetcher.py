@@ -4,12 +4,28 @@ Baostock 数据源模块
 提供 A 股历史数据获取功能
 """
 
-import sys
-import os
+import asyncio
+import numpy as np
 import pandas as pd
-import baostock as bs
+from ._codes import to_baostock_code
+from ._output import suppress_output
 
 
+def _to_float(text):
+    """
+    将 baostock 返回的字符串转为 float，空字符串或非数字内容返回 NaN
+    
+    Args:
+        text: 字段字符串
+    
+    Returns:
+        float: 转换结果
+    """
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
 class BaostockFetcher:
     """Baostock 数据获取器"""
     
@@ -32,6 +48,15 @@ class BaostockFetcher:
         except Exception:
             return False
     
+    async def is_available_async(self):
+        """
+        异步检查 baostock 数据源是否可用（在线程中执行 is_available）
+        
+        Returns:
+            bool: True 表示可用，False 表示不可用
+        """
+        return await asyncio.to_thread(self.is_available)
+    
     def login(self, silent=False):
         """
         登录 baostock
@@ -40,25 +65,16 @@ class BaostockFetcher:
             silent: 是否静默登录（不打印消息）
         """
         if not self.is_logged_in:
-            # 禁用 baostock 的输出
-            if silent:
-                old_stdout = sys.stdout
-                sys.stdout = open(os.devnull, 'w')
-            
-            try:
+            # 禁用 baostock 的输出（退出上下文时自动恢复）
+            import baostock as bs  # 首次使用时才导入
+            with suppress_output(stdout=silent):
                 lg = bs.login()
-                if lg.error_code == '0':
-                    self.is_logged_in = True
-                    return True
-                else:
-                    if not silent:
-                        print(f"login failed: {lg.error_msg}")
-                    return False
-            finally:
-                # 恢复输出
-                if silent:
-                    sys.stdout.close()
-                    sys.stdout = old_stdout
+            if lg.error_code == '0':
+                self.is_logged_in = True
+                return True
+            if not silent:
+                print(f"login failed: {lg.error_msg}")
+            return False
         return True
     
     def logout(self, silent=False):
@@ -69,22 +85,14 @@ class BaostockFetcher:
             silent: 是否静默登出（不打印消息）
         """
         if self.is_logged_in:
-            # 禁用 baostock 的输出
-            if silent:
-                old_stdout = sys.stdout
-                sys.stdout = open(os.devnull, 'w')
-            
-            try:
+            # 禁用 baostock 的输出（退出上下文时自动恢复）
+            import baostock as bs
+            with suppress_output(stdout=silent):
                 bs.logout()
-            finally:
-                # 恢复输出
-                if silent:
-                    sys.stdout.close()
-                    sys.stdout = old_stdout
             
             self.is_logged_in = False
     
-    def fetch(self, stock_code, start_date, end_date):
+    def fetch(self, stock_code, start_date, end_date, stock_name=None, skip_suspended=True):
         """
         从 baostock 获取数据并计算缺失字段
         
@@ -92,6 +100,9 @@ class BaostockFetcher:
             stock_code: 股票代码（6位，如 '000001'）
             start_date: 开始日期（格式：'20260201'）
             end_date: 结束日期（格式：'20260210'）
+            stock_name: 股票名称（可选，传入时作为第2列"股票名称"一并构造）
+            skip_suspended: 是否在读取时跳过停牌日（成交量或成交额为空/为 0），默认跳过；
+                需要保留原始停牌记录时（如 scripts/restore_original_data.py）传 False
         
         Returns:
             DataFrame: 标准化后的数据，列名与 akshare 一致
@@ -107,12 +118,10 @@ class BaostockFetcher:
         end = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
         
         # 转换股票代码格式：000001 -> sz.000001, 600519 -> sh.600519
-        if stock_code.startswith('6'):
-            bs_code = f"sh.{stock_code}"
-        else:
-            bs_code = f"sz.{stock_code}"
+        bs_code = to_baostock_code(stock_code)
         
         # 查询数据
+        import baostock as bs
         rs = bs.query_history_k_data_plus(
             bs_code,
             "date,code,open,high,low,close,volume,amount,pctChg,turn",
@@ -122,63 +131,79 @@ class BaostockFetcher:
             adjustflag="2"  # 2:前复权
         )
         
-        # 提取数据
-        data_list = []
-        while (rs.error_code == '0') & rs.next():
-            data_list.append(rs.get_row_data())
-        
-        if not data_list:
+        # 流式读取：日期放入列表，数值字段在读取时直接转为 float，
+        # 由 np.fromiter 写入 (行数, 8) 的 float64 数组，不再保留字符串行列表
+        # skip_suspended 为 True 时，停牌日（成交量或成交额为空/为 0）在这里直接跳过，
+        # 不进入后续的 DataFrame 处理，与 filter_suspended_trading_data 的判断一致
+        col = {name: i for i, name in enumerate(rs.fields)}
+        numeric_fields = ['open', 'high', 'low', 'close', 'volume', 'amount', 'pctChg', 'turn']
+        numeric_idx = [col[name] for name in numeric_fields]
+        date_idx = col['date']
+        volume_idx = col['volume']
+        amount_idx = col['amount']
+        dates = []
+        append_date = dates.append
+        next_row = rs.next
+        get_row_data = rs.get_row_data
+        
+        def iter_rows():
+            while (rs.error_code == '0') & next_row():
+                row = get_row_data()
+                if skip_suspended and (not row[volume_idx] or not row[amount_idx]):
+                    continue
+                # baostock 数值均为数字字符串，缺失值（如停牌日换手率）为空字符串
+                try:
+                    values = tuple([float(row[i] or 'nan') for i in numeric_idx])
+                except ValueError:
+                    # 出现非数字内容时逐个转换（无法解析的值置为 NaN）
+                    values = tuple([_to_float(row[i]) for i in numeric_idx])
+                if skip_suspended and (values[4] <= 0 or values[5] <= 0):
+                    continue
+                append_date(row[date_idx])
+                yield values
+        
+        values = np.fromiter(iter_rows(), dtype=np.dtype((np.float64, len(numeric_fields))))
+        
+        if not dates:
             return None
         
-        df = pd.DataFrame(data_list, columns=rs.fields)
-        
-        # 转换数值类型
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'amount', 'pctChg', 'turn']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # 计算缺失字段
-        # 1. 涨跌额 = 收盘价 - 昨日收盘价
-        df['change'] = (df['close'] - df['close'].shift(1)).fillna(0)
-        
-        # 2. 振幅 = (最高价 - 最低价) / 昨日收盘价 * 100
-        prev_close = df['close'].shift(1)
-        df['amplitude'] = ((df['high'] - df['low']) / prev_close * 100).fillna(0)
-        
-        # 标准化列名（与 akshare 保持一致）
-        df = df.rename(columns={
-            'date': '日期',
-            'code': '股票代码',
-            'open': '开盘',
-            'close': '收盘',
-            'high': '最高',
-            'low': '最低',
-            'volume': '成交量',
-            'amount': '成交额',
-            'pctChg': '涨跌幅',
-            'change': '涨跌额',
-            'amplitude': '振幅',
-            'turn': '换手率'
+        # 按最终列顺序直接构造结果（不再经过英文列名 DataFrame、rename 和调整列顺序）
+        open_, high, low, close, volume, amount, pct_chg, turn = values.T
+        
+        # 计算缺失字段（第一行没有昨日收盘价，填充为 0）
+        prev_close = np.empty_like(close)
+        prev_close[0] = np.nan
+        prev_close[1:] = close[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 1. 涨跌额 = 收盘价 - 昨日收盘价
+            change = np.nan_to_num(close - prev_close, nan=0.0, posinf=np.inf, neginf=-np.inf)
+            # 2. 振幅 = (最高价 - 最低价) / 昨日收盘价 * 100
+            amplitude = np.nan_to_num((high - low) / prev_close * 100, nan=0.0, posinf=np.inf, neginf=-np.inf)
+        
+        # 成交量为整数字符串，与 pd.to_numeric 一致保持整数类型（写入CSV时不带 .0）
+        if not np.isnan(volume).any() and (volume == np.floor(volume)).all():
+            volume = volume.astype(np.int64)
+        
+        # 列名与 akshare 保持一致，数值统一保留2位小数
+        # 股票代码统一为6位代码；日期：baostock 已返回 YYYY-MM-DD 字符串，无需再解析格式化
+        columns = {'日期': dates}
+        if stock_name is not None:
+            columns['股票名称'] = stock_name
+        columns.update({
+            '股票代码': stock_code.zfill(6),
+            '开盘': np.round(open_, 2),
+            '收盘': np.round(close, 2),
+            '最高': np.round(high, 2),
+            '最低': np.round(low, 2),
+            '成交量': volume,
+            '成交额': amount,
+            '振幅': np.round(amplitude, 2),
+            '涨跌幅': np.round(pct_chg, 2),
+            '涨跌额': np.round(change, 2),
+            '换手率': np.round(turn, 2),
         })
         
-        # 统一数据格式
-        df['股票代码'] = stock_code  # 统一为6位代码
-        df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
-        
-        # 确保股票代码为字符串类型（保留前导零）
-        df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
-        
-        # 统一数值精度（保留2位小数）
-        numeric_cols = ['开盘', '收盘', '最高', '最低', '涨跌幅', '涨跌额', '振幅', '换手率']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = df[col].round(2)
-        
-        # 调整列顺序，与 akshare 一致
-        column_order = ['日期', '股票代码', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
-        df = df[[col for col in column_order if col in df.columns]]
-        
-        return df
+        return pd.DataFrame(columns)
     
     def __enter__(self):
         """上下文管理器：进入"""
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Baostock 多进程会话池
+
+baostock 的登录会话保存在模块级全局变量中（整个进程共用一个 socket），
+同一进程内创建多个 BaostockFetcher 并不能得到多个独立会话；
+这里为每个工作进程单独登录一次，实现真正并行的 baostock 查询
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import util
+from .baostock_fetcher import BaostockFetcher
+
+# 工作进程内的获取器（每个进程登录一次，进程退出时登出）
+_worker_fetcher = None
+
+
+def _init_worker():
+    """工作进程初始化：登录 baostock"""
+    global _worker_fetcher
+    _worker_fetcher = BaostockFetcher()
+    _worker_fetcher.login(silent=True)
+    # 工作进程退出时不会执行 atexit，使用 multiprocessing 的退出回调登出
+    util.Finalize(None, _worker_fetcher.logout, kwargs={'silent': True}, exitpriority=10)
+
+
+def _worker_fetch(stock_code, start_date, end_date, stock_name=None, skip_suspended=True):
+    """在工作进程中获取数据（参数与 BaostockFetcher.fetch 一致）"""
+    return _worker_fetcher.fetch(stock_code, start_date, end_date, stock_name, skip_suspended)
+
+
+class BaostockPool:
+    """
+    Baostock 多进程会话池
+    
+    每个工作进程持有一个独立登录的 baostock 会话，fetch() 可在多个线程中同时调用
+    进程数不宜过多，避免超过 baostock 对单个 IP 的并发限制
+    """
+    
+    def __init__(self, processes: int = 4):
+        """
+        初始化会话池（工作进程在首次提交任务时启动并登录）
+        
+        Args:
+            processes: 工作进程数（即同时登录的会话数）
+        """
+        self.processes = processes
+        self._executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker)
+    
+    def fetch(self, stock_code, start_date, end_date, stock_name=None, skip_suspended=True):
+        """
+        在空闲的工作进程中获取数据（阻塞直到返回）
+        
+        Args:
+            stock_code: 股票代码（6位，如 '000001'）
+            start_date: 开始日期（格式：'20260201'）
+            end_date: 结束日期（格式：'20260210'）
+            stock_name: 股票名称（可选）
+            skip_suspended: 是否跳过停牌日（默认跳过）
+        
+        Returns:
+            DataFrame: 标准化后的数据，与 BaostockFetcher.fetch 一致
+            None: 如果获取失败或无数据
+        """
+        return self._executor.submit(
+            _worker_fetch, stock_code, start_date, end_date, stock_name, skip_suspended
+        ).result()
+    
+    def close(self):
+        """关闭会话池（工作进程退出时自动登出）"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+    
+    def __enter__(self):
+        """上下文管理器：进入"""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器：退出"""
+        self.close()
+        return False
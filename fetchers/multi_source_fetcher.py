@@ -4,12 +4,19 @@
 提供自动降级的数据获取策略
 """
 
+import time
+import random
+import asyncio
 import logging
-from typing import NamedTuple, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
 import pandas as pd
 from .akshare_fetcher import AkshareFetcher
 from .baostock_fetcher import BaostockFetcher
+from .baostock_pool import BaostockPool
 from .yfinance_fetcher import YFinanceFetcher
+from ._errors import is_transient_error
 
 
 # 定义返回结果的命名元组（使用 typing.NamedTuple 更现代）
@@ -20,6 +27,45 @@ class FetchResult(NamedTuple):
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 支持的数据源（默认优先级顺序）
+DATA_SOURCES = ('baostock', 'akshare', 'yfinance')
+
+# 单个数据源可用性检查的超时时间（秒）
+SOURCE_CHECK_TIMEOUT = 10
+
+# 可用性检查结果的缓存时间（秒），短时间内重复检查直接返回上次结果
+SOURCE_STATUS_TTL = 60
+
+# 单个数据源遇到临时性错误时的重试次数和退避基数（秒）
+# 第 i 次重试前等待 base * 2^i 秒，再加上 [0, base) 的随机抖动
+FETCH_RETRY_ATTEMPTS = 3
+FETCH_RETRY_BASE = 0.3
+
+
+def _call_with_retry(fetch_func, attempts: int = FETCH_RETRY_ATTEMPTS, base: float = FETCH_RETRY_BASE):
+    """
+    调用数据源，遇到临时性错误时按指数退避重试（带随机抖动）
+    
+    非临时性错误或重试次数用完时，原样抛出最后一次的异常
+    
+    Args:
+        fetch_func: 无参数的数据获取函数
+        attempts: 最多尝试次数（包含第一次）
+        base: 退避基数（秒）
+    
+    Returns:
+        fetch_func 的返回值
+    """
+    for attempt in range(attempts):
+        try:
+            return fetch_func()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient_error(e):
+                raise
+            delay = base * (2 ** attempt) + random.random() * base
+            logger.debug(f"    ▶️ 临时性错误，{delay:.2f} 秒后重试（第 {attempt + 1} 次）: {e}")
+            time.sleep(delay)
+
 
 class MultiSourceFetcher:
     """
@@ -30,7 +76,7 @@ class MultiSourceFetcher:
     可自定义优先数据源
     """
     
-    def __init__(self, preferred_source: str = 'baostock'):
+    def __init__(self, preferred_source: str = 'baostock', baostock_processes: int = 0, rate_limiters: Optional[Dict] = None):
         """
         初始化所有数据源
         
@@ -39,66 +85,182 @@ class MultiSourceFetcher:
                 - 'baostock': BaoStock（默认，数据最完整）
                 - 'akshare': AkShare（速度快，但可能被限流）
                 - 'yfinance': YFinance（国际数据源，A股支持有限）
+            baostock_processes: baostock 工作进程数（默认 0，即在当前进程中串行访问）
+                大于 0 时 baostock 查询在多进程会话池中执行，fetch_many 可并行获取 baostock 数据
+            rate_limiters: 各数据源的限速器 {数据源: RateLimiter}（可选），每次请求该数据源前调用其 wait()；
+                各数据源分别限速，切换到备用数据源时不必等待前一个数据源的间隔
         """
-        self.akshare_fetcher = AkshareFetcher()
-        self.baostock_fetcher = None  # 延迟初始化，使用时才创建
-        self.yfinance_fetcher = YFinanceFetcher()
+        # 各数据源都延迟初始化，只有实际用到时才导入对应的库
+        self._akshare_fetcher = None
+        self.baostock_fetcher = None  # 延迟初始化，使用时才创建（需要登录）
+        self._yfinance_fetcher = None
+        self._init_lock = threading.Lock()
+        # 最近一次可用性检查结果 (检查时间, 状态)
+        self._status_cache = None
         self.source_stats = {"akshare": 0, "baostock": 0, "yfinance": 0}
+        # baostock 的会话是进程全局的，不是线程安全的，多线程获取时串行访问
+        self._baostock_lock = threading.Lock()
+        # 多进程会话池（每个进程一个独立会话，需要并行获取 baostock 数据时使用）
+        self._baostock_pool = BaostockPool(baostock_processes) if baostock_processes > 0 else None
+        self._stats_lock = threading.Lock()
+        self._rate_limiters = dict(rate_limiters or {})
         
         # 设置优先数据源
-        if preferred_source not in ['baostock', 'akshare', 'yfinance']:
+        if preferred_source not in DATA_SOURCES:
             logger.warning(f"⚠️  无效的数据源: {preferred_source}，使用默认值 'baostock'")
             preferred_source = 'baostock'
         
         self.preferred_source = preferred_source
     
-    def check_sources(self):
+    @property
+    def akshare_fetcher(self):
+        """Akshare 数据获取器（首次访问时创建）"""
+        if self._akshare_fetcher is None:
+            with self._init_lock:
+                if self._akshare_fetcher is None:
+                    self._akshare_fetcher = AkshareFetcher()
+        return self._akshare_fetcher
+    
+    @property
+    def yfinance_fetcher(self):
+        """YFinance 数据获取器（首次访问时创建）"""
+        if self._yfinance_fetcher is None:
+            with self._init_lock:
+                if self._yfinance_fetcher is None:
+                    self._yfinance_fetcher = YFinanceFetcher()
+        return self._yfinance_fetcher
+    
+    def _source_fetchers(self):
         """
-        检查所有数据源的可用性
+        获取待检查的数据源（baostock 延迟初始化）
+        
+        Returns:
+            dict: {数据源: (显示名称, 获取器)}
+        """
+        if self.baostock_fetcher is None:
+            self.baostock_fetcher = BaostockFetcher()
+        
+        return {
+            'akshare': ('Akshare', self.akshare_fetcher),
+            'baostock': ('Baostock', self.baostock_fetcher),
+            'yfinance': ('YFinance', self.yfinance_fetcher),
+        }
+    
+    @staticmethod
+    def _source_status(display_name, result):
+        """
+        将单个数据源的检查结果转换为可用状态并记录日志
+        
+        Args:
+            display_name: 数据源显示名称
+            result: is_available 的返回值，或检查时抛出的异常
+        
+        Returns:
+            bool: 数据源是否可用
+        """
+        if isinstance(result, TimeoutError):
+            logger.error(f"❌ {display_name} 数据源检查超时（{SOURCE_CHECK_TIMEOUT} 秒）")
+            return False
+        if isinstance(result, Exception):
+            logger.error(f"❌ {display_name} 数据源检查失败: {str(result)}")
+            return False
+        if result:
+            logger.debug(f"✅ {display_name} 数据源可用")
+            return True
+        logger.warning(f"⚠️  {display_name} 数据源不可用")
+        return False
+    
+    def _cached_status(self):
+        """
+        获取未过期的可用性检查结果
+        
+        Returns:
+            Optional[dict]: SOURCE_STATUS_TTL 秒内的检查结果副本，没有则返回 None
+        """
+        if self._status_cache is not None:
+            checked_at, status = self._status_cache
+            if time.monotonic() - checked_at < SOURCE_STATUS_TTL:
+                return dict(status)
+        return None
+    
+    def check_sources(self, force: bool = False):
+        """
+        检查所有数据源的可用性（三个数据源在线程池中并发检查，总耗时取决于最慢的一个）
+        
+        单个数据源超过 SOURCE_CHECK_TIMEOUT 秒未返回视为不可用，不再等待
+        SOURCE_STATUS_TTL 秒内重复调用直接返回上次的结果
+        
+        Args:
+            force: 是否忽略缓存，强制重新检查
         
         Returns:
             dict: 各数据源的可用状态 {'akshare': True/False, 'baostock': True/False, 'yfinance': True/False}
         """
-        status = {}
+        if not force:
+            status = self._cached_status()
+            if status is not None:
+                return status
         
-        # 检查 akshare
-        try:
-            status['akshare'] = self.akshare_fetcher.is_available()
-            if status['akshare']:
-                logger.debug("✅ Akshare 数据源可用")
-            else:
-                logger.warning("⚠️  Akshare 数据源不可用")
-        except Exception as e:
-            status['akshare'] = False
-            logger.error(f"❌ Akshare 数据源检查失败: {str(e)}")
+        fetchers = self._source_fetchers()
         
-        # 检查 baostock
+        executor = ThreadPoolExecutor(max_workers=len(fetchers))
         try:
-            if self.baostock_fetcher is None:
-                self.baostock_fetcher = BaostockFetcher()
-            status['baostock'] = self.baostock_fetcher.is_available()
-            if status['baostock']:
-                logger.debug("✅ Baostock 数据源可用")
-            else:
-                logger.warning("⚠️  Baostock 数据源不可用")
-        except Exception as e:
-            status['baostock'] = False
-            logger.error(f"❌ Baostock 数据源检查失败: {str(e)}")
+            futures = {
+                source: executor.submit(fetcher.is_available)
+                for source, (_, fetcher) in fetchers.items()
+            }
+            wait(futures.values(), timeout=SOURCE_CHECK_TIMEOUT)
+        finally:
+            # 超时的检查不再等待（线程会在后台自行结束）
+            executor.shutdown(wait=False, cancel_futures=True)
         
-        # 检查 yfinance
-        try:
-            status['yfinance'] = self.yfinance_fetcher.is_available()
-            if status['yfinance']:
-                logger.debug("✅ YFinance 数据源可用")
+        status = {}
+        for source, future in futures.items():
+            display_name = fetchers[source][0]
+            if not future.done():
+                result = TimeoutError()
+            elif future.exception() is not None:
+                result = future.exception()
             else:
-                logger.warning("⚠️  YFinance 数据源不可用")
-        except Exception as e:
-            status['yfinance'] = False
-            logger.error(f"❌ YFinance 数据源检查失败: {str(e)}")
+                result = future.result()
+            status[source] = self._source_status(display_name, result)
+        
+        self._status_cache = (time.monotonic(), dict(status))
+        return status
+    
+    async def check_sources_async(self, force: bool = False):
+        """
+        异步并发检查所有数据源的可用性（供已在事件循环中的调用方使用）
+        
+        Args:
+            force: 是否忽略缓存，强制重新检查
+        
+        Returns:
+            dict: 各数据源的可用状态 {'akshare': True/False, 'baostock': True/False, 'yfinance': True/False}
+        """
+        if not force:
+            status = self._cached_status()
+            if status is not None:
+                return status
+        
+        fetchers = self._source_fetchers()
         
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(fetcher.is_available_async(), timeout=SOURCE_CHECK_TIMEOUT)
+                for _, fetcher in fetchers.values()
+            ),
+            return_exceptions=True
+        )
+        
+        status = {
+            source: self._source_status(display_name, result)
+            for (source, (display_name, _)), result in zip(fetchers.items(), results)
+        }
+        self._status_cache = (time.monotonic(), dict(status))
         return status
     
-    def fetch(self, stock_code, stock_name, start_date, end_date, adjust_type='qfq'):
+    def fetch(self, stock_code, stock_name, start_date, end_date, adjust_type='qfq', skip_suspended=True):
         """
         多数据源获取策略
         按优先级尝试：baostock -> akshare -> yfinance
@@ -110,6 +272,8 @@ class MultiSourceFetcher:
             start_date: 开始日期（格式：'20260201'）
             end_date: 结束日期（格式：'20260210'）
             adjust_type: 复权类型，'qfq'(前复权), 'hfq'(后复权), ''(不复权)
+            skip_suspended: 是否让 baostock 在读取时跳过停牌日（默认跳过）；
+                需要保留原始停牌记录时传 False
         
         Returns:
             FetchResult: 命名元组，包含 data 和 source 两个字段
@@ -130,9 +294,9 @@ class MultiSourceFetcher:
         """
         # 定义所有可用的数据源
         all_sources = {
-            "baostock": lambda: self._fetch_from_baostock(stock_code, start_date, end_date),
-            "akshare": lambda: self._fetch_from_akshare(stock_code, start_date, end_date, adjust_type),
-            "yfinance": lambda: self._fetch_from_yfinance(stock_code, start_date, end_date)
+            "baostock": lambda: self._fetch_from_baostock(stock_code, start_date, end_date, stock_name, skip_suspended),
+            "akshare": lambda: self._fetch_from_akshare(stock_code, start_date, end_date, adjust_type, stock_name),
+            "yfinance": lambda: self._fetch_from_yfinance(stock_code, start_date, end_date, stock_name)
         }
         
         # 根据优先数据源构建尝试顺序
@@ -153,16 +317,15 @@ class MultiSourceFetcher:
         
         for source_name, fetch_func in sources:
             try:
-                df = fetch_func()
+                # 临时性错误先在当前数据源重试，仍失败再切换到下一个数据源（每次请求都按该数据源限速）
+                df = _call_with_retry(lambda: self._rate_limited(source_name, fetch_func))
                 if df is not None and not df.empty:
                     # 成功获取到数据（不打印日志，保持简洁）
-                    
-                    # 添加股票名称列（插入到第2列）
-                    if '股票名称' not in df.columns:
-                        df.insert(1, '股票名称', stock_name)
+                    # 股票名称列已由各数据源在构造结果时作为第2列加入
                     
                     # 统计数据源使用情况
-                    self.source_stats[source_name] += 1
+                    with self._stats_lock:
+                        self.source_stats[source_name] += 1
                     
                     return FetchResult(data=df, source=source_name)
                 else:
@@ -191,22 +354,88 @@ class MultiSourceFetcher:
             logger.debug(f"    ℹ️  无数据可获取 (股票: {stock_code}, 日期: {start_date}~{end_date})")
             return FetchResult(data=None, source="no_data")
     
-    def _fetch_from_akshare(self, stock_code, start_date, end_date, adjust_type):
+    def fetch_many(
+        self,
+        requests: Iterable[Tuple],
+        max_workers: int = 16
+    ) -> Dict[str, FetchResult]:
+        """
+        并发获取多只股票的数据（线程池中逐个调用 fetch）
+        
+        akshare / yfinance 为 HTTP 请求，可并行；baostock 会话不是线程安全的，
+        对 baostock 的访问会自动串行
+        
+        Args:
+            requests: 请求列表，每项为 (stock_code, stock_name, start_date, end_date)
+                      或 (stock_code, stock_name, start_date, end_date, adjust_type)
+            max_workers: 最大线程数（默认 16）
+        
+        Returns:
+            Dict[str, FetchResult]: {股票代码: FetchResult}，与 fetch 的返回值含义一致
+        
+        Examples:
+            >>> results = fetcher.fetch_many([
+            >>>     ('000001', '平安银行', '20260201', '20260210'),
+            >>>     ('600519', '贵州茅台', '20260201', '20260210'),
+            >>> ])
+            >>> for code, result in results.items():
+            >>>     print(code, result.source)
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch, *request): request[0]
+                for request in requests
+            }
+            for future in as_completed(futures):
+                stock_code = futures[future]
+                try:
+                    results[stock_code] = future.result()
+                except Exception as e:
+                    logger.error(f"    ❌ 获取 {stock_code} 数据异常: {e}")
+                    results[stock_code] = FetchResult(data=None, source=None)
+        
+        return results
+    
+    def _rate_limited(self, source_name, fetch_func):
+        """
+        等待该数据源的限速器放行后再发起请求（未配置限速器的数据源直接请求）
+        
+        Args:
+            source_name: 数据源名称
+            fetch_func: 无参数的数据获取函数
+        
+        Returns:
+            fetch_func 的返回值
+        """
+        rate_limiter = self._rate_limiters.get(source_name)
+        if rate_limiter is not None:
+            wait_time = rate_limiter.wait()
+            if wait_time > 0:
+                logger.debug(f"    ⏸️  {source_name} 限速等待 {wait_time:.2f}s")
+        return fetch_func()
+    
+    def _fetch_from_akshare(self, stock_code, start_date, end_date, adjust_type, stock_name):
         """从 akshare 获取数据"""
-        return self.akshare_fetcher.fetch(stock_code, start_date, end_date, adjust_type)
+        return self.akshare_fetcher.fetch(stock_code, start_date, end_date, adjust_type, stock_name)
     
-    def _fetch_from_baostock(self, stock_code, start_date, end_date):
+    def _fetch_from_baostock(self, stock_code, start_date, end_date, stock_name, skip_suspended=True):
         """从 baostock 获取数据"""
-        # 延迟初始化 baostock（因为需要登录）
-        if self.baostock_fetcher is None:
-            self.baostock_fetcher = BaostockFetcher()
-            self.baostock_fetcher.login(silent=True)  # 静默登录
+        # 使用多进程会话池时可并行查询，不需要加锁
+        if self._baostock_pool is not None:
+            return self._baostock_pool.fetch(stock_code, start_date, end_date, stock_name, skip_suspended)
         
-        return self.baostock_fetcher.fetch(stock_code, start_date, end_date)
+        with self._baostock_lock:
+            # 延迟初始化 baostock（因为需要登录）
+            if self.baostock_fetcher is None:
+                self.baostock_fetcher = BaostockFetcher()
+                self.baostock_fetcher.login(silent=True)  # 静默登录
+            
+            return self.baostock_fetcher.fetch(stock_code, start_date, end_date, stock_name, skip_suspended)
     
-    def _fetch_from_yfinance(self, stock_code, start_date, end_date):
+    def _fetch_from_yfinance(self, stock_code, start_date, end_date, stock_name):
         """从 yfinance 获取数据"""
-        return self.yfinance_fetcher.fetch(stock_code, start_date, end_date)
+        return self.yfinance_fetcher.fetch(stock_code, start_date, end_date, stock_name)
     
     def get_stats(self):
         """
@@ -215,16 +444,22 @@ class MultiSourceFetcher:
         Returns:
             dict: 各数据源的使用次数
         """
-        return self.source_stats.copy()
+        with self._stats_lock:
+            return self.source_stats.copy()
     
     def reset_stats(self):
         """重置统计数据"""
-        self.source_stats = {"akshare": 0, "baostock": 0, "yfinance": 0}
+        with self._stats_lock:
+            self.source_stats = {"akshare": 0, "baostock": 0, "yfinance": 0}
     
     def close(self):
         """关闭所有连接"""
-        if self.baostock_fetcher is not None and self.baostock_fetcher.is_logged_in:
-            self.baostock_fetcher.logout(silent=True)  # 静默登出
+        if self._baostock_pool is not None:
+            self._baostock_pool.close()
+            self._baostock_pool = None
+        with self._baostock_lock:
+            if self.baostock_fetcher is not None and self.baostock_fetcher.is_logged_in:
+                self.baostock_fetcher.logout(silent=True)  # 静默登出
     
     def __enter__(self):
         """上下文管理器：进入"""
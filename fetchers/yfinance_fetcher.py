@@ -4,10 +4,117 @@ YFinance 数据源模块
 提供 A 股历史数据获取功能（备用数据源）
 """
 
-import sys
 import os
+import time
+import asyncio
+import numpy as np
 import pandas as pd
-import yfinance as yf
+from ._codes import to_yfinance_code
+from ._output import suppress_output
+from ._errors import is_transient_error
+
+# 原始下载结果的磁盘缓存目录和有效期（秒），重复获取相同范围时不再请求网络
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'yfinance', 'history')
+CACHE_TTL = 24 * 3600
+
+
+def _fetch_raw(yf_code, start, end):
+    """
+    下载 yfinance 原始数据（磁盘缓存，CACHE_TTL 秒后过期）
+    
+    不在进程内缓存：批量获取时每只股票的范围各不相同，内存缓存几乎不会命中，
+    却会一直持有所有下载结果
+    
+    Args:
+        yf_code: yfinance 股票代码（如 '600519.SS'）
+        start: 开始日期（格式：'2026-02-01'）
+        end: 结束日期（格式：'2026-02-10'）
+    
+    Returns:
+        DataFrame: yf.download 的原始结果（可能为空）
+    """
+    cache_file = os.path.join(CACHE_DIR, f"{yf_code}_{start}_{end}.pkl")
+    try:
+        if time.time() - os.path.getmtime(cache_file) < CACHE_TTL:
+            return pd.read_pickle(cache_file)
+    except Exception:
+        pass  # 缓存不存在、已过期或损坏，重新下载
+    
+    import yfinance as yf  # 首次使用时才导入（yfinance 导入较慢）
+    
+    # 禁用 yfinance 的输出（退出上下文时自动恢复）
+    with suppress_output(stdout=True, stderr=True):
+        df = yf.download(yf_code, start=start, end=end, auto_adjust=True, progress=False)
+    
+    # 只缓存非空结果（先写临时文件再替换，避免并发读到写了一半的文件）
+    if not df.empty:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            temp_file = f"{cache_file}.tmp.{os.getpid()}.{id(df)}"
+            df.to_pickle(temp_file)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            pass  # 缓存写入失败不影响本次结果
+    
+    return df
+
+
+def _standardize(df, stock_code, stock_name=None):
+    """
+    将 yfinance 原始数据转换为标准格式（计算缺失字段，列名与 akshare 一致）
+    
+    Args:
+        df: yf.download 返回的单只股票数据（索引为日期）
+        stock_code: 股票代码（6位，如 '000001'）
+        stock_name: 股票名称（可选，传入时作为第2列"股票名称"一并构造）
+    
+    Returns:
+        DataFrame: 标准化后的数据
+    """
+    # 重置索引（返回新对象，不修改传入的数据）
+    df = df.reset_index()
+    
+    # 处理 MultiIndex 列名（yfinance 可能返回 MultiIndex）
+    if isinstance(df.columns, pd.MultiIndex):
+        # 只保留第一层列名
+        df.columns = df.columns.get_level_values(0)
+    
+    # 取出原始数组（取整前的价格用于计算涨跌额、涨跌幅和振幅）
+    close = df['Close'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    
+    # 计算缺失字段（第一行没有昨日收盘价，填充为 0）
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    change = close - prev_close
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1. 振幅 = (最高价 - 最低价) / 昨日收盘价 * 100
+        amplitude = (high - low) / prev_close * 100
+        # 2. 涨跌幅 = (收盘价 - 昨日收盘价) / 昨日收盘价 * 100
+        pct_change = change / prev_close * 100
+    
+    # 按最终列顺序直接构造结果（列名与 akshare 一致，数值统一保留2位小数）
+    # 只把 NaN 填充为 0，保留除以 0 产生的 inf（与 fillna(0) 一致）
+    # reset_index 后日期列已是 datetime 类型，直接格式化
+    columns = {'日期': df['Date'].dt.strftime('%Y-%m-%d').to_numpy()}
+    if stock_name is not None:
+        columns['股票名称'] = stock_name
+    columns.update({
+        '股票代码': str(stock_code).zfill(6),
+        '开盘': np.round(df['Open'].to_numpy(dtype=np.float64), 2),
+        '收盘': np.round(close, 2),
+        '最高': np.round(high, 2),
+        '最低': np.round(low, 2),
+        '成交量': df['Volume'].to_numpy(),
+        '成交额': 0.0,  # yfinance 不提供成交额
+        '振幅': np.round(np.nan_to_num(amplitude, nan=0.0, posinf=np.inf, neginf=-np.inf), 2),
+        '涨跌幅': np.round(np.nan_to_num(pct_change, nan=0.0, posinf=np.inf, neginf=-np.inf), 2),
+        '涨跌额': np.round(np.nan_to_num(change, nan=0.0), 2),
+        '换手率': 0.0,  # yfinance 不提供换手率
+    })
+    return pd.DataFrame(columns)
 
 
 class YFinanceFetcher:
@@ -29,32 +136,36 @@ class YFinanceFetcher:
             # 使用贵州茅台(600519.SS)作为测试股票
             from datetime import datetime, timedelta
             test_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+            import yfinance as yf  # 首次使用时才导入（yfinance 导入较慢）
             
             # 禁用输出
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-            sys.stdout = open(os.devnull, 'w')
-            sys.stderr = open(os.devnull, 'w')
-            
-            try:
+            with suppress_output(stdout=True, stderr=True):
                 df = yf.download("600519.SS", start=test_date, end=test_date, progress=False)
-                return True
-            finally:
-                sys.stdout.close()
-                sys.stderr.close()
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
+            return True
         except Exception:
             return False
     
-    def fetch(self, stock_code, start_date, end_date):
+    async def is_available_async(self):
+        """
+        异步检查 yfinance 数据源是否可用（在线程中执行 is_available）
+        
+        Returns:
+            bool: True 表示可用，False 表示不可用
+        """
+        return await asyncio.to_thread(self.is_available)
+    
+    def fetch(self, stock_code, start_date, end_date, stock_name=None):
         """
         从 yfinance 获取数据并计算缺失字段
         
+        临时性错误（网络连接失败、超时、限流、5xx）原样抛出，由 MultiSourceFetcher 重试；
+        其他错误视为无数据，返回 None
+        
         Args:
             stock_code: 股票代码（6位，如 '000001'）
             start_date: 开始日期（格式：'20260201'）
             end_date: 结束日期（格式：'20260210'）
+            stock_name: 股票名称（可选，传入时作为第2列"股票名称"一并构造）
         
         Returns:
             DataFrame: 标准化后的数据，列名与 akshare 一致
@@ -65,88 +176,60 @@ class YFinanceFetcher:
             start = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
             end = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
             
-            # 转换股票代码格式
-            if stock_code.startswith('6'):
-                yf_code = f"{stock_code}.SS"  # 上海
-            else:
-                yf_code = f"{stock_code}.SZ"  # 深圳
-            
-            # 禁用 yfinance 的输出
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-            sys.stdout = open(os.devnull, 'w')
-            sys.stderr = open(os.devnull, 'w')
+            # 转换股票代码格式：600519 -> 600519.SS（上海），000001 -> 000001.SZ（深圳）
+            yf_code = to_yfinance_code(stock_code)
             
-            try:
-                df = yf.download(yf_code, start=start, end=end, auto_adjust=True, progress=False)
-            finally:
-                # 恢复输出
-                sys.stdout.close()
-                sys.stderr.close()
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
+            # 下载原始数据（命中缓存时不请求网络）
+            df = _fetch_raw(yf_code, start, end)
             
             if df.empty:
                 return None
             
-            # 重置索引
-            df = df.reset_index()
-            
-            # 处理 MultiIndex 列名（yfinance 可能返回 MultiIndex）
-            if isinstance(df.columns, pd.MultiIndex):
-                # 只保留第一层列名
-                df.columns = df.columns.get_level_values(0)
-            
-            # 计算缺失字段
-            # 1. 涨跌幅 = (收盘价 - 昨日收盘价) / 昨日收盘价 * 100
-            df['pct_change'] = ((df['Close'] - df['Close'].shift(1)) / df['Close'].shift(1) * 100).fillna(0)
-            
-            # 2. 涨跌额 = 收盘价 - 昨日收盘价
-            df['change'] = (df['Close'] - df['Close'].shift(1)).fillna(0)
-            
-            # 3. 振幅 = (最高价 - 最低价) / 昨日收盘价 * 100
-            prev_close = df['Close'].shift(1)
-            df['amplitude'] = ((df['High'] - df['Low']) / prev_close * 100).fillna(0)
-            
-            # 标准化列名（与 akshare 保持一致）
-            df = df.rename(columns={
-                'Date': '日期',
-                'Open': '开盘',
-                'High': '最高',
-                'Low': '最低',
-                'Close': '收盘',
-                'Volume': '成交量'
-            })
-            
-            # 统一数据格式
-            df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
-            
-            # 添加字段
-            df['股票代码'] = stock_code
-            
-            # 确保股票代码为字符串类型（保留前导零）
-            df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
-            
-            df['成交额'] = 0.0  # yfinance 不提供成交额
-            df['涨跌幅'] = df['pct_change'].round(2)
-            df['涨跌额'] = df['change'].round(2)
-            df['振幅'] = df['amplitude'].round(2)
-            df['换手率'] = 0.0  # yfinance 不提供换手率
-            
-            # 删除临时列
-            df = df.drop(columns=['pct_change', 'change', 'amplitude'], errors='ignore')
-            
-            # 统一数值精度（保留2位小数）
-            numeric_cols = ['开盘', '收盘', '最高', '最低']
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = df[col].round(2)
-            
-            # 调整列顺序，与 akshare 一致
-            column_order = ['日期', '股票代码', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
-            df = df[[col for col in column_order if col in df.columns]]
-            
-            return df
+            return _standardize(df, stock_code, stock_name)
             
         except Exception as e:
+            if is_transient_error(e):
+                raise
             return None
+    
+    def fetch_many(self, stock_codes, start_date, end_date):
+        """
+        一次请求获取多只股票的数据（yf.download 批量下载，按股票拆分）
+        
+        Args:
+            stock_codes: 股票代码列表（6位，如 ['000001', '600519']）
+            start_date: 开始日期（格式：'20260201'）
+            end_date: 结束日期（格式：'20260210'）
+        
+        Returns:
+            Dict[str, Optional[DataFrame]]: {股票代码: 标准化后的数据}，获取失败或无数据为 None
+        """
+        start = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
+        end = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
+        yf_codes = {to_yfinance_code(code): code for code in stock_codes}
+        
+        try:
+            import yfinance as yf  # 首次使用时才导入（yfinance 导入较慢）
+            # group_by='ticker' 时列为 (股票代码, 字段) 的 MultiIndex
+            with suppress_output(stdout=True, stderr=True):
+                raw = yf.download(
+                    list(yf_codes), start=start, end=end,
+                    auto_adjust=True, progress=False, group_by='ticker'
+                )
+        except Exception:
+            return {code: None for code in yf_codes.values()}
+        
+        tickers = set(raw.columns.get_level_values(0)) if isinstance(raw.columns, pd.MultiIndex) else set()
+        results = {}
+        for yf_code, stock_code in yf_codes.items():
+            try:
+                if yf_code not in tickers:
+                    results[stock_code] = None
+                    continue
+                # 多只股票的日期取并集，去掉该股票没有数据的行
+                df = raw[yf_code].dropna(how='all')
+                results[stock_code] = None if df.empty else _standardize(df, stock_code)
+            except Exception:
+                results[stock_code] = None
+        
+        return results
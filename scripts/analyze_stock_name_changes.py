@@ -14,6 +14,88 @@ from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import OUTPUT_DIR, CN_DIR
+from utils.data_saver import HAS_PYARROW
+
+# 名称变化分析只需要的列
+# 股票名称在整个文件中只有少数几个取值，按 category 读取（每行只保存整数编码）
+ANALYSIS_COLUMNS = frozenset(['日期', '股票代码', '股票名称'])
+ANALYSIS_DTYPES = {'股票代码': str, '股票名称': 'category'}
+
+# 支持的个股数据文件扩展名
+STOCK_FILE_EXTENSIONS = ('.csv', '.parquet')
+
+
+def select_stock_files(paths: dict) -> list:
+    """
+    从候选文件中为每只股票选出一个要读取的文件
+    
+    同一只股票同时存在 CSV 和 Parquet 时，Parquet 不早于 CSV 才使用 Parquet
+    （切换存储格式后 CSV 可能仍在更新，此时 Parquet 已过期）
+    
+    Args:
+        paths: {文件名: 文件路径}
+    
+    Returns:
+        list: [(文件名, 文件路径), ...]（按文件名排序）
+    """
+    selected = {}
+    for name, path in paths.items():
+        stem, ext = os.path.splitext(name)
+        other = selected.get(stem)
+        if other is None:
+            selected[stem] = (name, path)
+            continue
+        parquet, csv = ((name, path), other) if ext == '.parquet' else (other, (name, path))
+        try:
+            use_parquet = os.path.getmtime(parquet[1]) >= os.path.getmtime(csv[1])
+        except OSError:
+            use_parquet = False
+        selected[stem] = parquet if use_parquet else csv
+    return sorted(selected.values())
+
+
+def read_name_history(file_path: str) -> pd.DataFrame:
+    """
+    读取名称变化分析需要的列（日期、股票代码、股票名称）
+    
+    Parquet 只读取需要的列；CSV 在安装了 pyarrow 时使用 pyarrow 解析器
+    旧文件可能没有股票名称列，缺少的列不会报错，由调用方判断
+    
+    Args:
+        file_path: 股票数据文件路径（.csv 或 .parquet）
+    
+    Returns:
+        DataFrame: 日期列为 datetime 类型
+    """
+    if file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        columns = [col for col in pq.read_schema(file_path).names if col in ANALYSIS_COLUMNS]
+        df = pd.read_parquet(file_path, columns=columns)
+        df['日期'] = pd.to_datetime(df['日期'])
+        if '股票名称' in df.columns:
+            df['股票名称'] = df['股票名称'].astype('category')
+        return df
+    
+    if HAS_PYARROW:
+        # pyarrow 解析器不支持函数形式的 usecols，先读表头确定存在的列
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            header = f.readline().rstrip('\r\n').split(',')
+        columns = [col for col in header if col in ANALYSIS_COLUMNS]
+        return pd.read_csv(
+            file_path,
+            usecols=columns,
+            dtype={col: dtype for col, dtype in ANALYSIS_DTYPES.items() if col in columns},
+            parse_dates=['日期'],
+            engine='pyarrow'
+        )
+    
+    # 用函数筛选列，避免缺列时报错
+    return pd.read_csv(
+        file_path,
+        usecols=lambda col: col in ANALYSIS_COLUMNS,
+        dtype=ANALYSIS_DTYPES,
+        parse_dates=['日期']
+    )
 
 
 def analyze_stock_name_changes(stock_code: str = None, show_all: bool = False):
@@ -30,11 +112,21 @@ def analyze_stock_name_changes(stock_code: str = None, show_all: bool = False):
         print(f"❌ 数据目录不存在: {cn_dir}")
         return
     
-    # 获取要分析的股票列表
+    # 获取要分析的股票文件列表 [(文件名, 路径), ...]（按文件名排序，CSV/Parquet 每只股票取一个）
     if stock_code:
-        stock_files = [f"stock_{stock_code}.csv"]
+        candidates = {
+            f"stock_{stock_code}{ext}": os.path.join(cn_dir, f"stock_{stock_code}{ext}")
+            for ext in STOCK_FILE_EXTENSIONS
+        }
+        paths = {name: path for name, path in candidates.items() if os.path.exists(path)}
+        # 都不存在时保留 CSV 路径，由后面的读取报告错误
+        stock_files = select_stock_files(paths) or [next(iter(candidates.items()))]
     else:
-        stock_files = [f for f in os.listdir(cn_dir) if f.startswith('stock_') and f.endswith('.csv')]
+        with os.scandir(cn_dir) as it:
+            stock_files = select_stock_files({
+                entry.name: entry.path for entry in it
+                if entry.name.startswith('stock_') and entry.name.endswith(STOCK_FILE_EXTENSIONS)
+            })
     
     print("=" * 80)
     print("股票名称变化历史分析")
@@ -45,14 +137,13 @@ def analyze_stock_name_changes(stock_code: str = None, show_all: bool = False):
     # 统计信息
     total_stocks = 0
     changed_stocks = 0
-    st_stocks = []
-    delisted_stocks = []
+    # 有改名的股票的最新名称 [(股票代码, 最新名称), ...]，循环结束后统一判断 ST / 退市
+    latest_names = []
     
-    for stock_file in sorted(stock_files):
-        file_path = os.path.join(cn_dir, stock_file)
-        
+    for stock_file, file_path in stock_files:
         try:
-            df = pd.read_csv(file_path, dtype={'股票代码': str})
+            # 只读取分析需要的列
+            df = read_name_history(file_path)
             
             if '股票名称' not in df.columns or df.empty:
                 continue
@@ -61,34 +152,27 @@ def analyze_stock_name_changes(stock_code: str = None, show_all: bool = False):
             stock_code_val = df['股票代码'].iloc[0]
             
             # 获取名称变化历史
-            df['日期'] = pd.to_datetime(df['日期'])
             df = df.sort_values('日期')
             
-            # 检测名称变化
-            name_changes = []
-            prev_name = None
+            # 检测名称变化（与上一行名称不同的行；第一行与 NaN 比较，恒为 True）
+            names = df['股票名称']
+            prev_names = names.shift()
+            changed = names.ne(prev_names).to_numpy()
+            change_dates = df['日期'].to_numpy()[changed]
             
-            for idx, row in df.iterrows():
-                current_name = row['股票名称']
-                current_date = row['日期'].strftime('%Y-%m-%d')
-                
-                if prev_name is None:
-                    # 第一条记录
-                    name_changes.append({
-                        'date': current_date,
-                        'name': current_name,
-                        'is_first': True
-                    })
-                elif current_name != prev_name:
-                    # 名称发生变化
-                    name_changes.append({
-                        'date': current_date,
-                        'name': current_name,
-                        'is_first': False,
-                        'prev_name': prev_name
-                    })
-                
-                prev_name = current_name
+            name_changes = [
+                {
+                    'date': date,
+                    'name': name,
+                    'is_first': i == 0,
+                    'prev_name': prev_name
+                }
+                for i, (date, name, prev_name) in enumerate(zip(
+                    pd.DatetimeIndex(change_dates).strftime('%Y-%m-%d'),
+                    names.to_numpy()[changed],
+                    prev_names.to_numpy()[changed]
+                ))
+            ]
             
             # 判断是否有名称变化
             has_changes = len(name_changes) > 1
@@ -96,12 +180,8 @@ def analyze_stock_name_changes(stock_code: str = None, show_all: bool = False):
             if has_changes:
                 changed_stocks += 1
                 
-                # 检查是否变为 ST 或退市
-                latest_name = name_changes[-1]['name']
-                if 'ST' in latest_name or 'st' in latest_name:
-                    st_stocks.append((stock_code_val, latest_name))
-                if '退市' in latest_name:
-                    delisted_stocks.append((stock_code_val, latest_name))
+                # 记录最新名称（ST / 退市在循环结束后统一判断）
+                latest_names.append((stock_code_val, name_changes[-1]['name']))
                 
                 # 显示变化历史
                 print(f"📊 {stock_code_val} - 名称变化历史:")
@@ -120,6 +200,13 @@ def analyze_stock_name_changes(stock_code: str = None, show_all: bool = False):
             print(f"❌ 分析 {stock_file} 失败: {str(e)}")
             continue
     
+    # 检查是否变为 ST 或退市（对所有改名股票的最新名称一次性判断）
+    latest_df = pd.DataFrame(latest_names, columns=['code', 'name'])
+    st_mask = latest_df['name'].str.contains('ST|st', regex=True, na=False)
+    delisted_mask = latest_df['name'].str.contains('退市', regex=False, na=False)
+    st_stocks = list(latest_df[st_mask].itertuples(index=False, name=None))
+    delisted_stocks = list(latest_df[delisted_mask].itertuples(index=False, name=None))
+    
     # 显示统计信息
     print("=" * 80)
     print("统计摘要")
@@ -34,7 +34,8 @@ def main():
     
     # 检查所有数据源
     print("正在检查数据源...")
-    status = fetcher.check_sources()
+    # 命令行检查总是实时探测，不使用缓存结果
+    status = fetcher.check_sources(force=True)
     
     print()
     print("检查结果:")
@@ -16,25 +16,308 @@
 """
 
 import os
+import re
 import sys
+import json
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from typing import Dict, Tuple
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import OUTPUT_DIR, CN_DIR
-from utils import filter_suspended_trading_data, MetadataManager
+from config import OUTPUT_DIR, CN_DIR, STORAGE_FORMAT
+from utils import (
+    filter_suspended_trading_data, read_stock_file, save_dataframe,
+    MetadataManager
+)
+from utils.data_saver import HAS_PYARROW, STORAGE_EXTENSIONS
 
+if HAS_PYARROW:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+    import pyarrow.parquet as pq
 
-def scan_and_clean_suspended_data(data_dir: str, dry_run: bool = False) -> Dict:
+# 可选：安装了 tqdm 时用进度条代替逐行输出
+try:
+    from tqdm import tqdm
+    HAS_TQDM = True
+except ImportError:
+    HAS_TQDM = False
+
+# 判断停牌所需的列（兼容中英文列名）
+SUSPEND_COLUMNS = frozenset(['成交量', '成交额', 'volume', 'amount'])
+
+# 增量扫描状态文件（记录已确认无停牌数据的文件的修改时间和大小）
+SCAN_STATE_FILE = '.suspended_scan_state.json'
+
+
+def load_scan_state(state_file: str) -> Dict[str, list]:
+    """
+    加载上次扫描的文件状态
+    
+    Args:
+        state_file: 状态文件路径
+    
+    Returns:
+        Dict[str, list]: {文件名: [修改时间(ns), 文件大小]}，文件不存在或损坏时返回空字典
+    """
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_scan_state(state_file: str, state: Dict[str, list]) -> None:
+    """
+    保存本次扫描的文件状态（先写临时文件再原子替换）
+    
+    Args:
+        state_file: 状态文件路径
+        state: {文件名: [修改时间(ns), 文件大小]}
+    """
+    temp_file = f"{state_file}.tmp.{os.getpid()}"
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_file, state_file)
+    except OSError as e:
+        print(f"⚠️  保存扫描状态失败: {e}")
+
+
+def count_suspended_rows(table) -> int:
+    """
+    在 Arrow 表上统计停牌记录数（判断条件与 filter_suspended_trading_data 一致）
+    
+    Args:
+        table: pyarrow.Table
+    
+    Returns:
+        int: 停牌记录数（缺少成交量/成交额列时为 0）
+    """
+    names = table.column_names
+    volume_col = '成交量' if '成交量' in names else 'volume'
+    amount_col = '成交额' if '成交额' in names else 'amount'
+    if volume_col not in names or amount_col not in names:
+        return 0
+    
+    # 成交量和成交额都不为空且大于0的记录为正常交易（空值视为停牌）
+    valid = pc.and_(
+        pc.greater(table[volume_col], 0).fill_null(False),
+        pc.greater(table[amount_col], 0).fill_null(False)
+    )
+    return table.num_rows - (pc.sum(valid).as_py() or 0)
+
+
+@lru_cache(maxsize=None)
+def _suspect_line_pattern(volume_idx: int, amount_idx: int):
+    """
+    构造匹配可疑行的正则：成交量或成交额字段不以 1-9 开头（为空、0、负数等）
+    
+    Args:
+        volume_idx: 成交量列序号
+        amount_idx: 成交额列序号
+    
+    Returns:
+        re.Pattern: 按行匹配（MULTILINE）的字节正则
+    """
+    return re.compile(
+        rb'^(?:(?:[^,\n]*,){%d}(?![1-9])|(?:[^,\n]*,){%d}(?![1-9]))' % (volume_idx, amount_idx),
+        re.MULTILINE
+    )
+
+
+def might_have_suspended_rows(filepath: str) -> bool:
+    """
+    不解析 CSV，直接在文件字节上（mmap + 正则）判断是否可能含有停牌数据
+    
+    返回 False 时文件一定没有停牌数据；返回 True 时还需按列读取确认
+    （如 0.5 这样不以 1-9 开头的正数也会被视为可疑）
+    
+    Args:
+        filepath: CSV 文件路径
+    
+    Returns:
+        bool: 是否可能含有停牌数据
+    """
+    with open(filepath, 'rb') as f:
+        header_line = f.readline()
+        if not header_line:
+            return True  # 空文件交给后续读取报告错误
+        header = header_line.decode('utf-8-sig').rstrip('\r\n').split(',')
+        
+        # 兼容中英文列名；缺少成交量/成交额列时不会被判定为停牌
+        volume_col = '成交量' if '成交量' in header else 'volume'
+        amount_col = '成交额' if '成交额' in header else 'amount'
+        if volume_col not in header or amount_col not in header:
+            return False
+        
+        if os.fstat(f.fileno()).st_size == len(header_line):
+            return False  # 只有表头
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 含引号字段时逗号不一定是分隔符，无法按位置判断列
+            if mm.find(b'"') != -1:
+                return True
+            pattern = _suspect_line_pattern(header.index(volume_col), header.index(amount_col))
+            return pattern.search(mm, len(header_line)) is not None
+
+
+def has_suspended_rows(filepath: str) -> bool:
+    """
+    只读取成交量/成交额两列，预先判断文件中是否有停牌数据
+    
+    大多数文件不含停牌数据，此时不需要读取和解析整个文件
+    
+    Args:
+        filepath: 股票文件路径（.csv 或 .parquet）
+    
+    Returns:
+        bool: 可能包含停牌数据时返回 True（需要完整读取后过滤）
+    """
+    if filepath.endswith('.parquet'):
+        # Parquet 为列式存储，只读取需要的列
+        columns = [col for col in pq.read_schema(filepath).names if col in SUSPEND_COLUMNS]
+        df = pd.read_parquet(filepath, columns=columns)
+        return filter_suspended_trading_data(df)[1] > 0
+    
+    # 先在文件字节上快速排除（大多数文件在这里即可确定没有停牌数据）
+    if not might_have_suspended_rows(filepath):
+        return False
+    
+    if HAS_PYARROW:
+        # pyarrow 的 include_columns 要求列必须存在，先读表头确定存在的列
+        with open(filepath, 'r', encoding='utf-8-sig') as f:
+            header = f.readline().rstrip('\r\n').split(',')
+        columns = [col for col in header if col in SUSPEND_COLUMNS]
+        table = pa_csv.read_csv(filepath, convert_options=pa_csv.ConvertOptions(include_columns=columns))
+        try:
+            return count_suspended_rows(table) > 0
+        except pa.ArrowException:
+            return True  # 列类型异常（如含非数字内容）时交给完整读取处理
+    
+    # 只用于判断，不写回文件，直接按 float64 读取
+    df = pd.read_csv(
+        filepath,
+        usecols=lambda col: col in SUSPEND_COLUMNS,
+        dtype=dict.fromkeys(SUSPEND_COLUMNS, 'float64')
+    )
+    return filter_suspended_trading_data(df)[1] > 0
+
+
+def format_report_chunk(detail: Dict) -> str:
+    """
+    格式化单个文件在报告中的内容（在工作进程中预先生成，主进程直接写入）
+    
+    Args:
+        detail: 停牌详情
+    
+    Returns:
+        str: 报告片段
+    """
+    chunk = (
+        f"\n股票代码: {detail['stock_code']}\n"
+        f"  原始记录: {detail['original_count']} 条\n"
+        f"  移除记录: {detail['removed_count']} 条\n"
+        f"  剩余记录: {detail['remaining_count']} 条\n"
+    )
+    if detail['removed_dates']:
+        chunk += f"  停牌日期: {', '.join(detail['removed_dates'])}\n"
+    return chunk
+
+
+def process_one_file(filepath: str, dry_run: bool) -> Dict:
+    """
+    检测并清理单个股票文件中的停牌数据（在工作进程中执行）
+    
+    Args:
+        filepath: 股票文件路径
+        dry_run: 如果为 True，只检测不修改文件
+    
+    Returns:
+        Dict: {'stock_code': 股票代码, 'detail': 停牌详情（无停牌数据时为 None）,
+               'report': 报告片段（无停牌数据时为 None）,
+               'cleaned': 是否已写回文件, 'last_date': 处理后文件的最新日期（无停牌数据时为 None）,
+               'file_state': 写回后文件的 [修改时间(ns), 文件大小]（未写回时为 None）,
+               'error': 错误信息（成功时为 None）}
+    """
+    filename = os.path.basename(filepath)
+    stock_code = os.path.splitext(filename)[0][len('stock_'):]
+    result = {
+        'stock_code': stock_code, 'detail': None, 'report': None,
+        'cleaned': False, 'last_date': None, 'file_state': None, 'error': None
+    }
+    
+    try:
+        # 先只读取成交量/成交额列，没有停牌数据时直接返回
+        if not has_suspended_rows(filepath):
+            return result
+        
+        # 读取完整文件
+        df = read_stock_file(filepath)
+        
+        if df.empty:
+            return result
+        
+        original_count = len(df)
+        
+        # 检测停牌数据
+        df_filtered, removed_count = filter_suspended_trading_data(df)
+        
+        if removed_count > 0:
+            # 记录详细信息
+            detail = {
+                'stock_code': stock_code,
+                'filename': filename,
+                'original_count': original_count,
+                'removed_count': removed_count,
+                'remaining_count': len(df_filtered),
+                'removed_dates': []
+            }
+            
+            # 找出被移除的日期（保存所有日期，setdiff1d 返回去重并排序后的结果）
+            if '日期' in df.columns:
+                removed_dates = np.setdiff1d(df['日期'].to_numpy(), df_filtered['日期'].to_numpy())
+                detail['removed_dates'] = removed_dates.tolist()
+            
+            result['detail'] = detail
+            result['report'] = format_report_chunk(detail)
+            
+            # 如果不是 dry_run，则更新文件（过滤后无数据时保留原文件）
+            if not dry_run and not df_filtered.empty:
+                # 保存过滤后的数据（按扩展名写回 CSV 或 Parquet）
+                save_dataframe(df_filtered, filepath, stock_code)
+                result['cleaned'] = True
+                st = os.stat(filepath)
+                result['file_state'] = [st.st_mtime_ns, st.st_size]
+            
+            # 记录文件当前的最新日期，清理后直接用于更新元数据，无需重新读取文件
+            if '日期' in df.columns:
+                result['last_date'] = (df_filtered if result['cleaned'] else df)['日期'].max()
+    
+    except Exception as e:
+        result['error'] = str(e)
+    
+    return result
+
+
+def scan_and_clean_suspended_data(data_dir: str, dry_run: bool = False, full: bool = False) -> Dict:
     """
     扫描并清理所有股票文件中的停牌数据
     
+    增量扫描：上次扫描确认无停牌数据（或已清理）且修改时间和大小都未变化的文件直接跳过
+    
     Args:
         data_dir: 数据目录路径
         dry_run: 如果为 True，只检测不修改文件
+        full: 如果为 True，忽略上次的扫描状态，重新扫描所有文件
     
     Returns:
         清理统计信息
@@ -50,83 +333,110 @@ def scan_and_clean_suspended_data(data_dir: str, dry_run: bool = False) -> Dict:
     # 统计信息
     stats = {
         'total_files': 0,
+        'files_skipped': 0,
         'files_with_suspended': 0,
         'files_cleaned': 0,
         'total_records_removed': 0,
         'files_with_errors': 0,
-        'details': []
+        'details': [],
+        'report_chunks': [],
+        'last_dates': {},
+        'cleaned_files': []
     }
     
-    # 获取所有股票文件
-    stock_files = [f for f in os.listdir(data_dir) if f.startswith('stock_') and f.endswith('.csv')]
-    stats['total_files'] = len(stock_files)
+    # 获取所有股票文件路径（按 STORAGE_FORMAT 选择扩展名，直接使用 DirEntry.path）
+    # 按目录顺序处理，不预先排序；报告内容在扫描结束后按股票代码排序
+    ext = STORAGE_EXTENSIONS[STORAGE_FORMAT]
+    with os.scandir(data_dir) as it:
+        entries = [
+            (entry.name, entry.path, entry.stat()) for entry in it
+            if entry.name.startswith('stock_') and entry.name.endswith(ext)
+        ]
+    stats['total_files'] = len(entries)
     
     if stats['total_files'] == 0:
         print("⚠️  未找到任何股票文件")
         return stats
     
+    # 跳过上次扫描后未修改的文件（本次状态只保留现存文件，已删除的文件自动移除）
+    state_file = os.path.join(data_dir, SCAN_STATE_FILE)
+    previous_state = {} if full else load_scan_state(state_file)
+    scan_state = {}
+    filenames = []
+    filepaths = []
+    file_states = []
+    for name, path, st in entries:
+        file_state = [st.st_mtime_ns, st.st_size]
+        if previous_state.get(name) == file_state:
+            scan_state[name] = file_state
+            continue
+        filenames.append(name)
+        filepaths.append(path)
+        file_states.append(file_state)
+    stats['files_skipped'] = stats['total_files'] - len(filepaths)
+    scan_total = len(filepaths)
+    
     print(f"找到 {stats['total_files']} 个股票文件")
+    if stats['files_skipped'] > 0:
+        print(f"跳过 {stats['files_skipped']} 个上次扫描后未修改的文件（使用 --full 重新扫描所有文件）")
     print()
     print("开始扫描...")
     print("-" * 80)
     
-    # 处理每个文件
-    for idx, filename in enumerate(sorted(stock_files), 1):
-        filepath = os.path.join(data_dir, filename)
-        stock_code = filename.replace('stock_', '').replace('.csv', '')
-        
-        try:
-            # 读取文件
-            df = pd.read_csv(filepath, dtype={'股票代码': str})
+    # 进度显示：有 tqdm 时只刷新进度条（最多每 0.5 秒一次），停牌详情只写入报告，
+    # 错误和警告通过 progress.write 输出；没有 tqdm 时逐行输出
+    progress = tqdm(total=scan_total, mininterval=0.5, smoothing=0.1, unit='file') if HAS_TQDM else None
+    log = progress.write if progress is not None else print
+    
+    # 处理每个文件（文件之间互不依赖，多进程并行处理；map 按提交顺序返回结果）
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(process_one_file, filepaths, repeat(dry_run), chunksize=32)
+        for idx, (name, file_state, result) in enumerate(zip(filenames, file_states, results), 1):
+            stock_code = result['stock_code']
+            if progress is not None:
+                progress.update(1)
             
-            if df.empty:
+            if result['error'] is not None:
+                stats['files_with_errors'] += 1
+                log(f"[{idx}/{scan_total}] {stock_code}: ❌ 错误 - {result['error']}")
                 continue
             
-            original_count = len(df)
-            
-            # 检测停牌数据
-            df_filtered, removed_count = filter_suspended_trading_data(df)
-            
-            if removed_count > 0:
+            detail = result['detail']
+            if detail is not None:
                 stats['files_with_suspended'] += 1
-                stats['total_records_removed'] += removed_count
-                
-                # 记录详细信息
-                detail = {
-                    'stock_code': stock_code,
-                    'filename': filename,
-                    'original_count': original_count,
-                    'removed_count': removed_count,
-                    'remaining_count': len(df_filtered),
-                    'removed_dates': []
-                }
-                
-                # 找出被移除的日期（保存所有日期）
-                if '日期' in df.columns:
-                    removed_dates = set(df['日期']) - set(df_filtered['日期'])
-                    detail['removed_dates'] = sorted(list(removed_dates))  # 保存所有日期
-                
+                stats['total_records_removed'] += detail['removed_count']
                 stats['details'].append(detail)
+                stats['report_chunks'].append(result['report'])
+                if result['last_date'] is not None:
+                    stats['last_dates'][stock_code] = result['last_date']
                 
                 # 显示进度
-                print(f"[{idx}/{stats['total_files']}] {stock_code}: 发现 {removed_count} 条停牌记录")
+                if progress is None:
+                    print(f"[{idx}/{scan_total}] {stock_code}: 发现 {detail['removed_count']} 条停牌记录")
                 
-                # 如果不是 dry_run，则更新文件
-                if not dry_run:
-                    if not df_filtered.empty:
-                        # 保存过滤后的数据
-                        df_filtered.to_csv(filepath, index=False, encoding='utf-8-sig')
-                        stats['files_cleaned'] += 1
-                    else:
-                        print(f"   ⚠️  警告：过滤后无数据，保留原文件")
+                if result['cleaned']:
+                    stats['files_cleaned'] += 1
+                    stats['cleaned_files'].append(filepaths[idx - 1])
+                    scan_state[name] = result['file_state']
+                elif not dry_run:
+                    log(f"[{idx}/{scan_total}] {stock_code}: ⚠️  警告：过滤后无数据，保留原文件")
             else:
+                # 无停牌数据，下次运行时文件未修改则跳过
+                scan_state[name] = file_state
                 # 每100个文件显示一次进度
-                if idx % 100 == 0:
-                    print(f"[{idx}/{stats['total_files']}] 已处理 {idx} 个文件...")
-        
-        except Exception as e:
-            stats['files_with_errors'] += 1
-            print(f"[{idx}/{stats['total_files']}] {stock_code}: ❌ 错误 - {str(e)}")
+                if progress is None and idx % 100 == 0:
+                    print(f"[{idx}/{scan_total}] 已处理 {idx} 个文件...")
+    
+    if progress is not None:
+        progress.close()
+    
+    # 仍含停牌数据（检测模式）或出错的文件不记录状态，下次继续扫描
+    save_scan_state(state_file, scan_state)
+    
+    # 详细信息和报告片段按股票代码排序，保证报告顺序稳定
+    order = sorted(range(len(stats['details'])), key=lambda i: stats['details'][i]['stock_code'])
+    stats['details'] = [stats['details'][i] for i in order]
+    stats['report_chunks'] = [stats['report_chunks'][i] for i in order]
     
     print("-" * 80)
     print()
@@ -134,33 +444,39 @@ def scan_and_clean_suspended_data(data_dir: str, dry_run: bool = False) -> Dict:
     return stats
 
 
-def update_metadata_after_cleaning(data_dir: str, cleaned_stocks: List[str]):
+def sync_cleaned_files(filepaths: list) -> None:
     """
-    清理后更新元数据
+    清理结束后统一将已写回的文件刷新到磁盘（fsync）
+    
+    写回文件时不逐个 fsync，需要确保断电不丢数据时在最后统一执行一次
+    
+    Args:
+        filepaths: 已写回的文件路径列表
+    """
+    for filepath in filepaths:
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def update_metadata_after_cleaning(data_dir: str, last_dates: Dict[str, str]):
+    """
+    清理后更新元数据（所有股票更新完成后只写一次元数据文件）
     
     Args:
         data_dir: 数据目录
-        cleaned_stocks: 已清理的股票代码列表
+        last_dates: 已清理股票的最新日期 {"股票代码": "最新日期", ...}
     """
-    if not cleaned_stocks:
+    if not last_dates:
         return
     
     print("正在更新元数据...")
     
     try:
-        metadata_mgr = MetadataManager(data_dir)
-        
-        for stock_code in cleaned_stocks:
-            filepath = os.path.join(data_dir, f'stock_{stock_code}.csv')
-            
-            try:
-                df = pd.read_csv(filepath, dtype={'股票代码': str})
-                if not df.empty and '日期' in df.columns:
-                    last_date = df['日期'].max()
-                    metadata_mgr.update_last_date(stock_code, last_date)
-            except Exception as e:
-                print(f"   ⚠️  更新 {stock_code} 元数据失败: {e}")
-        
+        metadata_mgr = MetadataManager(data_dir, STORAGE_FORMAT)
+        metadata_mgr.bulk_update_last_dates(last_dates)
         print("✅ 元数据更新完成")
     except Exception as e:
         print(f"⚠️  元数据更新失败: {e}")
@@ -178,6 +494,7 @@ def print_report(stats: Dict, dry_run: bool):
     print("清理报告")
     print("=" * 80)
     print(f"总文件数: {stats['total_files']}")
+    print(f"未修改跳过的文件: {stats['files_skipped']}")
     print(f"包含停牌数据的文件: {stats['files_with_suspended']}")
     
     if not dry_run:
@@ -228,6 +545,8 @@ def main():
 示例:
   %(prog)s                    # 只检测，不修改文件
   %(prog)s --clean            # 检测并清理
+  %(prog)s --full             # 忽略上次扫描状态，重新扫描所有文件
+  %(prog)s --clean --fsync    # 清理结束后将写回的文件刷新到磁盘
   %(prog)s --clean --backup   # 清理前备份（暂未实现）
 """
     )
@@ -238,6 +557,18 @@ def main():
         help='执行清理操作（默认只检测）'
     )
     
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='重新扫描所有文件（默认跳过上次扫描后未修改的文件）'
+    )
+    
+    parser.add_argument(
+        '--fsync',
+        action='store_true',
+        help='清理结束后对所有写回的文件执行一次 fsync（默认不执行）'
+    )
+    
     args = parser.parse_args()
     
     # 构建数据目录路径
@@ -249,12 +580,15 @@ def main():
     
     # 执行扫描和清理
     dry_run = not args.clean
-    stats = scan_and_clean_suspended_data(data_dir, dry_run=dry_run)
+    stats = scan_and_clean_suspended_data(data_dir, dry_run=dry_run, full=args.full)
+    
+    # 需要持久化保证时，在全部写回完成后统一 fsync
+    if args.fsync and stats['cleaned_files']:
+        sync_cleaned_files(stats['cleaned_files'])
     
     # 如果执行了清理，更新元数据
     if args.clean and stats['files_cleaned'] > 0:
-        cleaned_stocks = [d['stock_code'] for d in stats['details']]
-        update_metadata_after_cleaning(data_dir, cleaned_stocks)
+        update_metadata_after_cleaning(data_dir, stats['last_dates'])
     
     # 打印报告
     print_report(stats, dry_run)
@@ -264,25 +598,19 @@ def main():
         report_file = os.path.join(data_dir, f"suspended_data_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
         
         try:
-            with open(report_file, 'w', encoding='utf-8') as f:
+            # 1 MiB 写缓冲，各文件的报告片段已在工作进程中格式化好，一次写入
+            with open(report_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
                 f.write("停牌数据清理报告\n")
                 f.write("=" * 80 + "\n")
                 f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"模式: {'只检测' if dry_run else '检测并清理'}\n")
                 f.write(f"总文件数: {stats['total_files']}\n")
+                f.write(f"未修改跳过的文件: {stats['files_skipped']}\n")
                 f.write(f"包含停牌数据的文件: {stats['files_with_suspended']}\n")
                 f.write(f"总共移除记录数: {stats['total_records_removed']}\n")
                 f.write("\n详细信息:\n")
                 f.write("-" * 80 + "\n")
-                
-                for detail in stats['details']:
-                    f.write(f"\n股票代码: {detail['stock_code']}\n")
-                    f.write(f"  原始记录: {detail['original_count']} 条\n")
-                    f.write(f"  移除记录: {detail['removed_count']} 条\n")
-                    f.write(f"  剩余记录: {detail['remaining_count']} 条\n")
-                    
-                    if detail['removed_dates']:
-                        f.write(f"  停牌日期: {', '.join(detail['removed_dates'])}\n")
+                f.writelines(stats['report_chunks'])
             
             print(f"\n详细报告已保存到: {report_file}")
         
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+将个股 CSV 数据文件转换为 Parquet 格式
+
+功能：
+    1. 扫描 data/CN 目录下所有 stock_*.csv 文件
+    2. 转换为同名的 stock_*.parquet（snappy 压缩，列式存储）
+    3. 可选删除原 CSV 文件
+
+转换后在 config.py 中设置 STORAGE_FORMAT = "parquet"，
+每日更新脚本即会读写 Parquet 文件；分析脚本只读取需要的列，速度更快
+
+使用方法：
+    make convert-parquet
+    或
+    poetry run python scripts/convert_to_parquet.py [--delete-csv] [--force]
+"""
+
+import os
+import sys
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import OUTPUT_DIR, CN_DIR
+from utils import read_stock_file, save_dataframe
+from utils.data_saver import HAS_PYARROW
+
+
+def convert_to_parquet(data_dir: str, delete_csv: bool = False, force: bool = False) -> dict:
+    """
+    将目录下所有个股 CSV 文件转换为 Parquet
+    
+    已存在且不早于 CSV 的 Parquet 文件默认跳过（force=True 时重新转换）
+    
+    Args:
+        data_dir: 数据目录路径
+        delete_csv: 转换成功后是否删除 CSV 文件
+        force: 是否强制重新转换
+    
+    Returns:
+        dict: 统计信息 {'total', 'converted', 'skipped', 'failed'}
+    """
+    with os.scandir(data_dir) as it:
+        csv_files = sorted(
+            (entry.name, entry.path) for entry in it
+            if entry.name.startswith('stock_') and entry.name.endswith('.csv')
+        )
+    
+    stats = {'total': len(csv_files), 'converted': 0, 'skipped': 0, 'failed': 0}
+    print(f"找到 {stats['total']} 个 CSV 文件")
+    print("-" * 80)
+    
+    for idx, (filename, csv_path) in enumerate(csv_files, 1):
+        stock_code = filename[len('stock_'):-len('.csv')]
+        parquet_path = csv_path[:-len('.csv')] + '.parquet'
+        
+        try:
+            if (
+                not force
+                and os.path.exists(parquet_path)
+                and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+            ):
+                stats['skipped'] += 1
+                continue
+            
+            df = read_stock_file(csv_path)
+            save_dataframe(df, parquet_path, stock_code)
+            stats['converted'] += 1
+            
+            if delete_csv:
+                os.remove(csv_path)
+        except Exception as e:
+            stats['failed'] += 1
+            print(f"[{idx}/{stats['total']}] {stock_code}: ❌ 转换失败 - {e}")
+            continue
+        
+        # 每100个文件显示一次进度
+        if idx % 100 == 0:
+            print(f"[{idx}/{stats['total']}] 已处理 {idx} 个文件...")
+    
+    print("-" * 80)
+    return stats
+
+
+def main():
+    """主函数"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description='将个股 CSV 数据文件转换为 Parquet 格式',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  %(prog)s                    # 转换所有 CSV（保留原文件）
+  %(prog)s --delete-csv       # 转换后删除 CSV
+  %(prog)s --force            # 重新转换已存在的 Parquet
+"""
+    )
+    parser.add_argument('--delete-csv', action='store_true', help='转换成功后删除原 CSV 文件')
+    parser.add_argument('--force', action='store_true', help='重新转换已存在且较新的 Parquet 文件')
+    args = parser.parse_args()
+    
+    if not HAS_PYARROW:
+        print("❌ 转换 Parquet 需要安装 pyarrow: poetry add pyarrow")
+        sys.exit(1)
+    
+    data_dir = os.path.join(OUTPUT_DIR, CN_DIR)
+    if not os.path.exists(data_dir):
+        print(f"❌ 数据目录不存在: {data_dir}")
+        sys.exit(1)
+    
+    print("=" * 80)
+    print("CSV → Parquet 转换工具")
+    print("=" * 80)
+    
+    stats = convert_to_parquet(data_dir, delete_csv=args.delete_csv, force=args.force)
+    
+    print(f"转换: {stats['converted']}  跳过: {stats['skipped']}  失败: {stats['failed']}")
+    if stats['converted'] > 0:
+        print("\n💡 提示: 在 config.py 中设置 STORAGE_FORMAT = \"parquet\" 后，每日更新会直接读写 Parquet 文件")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
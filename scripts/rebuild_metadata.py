@@ -2,7 +2,7 @@
 """
 重建元数据文件
 
-从现有的股票 CSV 文件重建元数据，提高后续检查性能
+从现有的个股数据文件（CSV 或 Parquet，按 STORAGE_FORMAT）重建元数据，提高后续检查性能
 
 使用方法：
     make rebuild-metadata
@@ -12,7 +12,7 @@
 
 import os
 import pandas as pd
-from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE
+from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE, STORAGE_FORMAT
 from utils import MetadataManager
 
 
@@ -38,10 +38,10 @@ def main():
     print(f"共 {len(stock_codes)} 只股票\n")
     
     # 初始化元数据管理器
-    metadata_mgr = MetadataManager(cn_dir)
+    metadata_mgr = MetadataManager(cn_dir, STORAGE_FORMAT)
     
     # 重建元数据
-    print("正在扫描 CSV 文件...")
+    print("正在扫描个股数据文件...")
     success_count = metadata_mgr.rebuild_from_files(stock_codes)
     
     # 显示统计
@@ -19,20 +19,47 @@
 
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 from datetime import datetime, timedelta
-import time
-import random
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE, START_DATE, DELAY_MIN, DELAY_MAX
-from fetchers import MultiSourceFetcher
-from utils import save_dataframe, get_safe_end_date
+from config import (
+    OUTPUT_DIR, CN_DIR, STOCK_LIST_FILE, START_DATE, DELAY_MIN, DELAY_MAX,
+    STORAGE_FORMAT, FETCH_WORKERS, FETCH_BURST
+)
+from fetchers import MultiSourceFetcher, DATA_SOURCES
+from utils import save_dataframe, get_safe_end_date, get_stock_file_path, RateLimiter
 
+# 进度输出使用启动时的 stdout：数据源获取时会临时把全局 sys.stdout 替换为 devnull，
+# 此时其他线程 print 到 sys.stdout 的进度行会丢失
+_STDOUT = sys.stdout
 
-def restore_original_data_for_stock(stock_code: str, stock_name: str, output_dir: str):
+# 输出锁：避免多线程输出交错
+print_lock = threading.Lock()
+
+
+def emit(message: str) -> None:
+    """
+    线程安全地输出一行进度信息（写入启动时的 stdout）
+    
+    Args:
+        message: 进度信息
+    """
+    with print_lock:
+        print(message, file=_STDOUT, flush=True)
+
+
+def restore_original_data_for_stock(
+    stock_code: str,
+    stock_name: str,
+    output_dir: str,
+    fetcher: MultiSourceFetcher,
+    prefix: str = ''
+):
     """
     重新获取单只股票的原始数据（不过滤停牌数据）
     
@@ -40,41 +67,45 @@ def restore_original_data_for_stock(stock_code: str, stock_name: str, output_dir
         stock_code: 股票代码
         stock_name: 股票名称
         output_dir: 输出目录
+        fetcher: 多数据源管理器（在 main 中创建一次，所有股票共用，避免每只股票重新登录；
+            请求各数据源前按其限速器等待）
+        prefix: 输出信息前缀（如进度序号）
     
     Returns:
         是否成功
     """
-    output_file = os.path.join(output_dir, f'stock_{stock_code}.csv')
+    output_file = get_stock_file_path(output_dir, stock_code, STORAGE_FORMAT)
     
     # 获取安全的结束日期（昨天）
     end_date = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
     
-    print(f"正在获取 {stock_code} {stock_name} 的原始数据...")
-    
     try:
-        with MultiSourceFetcher() as fetcher:
-            result = fetcher.fetch(
-                stock_code=stock_code,
-                stock_name=stock_name,
-                start_date=START_DATE,
-                end_date=end_date,
-                adjust_type='qfq'
-            )
-            
-            if result.data is None:
-                print(f"  ❌ 获取失败")
-                return False
-            
-            df = result.data
-            
-            # 不过滤停牌数据，直接保存
-            save_dataframe(df, output_file, stock_code)
-            
-            print(f"  ✅ 成功获取 {len(df)} 条记录（包含停牌数据）")
-            return True
+        emit(f"{prefix}正在获取 {stock_code} {stock_name} 的原始数据...")
+        
+        # baostock 会话由 MultiSourceFetcher 内部加锁串行访问
+        result = fetcher.fetch(
+            stock_code=stock_code,
+            stock_name=stock_name,
+            start_date=START_DATE,
+            end_date=end_date,
+            adjust_type='qfq',
+            skip_suspended=False  # 保留停牌日记录
+        )
+        
+        if result.data is None:
+            emit(f"{prefix}  ❌ {stock_code} 获取失败")
+            return False
+        
+        df = result.data
+        
+        # 不过滤停牌数据，直接保存（写文件在各线程中并行执行）
+        save_dataframe(df, output_file, stock_code)
+        
+        emit(f"{prefix}  ✅ {stock_code} 成功获取 {len(df)} 条记录（包含停牌数据）")
+        return True
     
     except Exception as e:
-        print(f"  ❌ 错误: {str(e)}")
+        emit(f"{prefix}  ❌ {stock_code} 错误: {str(e)}")
         return False
 
 
@@ -150,22 +181,26 @@ def main():
     success_count = 0
     failed_count = 0
     
-    # 处理每只股票
-    for idx, (_, row) in enumerate(stock_list.iterrows(), 1):
-        stock_code = row['code']
-        stock_name = row['name']
-        
-        print(f"[{idx}/{len(stock_list)}] ", end='')
-        
-        if restore_original_data_for_stock(stock_code, stock_name, data_dir):
-            success_count += 1
-        else:
-            failed_count += 1
-        
-        # 延迟
-        if idx < len(stock_list):
-            delay = random.uniform(DELAY_MIN, DELAY_MAX)
-            time.sleep(delay)
+    # 并行处理每只股票：同一数据源的请求按 DELAY_MIN~DELAY_MAX 限速，写文件并行执行
+    rate_limiters = {source: RateLimiter(DELAY_MIN, DELAY_MAX, FETCH_BURST) for source in DATA_SOURCES}
+    total = len(stock_list)
+    stock_pairs = zip(stock_list['code'].to_numpy(), stock_list['name'].to_numpy())
+    
+    with MultiSourceFetcher(rate_limiters=rate_limiters) as fetcher:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            futures = [
+                executor.submit(
+                    restore_original_data_for_stock,
+                    stock_code, stock_name, data_dir, fetcher, f"[{idx}/{total}] "
+                )
+                for idx, (stock_code, stock_name) in enumerate(stock_pairs, 1)
+            ]
+            
+            for future in as_completed(futures):
+                if future.result():
+                    success_count += 1
+                else:
+                    failed_count += 1
     
     print()
     print("=" * 80)
@@ -15,13 +15,17 @@ print()
 # 测试股票代码（带前导零）
 test_codes = ['000001', '000002', '600519']
 
-for stock_code in test_codes:
-    print(f"测试股票代码: {stock_code}")
-    print("-" * 60)
-    
-    # 测试 Baostock
-    try:
-        with BaostockFetcher() as bs_fetcher:
+# 数据获取器在循环外创建一次（baostock 只登录一次）
+ak_fetcher = AkshareFetcher()
+yf_fetcher = YFinanceFetcher()
+
+with BaostockFetcher() as bs_fetcher:
+    for stock_code in test_codes:
+        print(f"测试股票代码: {stock_code}")
+        print("-" * 60)
+        
+        # 测试 Baostock
+        try:
             df = bs_fetcher.fetch(stock_code, '20260210', '20260210')
             if df is not None and not df.empty:
                 code_value = df['股票代码'].iloc[0]
@@ -29,36 +33,34 @@ for stock_code in test_codes:
                 print(f"  Baostock:  {status}")
             else:
                 print(f"  Baostock:  ⏭️  无数据")
-    except Exception as e:
-        print(f"  Baostock:  ❌ 错误: {str(e)[:30]}")
-    
-    # 测试 Akshare
-    try:
-        ak_fetcher = AkshareFetcher()
-        df = ak_fetcher.fetch(stock_code, '20260210', '20260210', 'qfq')
-        if df is not None and not df.empty:
-            code_value = df['股票代码'].iloc[0]
-            status = "✅" if code_value == stock_code else f"❌ (实际值: {code_value})"
-            print(f"  Akshare:   {status}")
-        else:
-            print(f"  Akshare:   ⏭️  无数据")
-    except Exception as e:
-        print(f"  Akshare:   ❌ 错误: {str(e)[:30]}")
-    
-    # 测试 YFinance
-    try:
-        yf_fetcher = YFinanceFetcher()
-        df = yf_fetcher.fetch(stock_code, '20260210', '20260210')
-        if df is not None and not df.empty:
-            code_value = df['股票代码'].iloc[0]
-            status = "✅" if code_value == stock_code else f"❌ (实际值: {code_value})"
-            print(f"  YFinance:  {status}")
-        else:
-            print(f"  YFinance:  ⏭️  无数据")
-    except Exception as e:
-        print(f"  YFinance:  ❌ 错误: {str(e)[:30]}")
-    
-    print()
+        except Exception as e:
+            print(f"  Baostock:  ❌ 错误: {str(e)[:30]}")
+        
+        # 测试 Akshare
+        try:
+            df = ak_fetcher.fetch(stock_code, '20260210', '20260210', 'qfq')
+            if df is not None and not df.empty:
+                code_value = df['股票代码'].iloc[0]
+                status = "✅" if code_value == stock_code else f"❌ (实际值: {code_value})"
+                print(f"  Akshare:   {status}")
+            else:
+                print(f"  Akshare:   ⏭️  无数据")
+        except Exception as e:
+            print(f"  Akshare:   ❌ 错误: {str(e)[:30]}")
+        
+        # 测试 YFinance
+        try:
+            df = yf_fetcher.fetch(stock_code, '20260210', '20260210')
+            if df is not None and not df.empty:
+                code_value = df['股票代码'].iloc[0]
+                status = "✅" if code_value == stock_code else f"❌ (实际值: {code_value})"
+                print(f"  YFinance:  {status}")
+            else:
+                print(f"  YFinance:  ⏭️  无数据")
+        except Exception as e:
+            print(f"  YFinance:  ❌ 错误: {str(e)[:30]}")
+        
+        print()
 
 print("=" * 60)
 print("测试完成")
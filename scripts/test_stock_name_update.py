@@ -88,16 +88,14 @@ def test_stock_name_update():
         unique_names = df_updated['股票名称'].unique()
         
         # 检查名称变化历史
-        name_changes = []
-        prev_name = None
-        for idx, row in df_updated.iterrows():
-            current_name = row['股票名称']
-            if prev_name is None or current_name != prev_name:
-                name_changes.append({
-                    'date': row['日期'],
-                    'name': current_name
-                })
-                prev_name = current_name
+        # 与上一行名称不同的行即为名称变化点（第一行与 NaN 比较，总是计入）
+        names = df_updated['股票名称']
+        change_mask = names.ne(names.shift())
+        name_changes = (
+            df_updated.loc[change_mask, ['日期', '股票名称']]
+            .rename(columns={'日期': 'date', '股票名称': 'name'})
+            .to_dict('records')
+        )
         
         if len(unique_names) == 2 and '乐视网' in unique_names and '*ST乐视' in unique_names:
             print("   ✅ 测试通过！历史名称已保留，可以追踪名称变化")
@@ -73,9 +73,9 @@ def test_suspended_filter():
         if actual_dates == expected_dates:
             print("   ✅ 测试通过！停牌数据已被正确过滤")
             print(f"\n   保留的交易日期:")
-            for date in actual_dates:
-                row = df_filtered[df_filtered['日期'] == date].iloc[0]
-                print(f"      {date}: 成交量={row['成交量']:.0f}, 成交额={row['成交额']:.2f}")
+            rows = df_filtered.set_index('日期').loc[actual_dates, ['成交量', '成交额']]
+            for date, volume, amount in rows.itertuples(name=None):
+                print(f"      {date}: 成交量={volume:.0f}, 成交额={amount:.2f}")
             
             print(f"\n   被过滤的停牌日期:")
             suspended_dates = ['2026-01-12', '2026-01-13', '2026-01-14', '2026-01-15', '2026-01-16']
@@ -168,8 +168,8 @@ def test_merge_with_filter():
         if len(df_final) == expected_count:
             print(f"   ✅ 测试通过！最终保存了 {expected_count} 条正常交易数据")
             print(f"\n   保存的交易日期:")
-            for _, row in df_final.iterrows():
-                print(f"      {row['日期']}: 成交量={row['成交量']:.0f}")
+            for date, volume in df_final[['日期', '成交量']].itertuples(index=False, name=None):
+                print(f"      {date}: 成交量={volume:.0f}")
             return True
         else:
             print(f"   ❌ 测试失败！")
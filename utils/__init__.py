@@ -4,18 +4,44 @@
 提供通用的辅助函数
 """
 
-from .trading_day_checker import has_trading_day
+from .trading_day_checker import has_trading_day, get_trading_days
 from .market_status_checker import get_safe_end_date
-from .missing_date_range_checker import get_missing_date_range
+from .missing_date_range_checker import (
+    get_missing_date_range,
+    fast_check_up_to_date,
+)
 from .metadata_manager import MetadataManager
-from .data_saver import save_dataframe, merge_and_save_data, filter_suspended_trading_data
+from .stock_list_loader import load_stock_list, read_stock_list, save_stock_list, lookup_stock_names
+from .rate_limiter import RateLimiter
+from .buffered_writer import BufferedStockWriter
+from .data_saver import (
+    save_dataframe,
+    merge_and_save_data,
+    filter_suspended_trading_data,
+    get_stock_file_path,
+    read_stock_file,
+    read_last_date,
+    append_if_newer,
+)
 
 __all__ = [
     'has_trading_day',
+    'get_trading_days',
     'get_safe_end_date',
     'get_missing_date_range',
+    'fast_check_up_to_date',
     'MetadataManager',
+    'load_stock_list',
+    'read_stock_list',
+    'save_stock_list',
+    'lookup_stock_names',
+    'RateLimiter',
     'save_dataframe',
     'merge_and_save_data',
-    'filter_suspended_trading_data'
+    'filter_suspended_trading_data',
+    'get_stock_file_path',
+    'read_stock_file',
+    'read_last_date',
+    'append_if_newer',
+    'BufferedStockWriter',
 ]
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+延迟写入工具
+按股票缓存新数据，每累积一定数量的股票再统一写入文件，减少频繁的打开/关闭文件
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, List, Tuple, Optional
+import pandas as pd
+from .metadata_manager import MetadataManager
+from .data_saver import (
+    filter_suspended_trading_data,
+    save_dataframe,
+    merge_and_save_data,
+    append_if_newer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _later_date(date_a: Optional[str], date_b: Optional[str]) -> Optional[str]:
+    """
+    返回两个 YYYYMMDD 日期中较晚的一个（忽略 None）
+
+    Args:
+        date_a: 日期（可为 None）
+        date_b: 日期（可为 None）
+
+    Returns:
+        str: 较晚的日期，两者都为 None 时返回 None
+    """
+    if date_a is None:
+        return date_b
+    if date_b is None:
+        return date_a
+    return max(date_a, date_b)
+
+
+class BufferedStockWriter:
+    """
+    股票数据延迟写入器
+
+    push() 只把新数据和待更新的最新日期放入内存缓冲区，
+    flush() 时每只股票合并一次缓冲数据，执行一次追加或合并写入，写入成功后再更新该股票的元数据
+
+    线程安全：push() 可在多个线程中调用，flush() 会先取出缓冲区再写文件；
+    flush() 期间新 push 的股票留在新的缓冲区中，其元数据不会先于数据写入
+
+    注意：程序退出前需要调用 flush()，否则缓冲区中的数据会丢失（元数据未更新，下次运行时会重新获取）
+    """
+
+    def __init__(self, flush_every: int = 100, metadata_manager: Optional[MetadataManager] = None):
+        """
+        初始化延迟写入器
+
+        Args:
+            flush_every: 缓冲多少只股票后需要写入（由调用方根据 should_flush() 触发）
+            metadata_manager: 元数据管理器（可选）
+        """
+        self.flush_every = flush_every
+        self.metadata_manager = metadata_manager
+        self._lock = threading.Lock()
+        # {股票代码: ([新数据, ...], 输出文件路径, 是否完全刷新, 写入成功后更新到元数据的最新日期)}
+        self._buffer: Dict[str, Tuple[List[pd.DataFrame], str, bool, Optional[str]]] = {}
+
+    def push(
+        self,
+        df_new: pd.DataFrame,
+        output_file: str,
+        stock_code: str,
+        need_full_refresh: bool,
+        fetch_end_date: Optional[str] = None
+    ) -> Tuple[bool, int, int]:
+        """
+        缓存一只股票的新数据（参数与 merge_and_save_data 一致）
+
+        Args:
+            df_new: 新获取的数据
+            output_file: 输出文件路径
+            stock_code: 股票代码
+            need_full_refresh: 是否完全刷新
+            fetch_end_date: 实际请求的结束日期（格式 YYYYMMDD），用于更新元数据（可选）
+
+        Returns:
+            Tuple[is_update, new_count, removed_count]: (是否为更新操作, 新增数据条数, 过滤的停牌数据条数)
+            removed_count 只统计新数据中的停牌记录
+        """
+        df_new_filtered, removed_count = filter_suspended_trading_data(df_new)
+
+        # 优先使用请求的结束日期（避免因停牌导致重复拉取），否则使用新数据的最大日期
+        last_date = fetch_end_date
+        if not last_date and not df_new_filtered.empty:
+            date_col = '日期' if '日期' in df_new_filtered.columns else 'date'
+            last_date = pd.to_datetime(df_new_filtered[date_col]).max().strftime('%Y%m%d')
+
+        update_now = False
+        with self._lock:
+            if not df_new_filtered.empty:
+                frames, _, full_refresh, pending_date = self._buffer.get(stock_code, ([], output_file, False, None))
+                # 完全刷新会覆盖文件，之前缓冲的数据不再需要
+                if need_full_refresh:
+                    frames = []
+                frames.append(df_new_filtered)
+                self._buffer[stock_code] = (
+                    frames, output_file, full_refresh or need_full_refresh, _later_date(pending_date, last_date)
+                )
+            elif stock_code in self._buffer:
+                # 新数据全部为停牌数据，但该股票仍有未写入的数据：等写入后再一起更新元数据
+                frames, output_file, full_refresh, pending_date = self._buffer[stock_code]
+                self._buffer[stock_code] = (frames, output_file, full_refresh, _later_date(pending_date, last_date))
+            else:
+                # 没有需要写入的数据，元数据可以立即更新
+                update_now = True
+
+        if update_now and last_date and self.metadata_manager is not None:
+            self.metadata_manager.update_last_date(stock_code, last_date)
+
+        if df_new_filtered.empty:
+            return False, 0, removed_count
+
+        is_update = os.path.exists(output_file)
+        return is_update, len(df_new_filtered), removed_count
+
+    def pending_count(self) -> int:
+        """
+        获取缓冲区中待写入的股票数量
+
+        Returns:
+            int: 待写入的股票数量
+        """
+        with self._lock:
+            return len(self._buffer)
+
+    def should_flush(self) -> bool:
+        """
+        缓冲的股票数量是否已达到写入阈值
+
+        Returns:
+            bool: 是否需要调用 flush()
+        """
+        return self.pending_count() >= self.flush_every
+
+    def flush(self) -> int:
+        """
+        将缓冲区中的数据写入文件（每只股票一次写入）
+
+        Returns:
+            int: 写入失败的股票数量
+        """
+        with self._lock:
+            buffer, self._buffer = self._buffer, {}
+
+        fail_count = 0
+        written_dates = {}
+        for stock_code, (frames, output_file, full_refresh, last_date) in buffer.items():
+            try:
+                df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+                if full_refresh or not os.path.exists(output_file):
+                    save_dataframe(df, output_file, stock_code)
+                elif not append_if_newer(df, output_file, stock_code):
+                    # 元数据在写入成功后统一更新，这里不传入元数据管理器
+                    merge_and_save_data(df, output_file, stock_code, False)
+            except Exception as e:
+                fail_count += 1
+                # 元数据未更新，下次运行时根据文件内容重新判断缺失范围
+                logger.error(f"写入 {stock_code} 数据失败: {e}")
+                continue
+            if last_date:
+                written_dates[stock_code] = last_date
+
+        # 只更新已成功写入文件的股票的元数据
+        if self.metadata_manager is not None:
+            self.metadata_manager.bulk_update_last_dates(written_dates)
+
+        return fail_count
@@ -6,12 +6,144 @@
 
 import os
 import logging
+import numpy as np
 import pandas as pd
+from functools import lru_cache
 from typing import Tuple, Optional
 from .metadata_manager import MetadataManager
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from pyarrow import csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+    pa_csv = None
+    HAS_PYARROW = False
+
+# 可选：安装了 polars 且设置环境变量 STORAGE_ENGINE=polars 时，CSV 合并改用 polars 完成
+try:
+    import polars as pl
+    HAS_POLARS = True
+except ImportError:
+    pl = None
+    HAS_POLARS = False
+
 logger = logging.getLogger(__name__)
 
+# 合并历史 CSV 时使用的引擎: pandas(默认), polars(需安装 polars)
+STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'pandas')
+
+# 写 CSV 文件时的缓冲区大小（1MB，整个个股文件通常一次写入磁盘）
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 支持的存储格式及对应的文件扩展名
+STORAGE_EXTENSIONS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+}
+
+# 个股 CSV 中类型确定的列，读取时显式指定，跳过类型推断
+# 价格、振幅、涨跌幅等列由数据源写入为保留2位小数的浮点数，按 float64 读取与推断结果一致；
+# 成交量、成交额可能为整数或含空值，仍由解析器推断，避免写回 CSV 时格式发生变化
+# （不降为 float32：清理脚本会把读取的数据写回文件，float32 会改变保存的数值）
+STOCK_CSV_DTYPES = {
+    '日期': str,
+    'date': str,
+    '股票代码': str,
+    '股票名称': str,
+    '开盘': 'float64',
+    '收盘': 'float64',
+    '最高': 'float64',
+    '最低': 'float64',
+    '振幅': 'float64',
+    '涨跌幅': 'float64',
+    '涨跌额': 'float64',
+    '换手率': 'float64',
+}
+
+
+def get_stock_file_path(data_dir: str, stock_code: str, storage_format: str = 'csv') -> str:
+    """
+    获取股票数据文件路径
+    
+    Args:
+        data_dir: 数据目录
+        stock_code: 股票代码
+        storage_format: 存储格式（csv/parquet）
+    
+    Returns:
+        str: 股票数据文件路径，如 data/CN/stock_000001.csv
+    """
+    ext = STORAGE_EXTENSIONS.get(storage_format)
+    if ext is None:
+        raise ValueError(f"不支持的存储格式: {storage_format}")
+    return os.path.join(data_dir, f"stock_{stock_code}{ext}")
+
+
+def read_stock_file(file_path: str) -> pd.DataFrame:
+    """
+    读取股票数据文件（根据扩展名自动选择 CSV 或 Parquet）
+    
+    已安装 pyarrow 时使用其多线程 CSV 解析器，否则使用 pandas
+    
+    Args:
+        file_path: 文件路径
+    
+    Returns:
+        DataFrame: 股票数据（股票代码为字符串类型）
+    """
+    if file_path.endswith('.parquet'):
+        return pd.read_parquet(file_path)
+    if HAS_PYARROW:
+        return _read_stock_csv_pyarrow(file_path)
+    return pd.read_csv(file_path, dtype=STOCK_CSV_DTYPES)
+
+
+def _read_stock_csv_pyarrow(file_path: str) -> pd.DataFrame:
+    """
+    使用 pyarrow 的多线程 CSV 解析器读取股票数据文件
+    
+    列类型与 STOCK_CSV_DTYPES 一致（日期和股票代码按字符串读取）
+    
+    Args:
+        file_path: CSV 文件路径
+    
+    Returns:
+        DataFrame: 股票数据
+    """
+    convert_options = pa_csv.ConvertOptions(
+        column_types={
+            col: pa.string() if dtype is str else pa.float64()
+            for col, dtype in STOCK_CSV_DTYPES.items()
+        }
+    )
+    table = pa_csv.read_csv(file_path, convert_options=convert_options)
+    return table.to_pandas()
+
+
+@lru_cache(maxsize=32)
+def _resolve_suspend_columns(columns: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    """
+    确定成交量、成交额的列名（兼容中英文列名），同一组列名只解析一次
+    
+    Args:
+        columns: DataFrame 的列名元组
+    
+    Returns:
+        Tuple[str, str]: (成交量列名, 成交额列名)
+        None: 缺少成交量或成交额列
+    """
+    volume_col = '成交量' if '成交量' in columns else 'volume'
+    amount_col = '成交额' if '成交额' in columns else 'amount'
+    if volume_col in columns and amount_col in columns:
+        return volume_col, amount_col
+    return None
+
 
 def filter_suspended_trading_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
     """
@@ -28,22 +160,23 @@ def filter_suspended_trading_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
     if df.empty:
         return df, 0
     
-    # 兼容中英文列名
-    volume_col = '成交量' if '成交量' in df.columns else 'volume'
-    amount_col = '成交额' if '成交额' in df.columns else 'amount'
+    # 兼容中英文列名（批量处理时各文件列名相同，解析结果按列名缓存）
+    suspend_columns = _resolve_suspend_columns(tuple(df.columns))
     
-    if volume_col in df.columns and amount_col in df.columns:
-        original_count = len(df)
-        
+    if suspend_columns is not None:
+        volume_col, amount_col = suspend_columns
         # 过滤：保留成交量和成交额都不为空且大于0的记录
-        df_filtered = df[
-            (df[volume_col].notna()) &
-            (df[amount_col].notna()) &
-            (df[volume_col] > 0) &
-            (df[amount_col] > 0)
-        ].copy()
+        # 直接在 numpy 数组上比较（空值转为 NaN，NaN > 0 为 False，等价于 notna 且 > 0）
+        volume = df[volume_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        amount = df[amount_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            mask = volume > 0
+            np.logical_and(mask, amount > 0, out=mask)  # 原地合并，不再分配新的掩码数组
         
-        removed_count = original_count - len(df_filtered)
+        # take 按行号一次复制出新的 DataFrame（布尔索引后再 copy 会复制两次）
+        keep_idx = np.flatnonzero(mask)
+        removed_count = len(mask) - len(keep_idx)
+        df_filtered = df.take(keep_idx)
         
         # 返回过滤结果（不输出日志，由调用方决定是否显示）
         return df_filtered, removed_count
@@ -51,24 +184,332 @@ def filter_suspended_trading_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
     return df, 0
 
 
-def save_dataframe(df: pd.DataFrame, output_file: str, stock_code: str) -> None:
+def read_parquet_date_column(file_path: str) -> pd.DataFrame:
     """
-    保存DataFrame到CSV文件，确保股票代码格式正确
+    只读取 Parquet 个股文件的日期列（兼容中英文列名）
+    
+    Args:
+        file_path: Parquet 文件路径
+    
+    Returns:
+        DataFrame: 只包含日期列的数据；文件没有日期列时返回空 DataFrame
+    """
+    if HAS_PYARROW:
+        columns = pq.read_schema(file_path).names
+    else:
+        columns = pd.read_parquet(file_path).columns
+    date_col = '日期' if '日期' in columns else 'date'
+    if date_col not in columns:
+        return pd.DataFrame()
+    return pd.read_parquet(file_path, columns=[date_col])
+
+
+def read_last_date(file_path: str) -> Optional[str]:
+    """
+    读取股票数据文件最后一行的日期
+    
+    CSV 只读取表头和文件尾部，不解析整个文件；Parquet 只读取日期列
+    
+    Args:
+        file_path: CSV/Parquet 文件路径
+    
+    Returns:
+        str: 最后一行的日期字符串（如 2024-01-05），文件无数据行时返回 None
+    """
+    if file_path.endswith('.parquet'):
+        dates_df = read_parquet_date_column(file_path)
+        if dates_df.empty:
+            return None
+        return str(dates_df.iloc[-1, 0])
+    
+    with open(file_path, 'rb') as f:
+        header = f.readline().decode('utf-8-sig').strip().split(',')
+        date_col = '日期' if '日期' in header else 'date'
+        if date_col not in header:
+            return None
+        
+        # 从文件末尾向前读取，直到包含完整的最后一行
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        block = 512
+        while True:
+            offset = max(0, size - block)
+            f.seek(offset)
+            lines = f.read(size - offset).rstrip(b'\r\n').splitlines()
+            if len(lines) >= 2 or offset == 0:
+                break
+            block *= 2
+    
+    # 只有表头、没有数据行
+    if offset == 0 and len(lines) <= 1:
+        return None
+    
+    fields = lines[-1].decode('utf-8').split(',')
+    return fields[header.index(date_col)]
+
+
+def _format_csv_value(value) -> str:
+    """
+    将单个值格式化为CSV字段（与 DataFrame.to_csv 的默认输出保持一致）
+    
+    Args:
+        value: 单元格的值（Python 原生类型）
+    
+    Returns:
+        str: CSV 字段文本
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return '' if value != value else repr(value)  # NaN 输出为空
+    text = str(value)
+    if ',' in text or '"' in text or '\n' in text:
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _format_csv_rows(df: pd.DataFrame) -> str:
+    """
+    将DataFrame的数据行拼接为CSV文本（不含表头）
+    
+    追加写入通常只有一两行，手写格式化比 to_csv 的通用逻辑开销小得多
+    
+    Args:
+        df: 要格式化的数据
+    
+    Returns:
+        str: CSV 文本，每行以换行符结尾
+    """
+    return ''.join(
+        ','.join(_format_csv_value(v) for v in row) + '\n'
+        for row in df.itertuples(index=False, name=None)
+    )
+
+
+def _append_parquet_if_newer(
+    df: pd.DataFrame,
+    output_file: str,
+    stock_code: str,
+    last_date: Optional[str] = None
+) -> bool:
+    """
+    Parquet 文件的尾部追加（参数和返回值与 append_if_newer 一致）
+    
+    Parquet 不支持原地追加：历史数据以 Arrow 表读取后原样写回，新数据作为新的行组写在后面，
+    历史数据不转换为 DataFrame，也不做去重和排序；判断日期时只读取日期列
+    
+    Args:
+        df: 新数据
+        output_file: 已存在的 Parquet 文件路径
+        stock_code: 股票代码（用于确保前导零）
+        last_date: 已知的文件最后日期（如来自元数据），提供时不再读取日期列
+    
+    Returns:
+        bool: 是否已追加（False 表示需要走完整的合并流程）
+    """
+    schema = pq.read_schema(output_file)
+    
+    # 列不一致时无法直接追加
+    if set(schema.names) != set(df.columns):
+        return False
+    
+    date_col = '日期' if '日期' in df.columns else 'date'
+    if last_date is None:
+        dates = pq.read_table(output_file, columns=[date_col])[date_col]
+        if len(dates) == 0:
+            return False
+        last_date = pc.max(dates).as_py()
+    
+    new_dates = pd.to_datetime(df[date_col])
+    if new_dates.min() <= pd.to_datetime(last_date):
+        return False
+    
+    df_append = df[schema.names].copy()
+    df_append[date_col] = new_dates.dt.strftime('%Y-%m-%d').values
+    if '股票代码' in df_append.columns:
+        df_append['股票代码'] = str(stock_code).zfill(6)
+    df_append = df_append.sort_values(by=date_col)
+    
+    try:
+        table_new = pa.Table.from_pandas(df_append, schema=schema, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return False  # 列类型与文件不一致（如成交量整数/浮点不同）时走完整的合并流程
+    
+    table_existing = pq.read_table(output_file)
+    temp_file = f"{output_file}.tmp.{os.getpid()}"
+    try:
+        with pq.ParquetWriter(temp_file, schema, compression='snappy') as writer:
+            writer.write_table(table_existing)
+            writer.write_table(table_new)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return True
+
+
+def append_if_newer(
+    df: pd.DataFrame,
+    output_file: str,
+    stock_code: str,
+    last_date: Optional[str] = None
+) -> bool:
+    """
+    尾部追加快速路径：新数据日期全部晚于文件最后日期时，直接追加写入
+    
+    常见的每日增量更新只在末尾新增一行，无需读取、合并、排序整个文件
+    CSV 文件直接在末尾追加行；Parquet 文件（需安装 pyarrow）追加为新的行组
+    
+    Args:
+        df: 新数据
+        output_file: 已存在的CSV/Parquet文件路径
+        stock_code: 股票代码（用于确保前导零）
+        last_date: 已知的文件最后日期（如来自元数据），提供时不再读取文件尾部
+    
+    Returns:
+        bool: 是否已追加（False 表示需要走完整的合并流程）
+    """
+    if df.empty:
+        return False
+    if output_file.endswith('.parquet'):
+        return HAS_PYARROW and _append_parquet_if_newer(df, output_file, stock_code, last_date)
+    if not output_file.endswith('.csv'):
+        return False
+    
+    with open(output_file, 'rb') as f:
+        header = f.readline().decode('utf-8-sig').strip().split(',')
+        # 空文件无法定位末尾字节，交给完整保存流程处理
+        if f.seek(0, os.SEEK_END) == 0:
+            return False
+        # 文件末尾没有换行符时，追加会与最后一行粘连
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            return False
+    
+    # 列不一致时无法直接追加
+    if set(header) != set(df.columns):
+        return False
+    
+    if last_date is None:
+        last_date = read_last_date(output_file)
+    if last_date is None:
+        return False
+    
+    date_col = '日期' if '日期' in df.columns else 'date'
+    new_dates = pd.to_datetime(df[date_col])
+    if new_dates.min() <= pd.to_datetime(last_date):
+        return False
+    
+    df_append = df[header].copy()
+    df_append[date_col] = new_dates.dt.strftime('%Y-%m-%d').values
+    if '股票代码' in df_append.columns:
+        df_append['股票代码'] = str(stock_code).zfill(6)
+    df_append = df_append.sort_values(by=date_col)
+    
+    # 追加模式不能使用 utf-8-sig，否则会在文件中间写入 BOM
+    with open(output_file, 'a', encoding='utf-8', newline='') as f:
+        f.write(_format_csv_rows(df_append))
+    return True
+
+
+def _is_iso_date_strings(dates: pd.Series) -> bool:
+    """
+    判断日期列是否已全部是 YYYY-MM-DD 格式的字符串
+    
+    Args:
+        dates: 日期列
+    
+    Returns:
+        bool: 是否全部为 YYYY-MM-DD 字符串（为 True 时无需再格式化）
+    """
+    if not (pd.api.types.is_object_dtype(dates) or pd.api.types.is_string_dtype(dates)):
+        return False
+    try:
+        return bool((dates.str.len().eq(10) & dates.str[4].eq('-') & dates.str[7].eq('-')).all())
+    except AttributeError:
+        return False  # 含非字符串值（如 datetime.date 对象）
+
+
+def save_dataframe(df: pd.DataFrame, output_file: str, stock_code: str, **csv_kwargs) -> None:
+    """
+    保存DataFrame到CSV/Parquet文件（根据扩展名），确保股票代码格式正确
+    
+    写入临时文件后用 os.replace 原子替换目标文件
     
     Args:
         df: 要保存的DataFrame
         output_file: 输出文件路径
         stock_code: 股票代码（用于确保前导零）
+        **csv_kwargs: 额外传给 DataFrame.to_csv 的参数（如 quoting），仅 CSV 格式生效
     """
-    # 兼容中英文列名
+    # 兼容中英文列名；日期已是 YYYY-MM-DD 字符串时无需再解析和格式化
     date_col = '日期' if '日期' in df.columns else 'date'
-    df[date_col] = pd.to_datetime(df[date_col]).dt.strftime('%Y-%m-%d')
+    if not _is_iso_date_strings(df[date_col]):
+        df[date_col] = pd.to_datetime(df[date_col]).dt.strftime('%Y-%m-%d')
     
     # 确保股票代码为字符串类型（保留前导零）
+    # 每个文件只保存一只股票，直接广播传入的代码，不再逐行转换字符串
     if '股票代码' in df.columns:
-        df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
+        df['股票代码'] = str(stock_code).zfill(6)
+    
+    # 先写入临时文件再原子替换，写入中途出错或进程被中断时不会留下不完整的文件
+    temp_file = f"{output_file}.tmp.{os.getpid()}"
+    try:
+        if output_file.endswith('.parquet'):
+            df.to_parquet(temp_file, compression='snappy', index=False)
+        else:
+            # 使用大缓冲区写入（utf-8-sig 在文件开头写入 BOM），减少小块写入的系统调用
+            with open(temp_file, 'w', encoding='utf-8-sig', newline='', buffering=WRITE_BUFFER_SIZE) as f:
+                df.to_csv(f, index=False, **csv_kwargs)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def _merge_csv_polars(df_new: pd.DataFrame, output_file: str, date_col: str) -> bool:
+    """
+    使用 polars 合并历史 CSV 与新数据并写回（去重、排序规则与 pandas 路径一致）
+    
+    历史数据以 LazyFrame 扫描，去重排序后写入临时文件再原子替换
+    
+    Args:
+        df_new: 新数据（日期已格式化为 YYYY-MM-DD 字符串）
+        output_file: 已存在的CSV文件路径
+        date_col: 日期列名
     
-    df.to_csv(output_file, index=False, encoding="utf-8-sig")
+    Returns:
+        bool: 是否已合并保存（False 表示列与文件不一致，需要走 pandas 合并流程）
+    """
+    with open(output_file, 'r', encoding='utf-8-sig') as f:
+        header = f.readline().rstrip('\r\n').split(',')
+    if set(header) != set(df_new.columns):
+        return False
+    
+    # 字符串列（日期、股票代码等）不做类型推断，保留前导零；新数据按文件列顺序排列
+    string_columns = {col: pl.Utf8 for col, dtype in STOCK_CSV_DTYPES.items() if dtype is str}
+    lf_existing = pl.scan_csv(output_file, schema_overrides=string_columns)
+    df_new_pl = pl.DataFrame({col: df_new[col].to_numpy() for col in header})
+    
+    # 与 drop_duplicates 默认行为一致：日期重复时保留历史数据
+    merged = (
+        pl.concat([lf_existing, df_new_pl.lazy()], how='vertical_relaxed')
+        .unique(subset=[date_col], keep='first', maintain_order=True)
+        .sort(date_col)
+        .collect()
+    )
+    
+    temp_file = f"{output_file}.tmp.{os.getpid()}"
+    try:
+        merged.write_csv(temp_file, include_bom=True)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return True
 
 
 def merge_and_save_data(
@@ -115,18 +556,34 @@ def merge_and_save_data(
     
     if os.path.exists(output_file) and not need_full_refresh:
         # 增量更新：保留历史数据的原始名称，新数据使用最新名称
-        df_existing = pd.read_csv(output_file, dtype={'股票代码': str})
-        
-        # 也过滤历史数据中的停牌记录
-        df_existing_filtered, removed_count_existing = filter_suspended_trading_data(df_existing)
-        removed_count_total += removed_count_existing
-        
-        df_combined = pd.concat([df_existing_filtered, df_new_filtered], ignore_index=True)
-        
-        df_combined[date_col] = pd.to_datetime(df_combined[date_col])
-        df_combined = df_combined.drop_duplicates(subset=[date_col]).sort_values(by=date_col)
-        
-        save_dataframe(df_combined, output_file, stock_code)
+        # 常见情况是新数据全部晚于文件中的数据，直接追加到文件末尾，不读取整个文件
+        if not append_if_newer(df_new_filtered, output_file, stock_code):
+            # 历史数据在写入时已经过滤过停牌记录，不再重复过滤
+            # （旧版本写入的文件可用 scripts/clean_suspended_data.py --clean 一次性清理）
+            # 日期统一为 YYYY-MM-DD 字符串，字符串顺序与日期顺序一致，直接去重排序，无需转换为 datetime
+            # 历史数据由 save_dataframe 写入，已是该格式；只需格式化新数据的日期
+            new_dates = pd.to_datetime(df_new_filtered[date_col]).dt.strftime('%Y-%m-%d')
+            df_new_dated = df_new_filtered.assign(**{date_col: new_dates.values})
+            if '股票代码' in df_new_dated.columns:
+                df_new_dated['股票代码'] = str(stock_code).zfill(6)
+            
+            use_polars = STORAGE_ENGINE == 'polars' and HAS_POLARS and output_file.endswith('.csv')
+            if not (use_polars and _merge_csv_polars(df_new_dated, output_file, date_col)):
+                df_existing = read_stock_file(output_file)
+                if not _is_iso_date_strings(df_existing[date_col]):
+                    df_existing[date_col] = pd.to_datetime(df_existing[date_col]).dt.strftime('%Y-%m-%d')
+                
+                df_combined = pd.concat([df_existing, df_new_dated], ignore_index=True)
+                # 新数据有序、无重复且全部晚于历史数据（文件已按日期排序）时无需去重和排序
+                already_sorted = (
+                    not df_existing.empty
+                    and new_dates.is_monotonic_increasing and new_dates.is_unique
+                    and new_dates.iloc[0] > df_existing[date_col].iloc[-1]
+                )
+                if not already_sorted:
+                    df_combined = df_combined.drop_duplicates(subset=[date_col]).sort_values(by=date_col)
+                
+                save_dataframe(df_combined, output_file, stock_code)
         is_update = True
         new_count = len(df_new_filtered)
     else:
@@ -143,9 +600,8 @@ def merge_and_save_data(
             metadata_manager.update_last_date(stock_code, fetch_end_date)
         elif not df_new_filtered.empty:
             # 降级方案：使用实际数据的最大日期
-            df_temp = df_new_filtered.copy()
-            df_temp[date_col] = pd.to_datetime(df_temp[date_col])
-            last_date = df_temp[date_col].max().strftime('%Y%m%d')
+            # 只转换日期列求最大值，无需复制整个 DataFrame
+            last_date = pd.to_datetime(df_new_filtered[date_col]).max().strftime('%Y%m%d')
             metadata_manager.update_last_date(stock_code, last_date)
     
     return is_update, new_count, removed_count_total
@@ -7,29 +7,102 @@
 import os
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Dict, Optional
 import pandas as pd
 
+# 跨进程的文件锁：POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# 可选：安装了 orjson 时使用其 C 实现的编解码器（输出格式与 json.dump(indent=2) 一致）
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def _exclusive_file_lock(lock_path: str):
+    """
+    持有锁文件上的排他锁（阻塞等待），用于串行化多个进程对同一文件的写入
+    
+    两种锁机制都不可用时不加锁
+    
+    Args:
+        lock_path: 锁文件路径（不存在时自动创建）
+    """
+    with open(lock_path, 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
 class MetadataManager:
     """
     元数据管理器
     
     管理每只股票的最新日期，避免每次都读取CSV文件
+    
+    线程安全：读写元数据时持有内部锁，可在多线程中共享同一个实例
+    
+    多进程：保存时在文件锁内重新读取文件，只合并本实例的更新，多个进程同时运行时不会丢失对方的更新
+    
+    延迟写入：在 with 块内的更新只修改内存缓存，退出 with 块或调用 flush() 时统一写入文件；
+    with 块外的更新仍然立即写入
     """
     
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, storage_format: str = 'csv'):
         """
         初始化元数据管理器
         
         Args:
             data_dir: 数据目录路径
+            storage_format: 个股文件存储格式（csv/parquet），重建元数据时按此读取文件
         """
         self.data_dir = data_dir
+        self.storage_format = storage_format
         self.metadata_file = os.path.join(data_dir, '.metadata.json')
         self._cache: Optional[Dict[str, str]] = None
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Optional[str]] = {}  # 自上次保存以来的更新（None 表示移除）
+        self._replace_all = False  # 是否用内存缓存整体替换文件（重建元数据时）
+        self._defer_depth = 0     # 嵌套的 with 块层数（大于 0 时延迟写入）
+    
+    def _read_metadata_file(self) -> Dict[str, str]:
+        """
+        读取元数据文件（不使用缓存）
+        
+        Returns:
+            Dict[str, str]: 元数据字典 {"股票代码": "最新日期", ...}
+        """
+        if HAS_ORJSON:
+            with open(self.metadata_file, 'rb') as f:
+                return orjson.loads(f.read())
+        with open(self.metadata_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
     
     def _load_metadata(self) -> Dict[str, str]:
         """
@@ -42,66 +115,106 @@ class MetadataManager:
         if self._cache is not None:
             return self._cache
         
-        try:
-            with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                self._cache = json.load(f)
-            # 成功加载，不输出日志（避免频繁打印）
-            return self._cache
-        except Exception as e:
-            logger.warning(f"加载元数据失败: {e}，使用空元数据")
-            self._cache = {}
-            return self._cache
+        with self._lock:
+            if self._cache is not None:
+                return self._cache
+            try:
+                self._cache = self._read_metadata_file()
+                # 成功加载，不输出日志（避免频繁打印）
+                return self._cache
+            except Exception as e:
+                logger.warning(f"加载元数据失败: {e}，使用空元数据")
+                self._cache = {}
+                return self._cache
     
-    def _save_metadata(self, metadata: Dict[str, str]) -> None:
-        """
-        保存元数据到文件
-        
-        Args:
-            metadata: 元数据字典
+    def _save_metadata(self) -> None:
         """
-        import time
+        将未保存的更新写入文件（调用方需持有内部锁）
         
-        max_retries = 3
-        retry_delay = 0.1  # 100ms
+        在锁文件（.metadata.json.lock）的排他锁内完成“读取-合并-写入”：
+        重新读取文件中的最新内容，只应用本实例自上次保存以来的更新，再原子替换文件，
+        多个进程同时更新元数据时不会互相覆盖对方的更新；保存后内存缓存同步为合并结果
         
-        for attempt in range(max_retries):
-            try:
-                # 确保目录存在
-                os.makedirs(self.data_dir, exist_ok=True)
-                
-                # 使用进程ID和时间戳生成唯一的临时文件名（避免并发冲突）
-                import random
-                temp_file = f"{self.metadata_file}.tmp.{os.getpid()}.{random.randint(1000, 9999)}"
+        重建元数据（_replace_all 为 True）时直接写入内存缓存，不与文件合并
+        """
+        temp_file = f"{self.metadata_file}.tmp.{os.getpid()}"
+        try:
+            # 确保目录存在
+            os.makedirs(self.data_dir, exist_ok=True)
+            
+            with _exclusive_file_lock(f"{self.metadata_file}.lock"):
+                if self._replace_all:
+                    metadata = dict(self._cache)
+                else:
+                    try:
+                        metadata = self._read_metadata_file()
+                    except FileNotFoundError:
+                        metadata = {}
+                    for stock_code, last_date in self._pending.items():
+                        if last_date is None:
+                            metadata.pop(stock_code, None)
+                        else:
+                            metadata[stock_code] = last_date
                 
                 # 写入临时文件
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f, ensure_ascii=False, indent=2)
-                
-                # 确保文件已写入
-                if not os.path.exists(temp_file):
-                    raise FileNotFoundError(f"临时文件创建失败: {temp_file}")
+                if HAS_ORJSON:
+                    with open(temp_file, 'wb') as f:
+                        f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+                else:
+                    with open(temp_file, 'w', encoding='utf-8') as f:
+                        json.dump(metadata, f, ensure_ascii=False, indent=2)
                 
                 # 原子替换（os.replace 在所有平台上都支持原子覆盖）
                 os.replace(temp_file, self.metadata_file)
-                
-                # 成功保存，不输出日志（避免频繁打印）
-                return  # 成功保存，退出
-                
-            except Exception as e:
-                # 清理临时文件
-                try:
-                    if 'temp_file' in locals() and os.path.exists(temp_file):
-                        os.remove(temp_file)
-                except:
-                    pass
-                
-                # 如果是最后一次尝试，记录错误
-                if attempt == max_retries - 1:
-                    logger.error(f"保存元数据失败（重试{max_retries}次后）: {e}")
-                else:
-                    # 短暂延迟后重试
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # 指数退避
+            
+            # 成功保存，不输出日志（避免频繁打印）；缓存同步为合并结果（包含其他进程的更新）
+            self._cache = metadata
+            self._pending = {}
+            self._replace_all = False
+        except Exception as e:
+            # 清理临时文件；未保存的更新保留，下次保存时重试
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            logger.error(f"保存元数据失败: {e}")
+    
+    def _commit(self, changes: Dict[str, Optional[str]]) -> None:
+        """
+        提交更新：应用到内存缓存并记录为待保存，延迟写入期间只记录，否则立即写入文件（调用方需持有锁）
+        
+        Args:
+            changes: 更新字典 {"股票代码": "最新日期" 或 None（None 表示移除）, ...}
+        """
+        metadata = self._load_metadata()
+        for stock_code, last_date in changes.items():
+            if last_date is None:
+                metadata.pop(stock_code, None)
+            else:
+                metadata[stock_code] = last_date
+        self._pending.update(changes)
+        if self._defer_depth == 0:
+            self._save_metadata()
+    
+    def flush(self) -> None:
+        """
+        将延迟的更新写入文件（没有待写入的更新时不做任何操作）
+        """
+        with self._lock:
+            if self._pending or self._replace_all:
+                self._save_metadata()
+    
+    def __enter__(self):
+        """上下文管理器：进入后延迟写入"""
+        with self._lock:
+            self._defer_depth += 1
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器：退出最外层 with 块时写入所有延迟的更新"""
+        with self._lock:
+            self._defer_depth -= 1
+            if self._defer_depth == 0:
+                self.flush()
+        return False
     
     def get_last_date(self, stock_code: str) -> Optional[str]:
         """
@@ -116,6 +229,18 @@ class MetadataManager:
         metadata = self._load_metadata()
         return metadata.get(stock_code)
     
+    def snapshot_last_dates(self) -> Dict[str, str]:
+        """
+        获取所有股票最新日期的快照（普通字典副本）
+        
+        适用于循环前一次性取出，循环内直接查字典，避免逐只调用 get_last_date
+        
+        Returns:
+            Dict[str, str]: {"股票代码": "最新日期", ...}
+        """
+        with self._lock:
+            return dict(self._load_metadata())
+    
     def update_last_date(self, stock_code: str, last_date: str) -> None:
         """
         更新股票的最新日期
@@ -124,10 +249,8 @@ class MetadataManager:
             stock_code: 股票代码
             last_date: 最新日期（格式 YYYYMMDD）
         """
-        metadata = self._load_metadata()
-        metadata[stock_code] = last_date
-        self._cache = metadata
-        self._save_metadata(metadata)
+        with self._lock:
+            self._commit({stock_code: last_date})
     
     def batch_update(self, updates: Dict[str, str]) -> None:
         """
@@ -136,12 +259,25 @@ class MetadataManager:
         Args:
             updates: 更新字典 {"股票代码": "最新日期", ...}
         """
-        metadata = self._load_metadata()
-        metadata.update(updates)
-        self._cache = metadata
-        self._save_metadata(metadata)
+        with self._lock:
+            self._commit(dict(updates))
         logger.info(f"批量更新元数据: {len(updates)} 只股票")
     
+    def bulk_update_last_dates(self, updates: Dict[str, str]) -> None:
+        """
+        批量更新多个股票的最新日期（只写一次文件，不输出日志）
+        
+        适用于循环中先收集更新、循环结束后统一落盘的场景，
+        避免每只股票都重写一次元数据文件
+        
+        Args:
+            updates: 更新字典 {"股票代码": "最新日期", ...}
+        """
+        if not updates:
+            return
+        with self._lock:
+            self._commit(dict(updates))
+    
     def remove_stock(self, stock_code: str) -> None:
         """
         从元数据中移除股票
@@ -149,24 +285,56 @@ class MetadataManager:
         Args:
             stock_code: 股票代码
         """
-        metadata = self._load_metadata()
-        if stock_code in metadata:
-            del metadata[stock_code]
-            self._cache = metadata
-            self._save_metadata(metadata)
+        # 其他进程写入的文件中可能有该股票，不能只根据本实例的缓存判断是否需要移除
+        with self._lock:
+            self._commit({stock_code: None})
     
     def clear(self) -> None:
         """
         清空元数据
         """
-        self._cache = {}
-        if os.path.exists(self.metadata_file):
-            os.remove(self.metadata_file)
+        with self._lock:
+            self._cache = {}
+            self._pending = {}
+            self._replace_all = False
+            if os.path.exists(self.metadata_file):
+                os.remove(self.metadata_file)
         logger.info("元数据已清空")
     
+    def _read_file_last_date(self, stock_code: str) -> Optional[str]:
+        """
+        读取股票数据文件的最新日期
+        
+        文件按日期排序，只读取最后一行的日期；最后一行无法解析时再读取整个文件
+        
+        Args:
+            stock_code: 股票代码
+        
+        Returns:
+            str: 最新日期（格式 YYYYMMDD），文件不存在或没有数据时返回 None
+        """
+        # data_saver 依赖本模块，在这里导入避免循环导入
+        from .data_saver import get_stock_file_path, read_last_date, read_stock_file
+        
+        file_path = get_stock_file_path(self.data_dir, stock_code, self.storage_format)
+        if not os.path.exists(file_path):
+            return None
+        
+        try:
+            last_date = read_last_date(file_path)
+            if last_date is not None:
+                return pd.to_datetime(last_date).strftime('%Y%m%d')
+        except (ValueError, IndexError):
+            pass  # 最后一行格式异常，读取整个文件
+        
+        df = read_stock_file(file_path)
+        if df.empty:
+            return None
+        return pd.to_datetime(df['日期']).max().strftime('%Y%m%d')
+    
     def rebuild_from_files(self, stock_codes: list) -> int:
         """
-        从现有的 CSV 文件重建元数据
+        从现有的个股数据文件重建元数据
         
         Args:
             stock_codes: 股票代码列表
@@ -174,30 +342,33 @@ class MetadataManager:
         Returns:
             int: 成功重建的股票数量
         """
-        metadata = {}
-        success_count = 0
-        
-        for stock_code in stock_codes:
+        def read_one(stock_code: str) -> Optional[str]:
             try:
-                file_path = os.path.join(self.data_dir, f"stock_{stock_code}.csv")
-                if not os.path.exists(file_path):
-                    continue
-                
-                # 只读取最后一行（最新日期）
-                df = pd.read_csv(file_path, dtype={'股票代码': str})
-                if not df.empty:
-                    # 确保日期列是日期类型
-                    df['日期'] = pd.to_datetime(df['日期'])
-                    last_date = df['日期'].max().strftime('%Y%m%d')
-                    metadata[stock_code] = last_date
-                    success_count += 1
+                return self._read_file_last_date(stock_code)
             except Exception as e:
                 logger.debug(f"重建 {stock_code} 元数据失败: {e}")
-                continue
+                return None
+        
+        # 各文件互不依赖，瓶颈在文件 I/O，用线程池并行读取
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            last_dates = list(executor.map(read_one, stock_codes))
+        
+        metadata = {
+            stock_code: last_date
+            for stock_code, last_date in zip(stock_codes, last_dates)
+            if last_date is not None
+        }
+        success_count = len(metadata)
         
         if metadata:
-            self._cache = metadata
-            self._save_metadata(metadata)
+            # 重建结果整体替换元数据文件，不与文件中的旧内容合并
+            with self._lock:
+                self._cache = metadata
+                self._pending = {}
+                self._replace_all = True
+                if self._defer_depth == 0:
+                    self._save_metadata()
             logger.info(f"元数据重建完成: {success_count}/{len(stock_codes)} 只股票")
         
         return success_count
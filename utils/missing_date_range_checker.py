@@ -4,11 +4,183 @@
 """
 
 import os
+import re
 import pandas as pd
-from datetime import timedelta
+from datetime import date, timedelta
 from typing import Tuple, Optional, List
-from .trading_day_checker import has_trading_day
+from .trading_day_checker import has_trading_day, get_trading_days
 from .metadata_manager import MetadataManager
+from .data_saver import (
+    read_last_date, read_parquet_date_column, _is_iso_date_strings, HAS_PYARROW, pa, pa_csv
+)
+
+# 日期列名候选（兼容中英文列名，按顺序优先）
+DATE_COL_CANDIDATES = ('日期', 'date')
+
+# 个股文件名中的股票代码，如 stock_000001.csv / stock_000001.parquet -> 000001
+STOCK_FILE_PATTERN = re.compile(r'stock_(.+)\.(?:csv|parquet)')
+
+
+def _shift_day(date_str: str, days: int) -> str:
+    """
+    将 'YYYYMMDD' 日期前后移动若干天（直接用 datetime.date 计算，不构造 pandas Timestamp）
+    
+    Args:
+        date_str (str): 日期，格式 'YYYYMMDD'
+        days (int): 移动天数（负数表示向前）
+    
+    Returns:
+        str: 移动后的日期，格式 'YYYYMMDD'
+    """
+    d = date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8])) + timedelta(days=days)
+    return f"{d.year:04d}{d.month:02d}{d.day:02d}"
+
+
+def _to_yyyymmdd(date_str: str) -> str:
+    """
+    将日期字符串转换为 'YYYYMMDD' 格式
+    
+    'YYYY-MM-DD'、'YYYY/MM/DD'、'YYYYMMDD' 只做字符串处理，其他格式（如不补零的月日、带时间）交给 pandas 解析
+    
+    Args:
+        date_str (str): 日期字符串
+    
+    Returns:
+        str: 格式 'YYYYMMDD' 的日期
+    """
+    compact = date_str.replace('-', '').replace('/', '')
+    if len(compact) == 8 and compact.isdigit():
+        return compact
+    return pd.to_datetime(date_str).strftime('%Y%m%d')
+
+
+def _pick_date_col(columns) -> str:
+    """
+    从列名中选出日期列（都不存在时返回 'date'，由调用方按缺列处理）
+    
+    Args:
+        columns: 列名集合
+    
+    Returns:
+        str: 日期列名
+    """
+    return next((col for col in DATE_COL_CANDIDATES if col in columns), DATE_COL_CANDIDATES[-1])
+
+
+def _date_cache_path(csv_path: str) -> str:
+    """
+    日期列缓存文件路径（隐藏文件，不会被按 stock_*.csv/parquet 扫描的脚本误认为个股数据）
+    
+    Args:
+        csv_path (str): 个股 CSV 文件路径
+    
+    Returns:
+        str: 如 data/CN/.stock_000001.dates.parquet
+    """
+    directory, filename = os.path.split(csv_path)
+    return os.path.join(directory, f".{os.path.splitext(filename)[0]}.dates.parquet")
+
+
+def _read_date_column_pyarrow(csv_path: str) -> pd.DataFrame:
+    """
+    使用 pyarrow 的多线程 CSV 解析器只读取日期列（按字符串读取）
+    
+    Args:
+        csv_path (str): 个股 CSV 文件路径
+    
+    Returns:
+        DataFrame: 只包含日期列的数据；文件没有日期列时返回空 DataFrame
+    """
+    # include_columns 要求列必须存在，先读表头确定日期列
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        header = f.readline().rstrip('\r\n').split(',')
+    date_cols = [col for col in DATE_COL_CANDIDATES if col in header]
+    if not date_cols:
+        return pd.DataFrame()
+    
+    date_col = date_cols[0]
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=[date_col],
+        column_types={date_col: pa.string()}
+    )
+    return pa_csv.read_csv(csv_path, convert_options=convert_options).to_pandas()
+
+
+def _read_date_column(csv_path: str, use_parquet_cache: bool = False) -> pd.DataFrame:
+    """
+    读取个股文件的日期列（CSV 按字符串读取，兼容中英文列名）
+    
+    use_parquet_cache 为 True 且已安装 pyarrow 时，把日期列另存为 Parquet 缓存，
+    CSV 未修改时（缓存不早于 CSV）直接读取缓存，不再解析 CSV；
+    Parquet 个股文件本身按列存储，直接读取日期列，不使用缓存
+    
+    Args:
+        csv_path (str): 个股 CSV/Parquet 文件路径
+        use_parquet_cache (bool): 是否使用日期列 Parquet 缓存
+    
+    Returns:
+        DataFrame: 只包含日期列的数据
+    """
+    if csv_path.endswith('.parquet'):
+        return read_parquet_date_column(csv_path)
+    
+    cache_path = _date_cache_path(csv_path)
+    use_cache = use_parquet_cache and HAS_PYARROW
+    if use_cache:
+        try:
+            if os.path.getmtime(cache_path) >= os.path.getmtime(csv_path):
+                return pd.read_parquet(cache_path)
+        except OSError:
+            pass  # 缓存不存在，读取 CSV 后重新生成
+    
+    if HAS_PYARROW:
+        dates_df = _read_date_column_pyarrow(csv_path)
+    else:
+        dates_df = pd.read_csv(
+            csv_path,
+            usecols=lambda col: col in DATE_COL_CANDIDATES,
+            dtype=str,
+            engine='c',
+            memory_map=True
+        )
+    
+    if use_cache:
+        # 写入临时文件后原子替换，并发检查同一只股票时不会读到不完整的缓存
+        temp_file = f"{cache_path}.tmp.{os.getpid()}"
+        try:
+            dates_df.to_parquet(temp_file, compression='snappy', index=False)
+            os.replace(temp_file, cache_path)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+    return dates_df
+
+
+def fast_check_up_to_date(
+    stock_code: str,
+    end_date: str,
+    metadata_manager: Optional[MetadataManager]
+) -> Optional[bool]:
+    """
+    只查元数据判断股票数据是否已是最新（批量更新时最常见的情况）
+    
+    不访问文件系统；返回 None 或 False 时再调用 get_missing_date_range 做完整判断
+    
+    Args:
+        stock_code (str): 股票代码
+        end_date (str): 目标结束日期，格式 'YYYYMMDD'
+        metadata_manager: 元数据管理器（为 None 时返回 None）
+    
+    Returns:
+        bool: 元数据中的最新日期不早于 end_date 时返回 True，否则返回 False
+        None: 没有元数据
+    """
+    if metadata_manager is None:
+        return None
+    last_date = metadata_manager.get_last_date(stock_code)
+    if not last_date:
+        return None
+    return last_date.replace('-', '') >= end_date
 
 
 def get_missing_date_range(
@@ -16,19 +188,24 @@ def get_missing_date_range(
     start_date: str,
     end_date: str,
     update_mode: str = 'tail',
-    metadata_manager: Optional[MetadataManager] = None
+    metadata_manager: Optional[MetadataManager] = None,
+    use_parquet_cache: bool = False,
+    stock_code: Optional[str] = None
 ) -> Tuple[bool, Optional[str], Optional[str], bool, Optional[List[str]]]:
     """
     检查已存在的股票数据文件，分析缺失的日期范围
     
     Args:
-        existing_file (str): 已存在的CSV文件路径
+        existing_file (str): 已存在的CSV/Parquet文件路径
         start_date (str): 目标开始日期，格式 'YYYYMMDD'（如 '20000101'）
         end_date (str): 目标结束日期，格式 'YYYYMMDD'（如 '20000110'）
         update_mode (str): 更新模式，可选值：
             - 'tail': 只补充尾部数据（默认，推荐）
             - 'full': 完全刷新，补充所有缺失数据（包括中间停牌日）
             - 'head_tail': 补充头部和尾部，忽略中间缺失
+        metadata_manager: 元数据管理器（可选，tail 模式下优先使用其中的最新日期）
+        use_parquet_cache (bool): 完整读取时是否使用日期列 Parquet 缓存（需安装 pyarrow）
+        stock_code (str): 股票代码（可选，用于查询元数据；不提供时从文件名解析）
     
     Returns:
         tuple: (need_update, fetch_start, fetch_end, need_full_refresh, missing_dates_list)
@@ -69,17 +246,20 @@ def get_missing_date_range(
     try:
         # 超快速路径：使用元数据（如果提供）
         if update_mode == 'tail' and metadata_manager is not None:
-            # 从文件名提取股票代码
-            stock_code = os.path.basename(existing_file).replace('stock_', '').replace('.csv', '')
-            last_date = metadata_manager.get_last_date(stock_code)
+            # 调用方未提供股票代码时从文件名提取（文件名不符合 stock_代码.csv/.parquet 时不使用元数据）
+            if stock_code is None:
+                match = STOCK_FILE_PATTERN.fullmatch(os.path.basename(existing_file))
+                stock_code = match.group(1) if match else None
+            last_date = metadata_manager.get_last_date(stock_code) if stock_code else None
             
             if last_date:
-                # 元数据存在，直接使用
+                # 元数据存在，直接使用（兼容 YYYY-MM-DD 格式，统一为 YYYYMMDD 后再比较）
+                last_date = last_date.replace('-', '')
                 if last_date >= end_date:
                     return (False, None, None, False, None)
                 
                 # 需要更新尾部数据
-                next_day = (pd.to_datetime(last_date) + timedelta(days=1)).strftime('%Y%m%d')
+                next_day = _shift_day(last_date, 1)
                 
                 # 检查是否有交易日需要更新
                 if has_trading_day(next_day, end_date):
@@ -90,30 +270,20 @@ def get_missing_date_range(
         
         # 快速路径：tail 模式下只需要检查最后一行
         if update_mode == 'tail':
-            # 只读取最后一行来判断是否需要更新
+            # 只读取最后一行的日期来判断是否需要更新（CSV 只读表头和文件尾部，Parquet 只读日期列）
             try:
-                last_line_df = pd.read_csv(existing_file, nrows=1)  # 先读取第一行获取列名
-                if last_line_df.empty:
+                last_date_str = read_last_date(existing_file)
+                if last_date_str is None:
                     return (True, start_date, end_date, False, None)
                 
-                # 获取日期列名
-                date_col = '日期' if '日期' in last_line_df.columns else 'date'
-                
-                # 只读取最后一行
-                last_line_df = pd.read_csv(existing_file, usecols=[date_col])
-                if last_line_df.empty:
-                    return (True, start_date, end_date, False, None)
-                
-                # 获取最后一行的日期
-                last_date_str = last_line_df[date_col].iloc[-1]
-                existing_end = pd.to_datetime(last_date_str).strftime('%Y%m%d')
+                existing_end = _to_yyyymmdd(last_date_str)
                 
                 # 如果最后一行日期 >= 目标结束日期，说明已是最新
                 if existing_end >= end_date:
                     return (False, None, None, False, None)
                 
                 # 需要更新尾部数据
-                next_day = (pd.to_datetime(existing_end) + timedelta(days=1)).strftime('%Y%m%d')
+                next_day = _shift_day(existing_end, 1)
                 
                 # 检查是否有交易日需要更新
                 if has_trading_day(next_day, end_date):
@@ -121,51 +291,40 @@ def get_missing_date_range(
                 else:
                     # 没有交易日需要更新
                     return (False, None, None, False, None)
-            except Exception:
-                # 如果快速路径失败，降级到完整读取
+            except (OSError, ValueError, IndexError):
+                # 文件读取失败或最后一行格式异常时，降级到完整读取
                 pass
         
         # 完整路径：读取整个文件（用于 full 和 head_tail 模式，或 tail 模式快速路径失败时）
-        existing_df = pd.read_csv(existing_file)
+        # 只读取日期列（兼容中英文列名），按字符串读取，不解析其他列
+        existing_df = _read_date_column(existing_file, use_parquet_cache)
         if existing_df.empty:
             return (True, start_date, end_date, False, None)
         
-        # 获取已有数据的日期（兼容中英文列名）
-        date_col = '日期' if '日期' in existing_df.columns else 'date'
-        existing_df[date_col] = pd.to_datetime(existing_df[date_col])
-        existing_dates = set(existing_df[date_col].dt.strftime('%Y%m%d'))
-        
-        existing_start = existing_df[date_col].min().strftime('%Y%m%d')
-        existing_end = existing_df[date_col].max().strftime('%Y%m%d')
+        # 获取已有数据的日期：YYYY-MM-DD 字符串直接去掉连字符，其他格式再交给 pandas 解析
+        date_col = _pick_date_col(existing_df.columns)
+        dates = existing_df[date_col]
+        if _is_iso_date_strings(dates):
+            date_keys = dates.str.replace('-', '', regex=False)
+        else:
+            date_keys = pd.to_datetime(dates).dt.strftime('%Y%m%d')
+        existing_dates = set(date_keys)
         
-        # 生成目标日期范围
-        target_start = pd.to_datetime(start_date)
-        target_end = pd.to_datetime(end_date)
-        all_dates = pd.date_range(start=target_start, end=target_end, freq='D')
-        target_dates = set(all_dates.strftime('%Y%m%d'))
+        # YYYYMMDD 为定长字符串，字典序与日期顺序一致
+        existing_start = date_keys.min()
+        existing_end = date_keys.max()
         
-        # 检查缺失的日期
-        missing_dates = target_dates - existing_dates
+        # 目标范围内的交易日（排除周末和节假日）减去已有日期，即为缺失的交易日
+        # 交易日集合按 (start_date, end_date) 缓存，批量检查时各股票共用
+        trading_dates = get_trading_days(start_date, end_date)
+        missing_sorted = sorted(trading_dates - existing_dates)
         
-        if not missing_dates:
+        # 如果没有缺失的交易日，说明数据完整或只是缺少周末/节假日，不需要更新
+        if not missing_sorted:
             return (False, None, None, False, None)
         
-        # 过滤出缺失的交易日（排除周末和节假日）
-        missing_trading_days = []
-        for date_str in missing_dates:
-            # 使用 has_trading_day 判断单个日期是否为交易日
-            if has_trading_day(date_str, date_str):
-                missing_trading_days.append(date_str)
-        
-        # 如果没有缺失的交易日，说明只是缺少周末/节假日，不需要更新
-        if not missing_trading_days:
-            return (False, None, None, False, None)
-        
-        # 有缺失的交易日
-        missing_sorted = sorted(missing_trading_days)
-        
         # 格式化缺失日期列表为 YYYY-MM-DD 格式
-        missing_dates_formatted = [pd.to_datetime(d).strftime('%Y-%m-%d') for d in missing_sorted]
+        missing_dates_formatted = [f"{d[:4]}-{d[4:6]}-{d[6:]}" for d in missing_sorted]
         
         # 判断缺失位置类型
         has_head_missing = missing_sorted[0] < existing_start  # 头部有缺失
@@ -184,7 +343,7 @@ def get_missing_date_range(
             elif update_mode == 'tail':
                 # 尾部模式（默认）：忽略中间缺失（可能是停牌），只处理尾部
                 if has_tail_missing:
-                    next_day = (pd.to_datetime(existing_end) + timedelta(days=1)).strftime('%Y%m%d')
+                    next_day = _shift_day(existing_end, 1)
                     return (True, next_day, end_date, False, missing_dates_formatted)
                 else:
                     # 只有中间缺失，不更新
@@ -195,10 +354,10 @@ def get_missing_date_range(
                     # 同时有头尾缺失，需要分两次获取（这里简化为完全刷新）
                     return (True, start_date, end_date, True, missing_dates_formatted)
                 elif has_tail_missing:
-                    next_day = (pd.to_datetime(existing_end) + timedelta(days=1)).strftime('%Y%m%d')
+                    next_day = _shift_day(existing_end, 1)
                     return (True, next_day, end_date, False, missing_dates_formatted)
                 elif has_head_missing:
-                    prev_day = (pd.to_datetime(existing_start) - timedelta(days=1)).strftime('%Y%m%d')
+                    prev_day = _shift_day(existing_start, -1)
                     return (True, start_date, prev_day, False, missing_dates_formatted)
                 else:
                     # 只有中间缺失，不更新
@@ -208,7 +367,7 @@ def get_missing_date_range(
         if update_mode == 'tail':
             # tail 模式：只处理尾部，忽略头部
             if has_tail_missing:
-                next_day = (pd.to_datetime(existing_end) + timedelta(days=1)).strftime('%Y%m%d')
+                next_day = _shift_day(existing_end, 1)
                 return (True, next_day, end_date, False, missing_dates_formatted)
             else:
                 # 只有头部缺失或没有缺失，不更新
@@ -217,12 +376,12 @@ def get_missing_date_range(
         # 其他模式：处理头部和尾部缺失
         # 只有尾部缺失
         if has_tail_missing and not has_head_missing:
-            next_day = (pd.to_datetime(existing_end) + timedelta(days=1)).strftime('%Y%m%d')
+            next_day = _shift_day(existing_end, 1)
             return (True, next_day, end_date, False, missing_dates_formatted)
         
         # 只有头部缺失
         if has_head_missing and not has_tail_missing:
-            prev_day = (pd.to_datetime(existing_start) - timedelta(days=1)).strftime('%Y%m%d')
+            prev_day = _shift_day(existing_start, -1)
             return (True, start_date, prev_day, False, missing_dates_formatted)
         
         # 同时有头部和尾部缺失
@@ -232,5 +391,7 @@ def get_missing_date_range(
         # 理论上不会到这里
         return (False, None, None, False, None)
         
-    except Exception as e:
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        # 文件无法读取、缺少日期列或日期无法解析（EmptyDataError、ParserError 均为 ValueError 的子类）
+        # 保守地获取整个目标范围
         return (True, start_date, end_date, False, None)
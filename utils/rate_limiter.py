@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+请求限速工具
+多线程共享的随机间隔限速器，控制数据源请求的整体频率
+"""
+
+import time
+import random
+import threading
+
+
+class RateLimiter:
+    """
+    随机间隔限速器
+
+    相邻两次请求的开始时间至少间隔 [min_interval, max_interval] 之间的随机秒数，
+    多个线程共享同一个实例时，整体请求频率与单线程加随机延迟时一致
+
+    按令牌桶方式计算：空闲期间（如连续跳过已是最新的股票）会积累额度，
+    额度足够时请求无需等待；burst 为桶容量，默认 1 即严格按间隔发起请求
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, burst: int = 1):
+        """
+        初始化限速器
+
+        Args:
+            min_interval: 最小间隔（秒）
+            max_interval: 最大间隔（秒）
+            burst: 空闲后允许连续发起、无需等待的请求数（默认 1）
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.burst = max(1, burst)
+        # 允许提前发起的时间量（按平均间隔折算 burst - 1 个请求）
+        self._tolerance = (self.burst - 1) * (min_interval + max_interval) / 2
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self) -> float:
+        """
+        等待直到允许发起下一次请求
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            # 理论上的下一个时间槽（空闲过久时从当前时间起算，额度最多积累 burst 个）
+            slot = max(now, self._next_time)
+            start = max(now, slot - self._tolerance)
+            # 预约本次请求的时间槽，并计算下一个时间槽
+            self._next_time = slot + random.uniform(self.min_interval, self.max_interval)
+
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+股票列表加载工具
+读取本地 stock_list.csv 并在进程内缓存，避免重复读取磁盘
+
+安装了 pyarrow 时，保存股票列表会同时写入 Feather 副本（stock_list.feather），
+读取时优先使用 Feather（比解析 CSV 更快），CSV 保留供人工查看
+"""
+
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from .data_saver import HAS_PYARROW
+
+if HAS_PYARROW:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+
+def get_feather_path(file_path: str) -> str:
+    """
+    获取股票列表 CSV 对应的 Feather 副本路径
+
+    Args:
+        file_path: 股票列表 CSV 文件路径
+
+    Returns:
+        str: Feather 文件路径（同目录同名，扩展名为 .feather）
+    """
+    return os.path.splitext(file_path)[0] + '.feather'
+
+
+def _fresh_feather_path(file_path: str):
+    """
+    返回可用的 Feather 副本路径（存在且不早于 CSV），否则返回 None
+
+    CSV 被手动修改后 Feather 副本会过期，此时回退读取 CSV
+
+    Args:
+        file_path: 股票列表 CSV 文件路径
+
+    Returns:
+        Optional[str]: Feather 文件路径或 None
+    """
+    if not HAS_PYARROW:
+        return None
+    feather_path = get_feather_path(file_path)
+    try:
+        if os.path.getmtime(feather_path) >= os.path.getmtime(file_path):
+            return feather_path
+    except OSError:
+        pass
+    return None
+
+
+def read_stock_list(file_path: str) -> pd.DataFrame:
+    """
+    读取股票列表（不缓存，优先读取 Feather 副本）
+
+    Args:
+        file_path: 股票列表 CSV 文件路径
+
+    Returns:
+        DataFrame: 股票列表（code 列为字符串）
+    """
+    feather_path = _fresh_feather_path(file_path)
+    if feather_path is not None:
+        try:
+            return pd.read_feather(feather_path)
+        except Exception:
+            pass
+    if HAS_PYARROW:
+        convert_options = pa_csv.ConvertOptions(column_types={'code': pa.string()})
+        return pa_csv.read_csv(file_path, convert_options=convert_options).to_pandas()
+    # 显式指定 utf-8（C 解析器仍会跳过旧文件开头的 BOM）
+    return pd.read_csv(file_path, dtype={'code': str}, encoding='utf-8', engine='c', memory_map=True)
+
+
+def save_stock_list(df: pd.DataFrame, file_path: str) -> None:
+    """
+    保存股票列表为 CSV（UTF-8 不带 BOM），安装了 pyarrow 时同时写入 Feather 副本
+
+    Args:
+        df: 股票列表（code, name）
+        file_path: 股票列表 CSV 文件路径
+    """
+    df.to_csv(file_path, index=False, encoding="utf-8")
+    if HAS_PYARROW:
+        # Feather 在 CSV 之后写入，修改时间不早于 CSV，读取时才会被采用
+        df.reset_index(drop=True).to_feather(get_feather_path(file_path))
+
+
+@lru_cache(maxsize=4)
+def _load_stock_list_cached(file_path: str, mtime: float) -> pd.DataFrame:
+    """
+    读取股票列表文件（按路径和修改时间缓存）
+
+    Args:
+        file_path: 股票列表文件路径
+        mtime: 文件修改时间（作为缓存键的一部分，文件更新后自动失效）
+
+    Returns:
+        DataFrame: 股票列表（code 列为字符串）
+    """
+    return read_stock_list(file_path)
+
+
+def load_stock_list(file_path: str) -> pd.DataFrame:
+    """
+    加载股票列表（进程内缓存，文件修改后自动重新读取）
+
+    注意：返回的是缓存对象，调用方不要原地修改
+
+    Args:
+        file_path: 股票列表文件路径
+
+    Returns:
+        DataFrame: 股票列表（code 列为字符串）
+    """
+    return _load_stock_list_cached(file_path, os.path.getmtime(file_path))
+
+
+def lookup_stock_names(codes: pd.Series, stock_codes: pd.Series, stock_names: pd.Series) -> np.ndarray:
+    """
+    按股票代码查找股票名称（整数位置索引，避免逐行字典查找）
+
+    Args:
+        codes: 待查找的股票代码
+        stock_codes: 股票列表中的代码（可含空值，空值代码被忽略）
+        stock_names: 股票列表中的名称（与 stock_codes 一一对应）
+
+    Returns:
+        ndarray: 股票名称数组，未找到的（含股票列表为空时）为空字符串
+    """
+    lookup = pd.DataFrame({'code': stock_codes.to_numpy(), 'name': stock_names.to_numpy()})
+    lookup = lookup.dropna(subset=['code']).drop_duplicates('code', keep='last')  # 与 dict(zip(...)) 一致，重复代码取最后一个
+
+    # get_indexer 返回每个代码在列表中的位置，未找到为 -1，正好对应末尾追加的空名称
+    positions = pd.Index(lookup['code']).get_indexer(codes)
+    names = np.append(lookup['name'].fillna('').to_numpy(dtype=object), '')
+    return names[positions]
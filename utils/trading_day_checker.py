@@ -3,20 +3,110 @@
 交易日检查工具
 """
 
+import numpy as np
 import pandas as pd
-from typing import Optional
+from datetime import date
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+# 交易日历的起始日期（支持 2000 年之后的数据）
+CALENDAR_START = date(2000, 1, 1)
 
 try:
     import exchange_calendars as xcals
     # 获取上海证券交易所日历（代表A股交易日历）
-    # 指定 start="2000-01-01" 以支持 2000 年之后的数据
-    XSHG_CALENDAR = xcals.get_calendar("XSHG", start="2000-01-01")
+    XSHG_CALENDAR = xcals.get_calendar("XSHG", start=CALENDAR_START.isoformat())
     HAS_EXCHANGE_CALENDAR = True
 except (ImportError, Exception):
     XSHG_CALENDAR = None
     HAS_EXCHANGE_CALENDAR = False
 
 
+def _build_session_bitmap() -> Optional[np.ndarray]:
+    """
+    预先计算交易日位图：下标为距 CALENDAR_START 的天数，交易日为 True
+    
+    覆盖 CALENDAR_START 至日历最后一个交易日，exchange_calendars 不可用时返回 None
+    
+    Returns:
+        np.ndarray: bool 数组
+    """
+    if not HAS_EXCHANGE_CALENDAR or XSHG_CALENDAR is None:
+        return None
+    try:
+        sessions = XSHG_CALENDAR.sessions
+        offsets = (sessions - pd.Timestamp(CALENDAR_START)).days.to_numpy()
+        bitmap = np.zeros(offsets[-1] + 1, dtype=np.bool_)
+        bitmap[offsets] = True
+        return bitmap
+    except Exception:
+        return None
+
+
+# 模块加载时计算一次，之后判断交易日只需对数组切片
+_SESSION_BITMAP = _build_session_bitmap()
+_CALENDAR_EPOCH = CALENDAR_START.toordinal()
+
+
+def _session_window(start_date: str, end_date: str) -> Optional[np.ndarray]:
+    """
+    取出日期范围在交易日位图中对应的切片
+    
+    Args:
+        start_date (str): 开始日期，格式 'YYYYMMDD'
+        end_date (str): 结束日期，格式 'YYYYMMDD'
+    
+    Returns:
+        np.ndarray: 位图切片（每天一个元素，交易日为 True）
+        None: 位图不可用、日期格式不符或范围超出位图时返回 None（由调用方走日历查询）
+    """
+    if _SESSION_BITMAP is None:
+        return None
+    try:
+        start_idx = date(int(start_date[:4]), int(start_date[4:6]), int(start_date[6:8])).toordinal() - _CALENDAR_EPOCH
+        end_idx = date(int(end_date[:4]), int(end_date[4:6]), int(end_date[6:8])).toordinal() - _CALENDAR_EPOCH
+    except (TypeError, ValueError):
+        return None
+    if start_idx < 0 or end_idx >= len(_SESSION_BITMAP):
+        return None
+    return _SESSION_BITMAP[start_idx:end_idx + 1]
+
+
+@lru_cache(maxsize=16384)
+def _is_single_trading_day(date_str: str) -> bool:
+    """
+    判断单个日期是否为A股交易日（has_trading_day 起止日期相同时的快速路径）
+    
+    不生成日期范围，直接查询日历；结果按日期缓存（2000 年至今约一万个日期）
+    
+    Args:
+        date_str (str): 日期，格式 'YYYYMMDD'
+    
+    Returns:
+        bool: 是交易日返回 True
+    """
+    window = _session_window(date_str, date_str)
+    if window is not None:
+        return bool(window.any())
+    
+    try:
+        day = pd.Timestamp(date_str)
+        
+        # 优先使用 exchange_calendars（最准确）
+        if HAS_EXCHANGE_CALENDAR and XSHG_CALENDAR is not None:
+            try:
+                return bool(XSHG_CALENDAR.is_session(day))
+            except Exception:
+                # 如果查询失败，降级处理
+                pass
+        
+        # 降级方案：周一到周五视为交易日
+        return day.weekday() < 5
+    except Exception:
+        return True  # 异常情况下，保守地认为是交易日，尝试获取数据
+
+
+@lru_cache(maxsize=4096)
 def has_trading_day(start_date: str, end_date: str) -> bool:
     """
     判断日期范围内是否有A股交易日
@@ -24,6 +114,8 @@ def has_trading_day(start_date: str, end_date: str) -> bool:
     优先使用 exchange_calendars 库（专业的交易所日历，准确识别A股交易日）
     如果不可用，则降级为简单的周末判断
     
+    结果按 (start_date, end_date) 缓存：批量更新时大多数股票的缺失区间相同
+    
     注意：
         - 日历配置为从 2000-01-01 开始
         - 支持范围：2000-01-04 至 2026-12-31
@@ -46,26 +138,82 @@ def has_trading_day(start_date: str, end_date: str) -> bool:
         >>> has_trading_day('20240218', '20240218')  # 2024-02-18 周日调休工作日，但股市不开
         False
     """
+    if start_date == end_date:
+        return _is_single_trading_day(start_date)
+    
+    # 范围在位图内时直接对切片求 any，不逐日查询日历
+    window = _session_window(start_date, end_date)
+    if window is not None:
+        return bool(window.any())
+    
     try:
         start = pd.to_datetime(start_date)
         end = pd.to_datetime(end_date)
         
-        # 生成日期范围
-        date_range = pd.date_range(start=start, end=end, freq='D')
-        
         # 优先使用 exchange_calendars（最准确）
         if HAS_EXCHANGE_CALENDAR and XSHG_CALENDAR is not None:
             try:
-                # 检查是否有任何交易日
-                has_session = any(XSHG_CALENDAR.is_session(d) for d in date_range)
-                return has_session
+                # 一次查询整个范围内的交易日，不逐日调用 is_session
+                return len(XSHG_CALENDAR.sessions_in_range(start.normalize(), end.normalize())) > 0
             except Exception:
                 # 如果查询失败，降级处理
                 pass
         
         # 降级方案：检查是否有非周末的日期（周一到周五，weekday < 5）
-        has_weekday = any(d.weekday() < 5 for d in date_range)
-        
-        return has_weekday
+        date_range = pd.date_range(start=start, end=end, freq='D')
+        return bool((date_range.weekday < 5).any())
     except Exception:
         return True  # 异常情况下，保守地认为有交易日，尝试获取数据
+
+
+@lru_cache(maxsize=256)
+def get_trading_days(start_date: str, end_date: str) -> FrozenSet[str]:
+    """
+    获取日期范围内的所有A股交易日（一次查询整个范围）
+    
+    适用于需要逐日判断的场景：先取出整个范围的交易日集合，再用 `in` 判断，
+    避免对每一天单独调用 has_trading_day
+    
+    与 has_trading_day 相同，exchange_calendars 不可用或查询失败时
+    （如范围超出日历支持的区间）降级为周末判断
+    
+    Args:
+        start_date (str): 开始日期，格式 'YYYYMMDD'
+        end_date (str): 结束日期，格式 'YYYYMMDD'
+    
+    Returns:
+        FrozenSet[str]: 交易日集合（格式 'YYYYMMDD'）
+    
+    Examples:
+        >>> '20240219' in get_trading_days('20240210', '20240220')  # 春节后首个交易日
+        True
+        >>> '20240218' in get_trading_days('20240210', '20240220')  # 周日调休工作日，股市不开
+        False
+    """
+    start = pd.to_datetime(start_date)
+    end = pd.to_datetime(end_date)
+    
+    # 位图可用时逐日查表：位图范围内按交易日历，范围外按周末判断（与逐日调用 has_trading_day 一致）
+    if _SESSION_BITMAP is not None:
+        date_range = pd.date_range(start=start, end=end, freq='D')
+        offsets = (date_range - pd.Timestamp(CALENDAR_START)).days.to_numpy()
+        inside = (offsets >= 0) & (offsets < len(_SESSION_BITMAP))
+        is_trading = np.where(
+            inside,
+            _SESSION_BITMAP[np.clip(offsets, 0, len(_SESSION_BITMAP) - 1)],
+            date_range.weekday < 5
+        )
+        return frozenset(date_range[is_trading].strftime('%Y%m%d'))
+    
+    # 优先使用 exchange_calendars（最准确）
+    if HAS_EXCHANGE_CALENDAR and XSHG_CALENDAR is not None:
+        try:
+            sessions = XSHG_CALENDAR.sessions_in_range(start, end)
+            return frozenset(sessions.strftime('%Y%m%d'))
+        except Exception:
+            # 如果查询失败，降级处理
+            pass
+    
+    # 降级方案：周一到周五视为交易日
+    date_range = pd.date_range(start=start, end=end, freq='D')
+    return frozenset(date_range[date_range.weekday < 5].strftime('%Y%m%d'))